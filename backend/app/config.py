@@ -4,15 +4,29 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./vizzy.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
 
 JWT_SECRET = os.getenv("JWT_SECRET", "secret")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "10080"))
 
+# token -> user identity cache used by get_current_user (dropped on user delete / password change)
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Password hashing: bcrypt work factor (changing it rehashes users on their next login)
+# and the dedicated pool it runs on ("thread" or "process")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+AUTH_HASH_EXECUTOR = os.getenv("AUTH_HASH_EXECUTOR", "thread").lower()
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
 
 PLANNER_PROVIDER = os.getenv("PLANNER_PROVIDER", "groq")
 PLANNER_MODEL = os.getenv("PLANNER_MODEL", "llama-3.3-70b-versatile")
@@ -20,9 +34,144 @@ PLANNER_MODEL = os.getenv("PLANNER_MODEL", "llama-3.3-70b-versatile")
 VISION_PLANNER_PROVIDER = os.getenv("VISION_PLANNER_PROVIDER", "openai")
 VISION_PLANNER_MODEL = os.getenv("VISION_PLANNER_MODEL", "gpt-4o-mini")
 
+# Planner output format: "json_schema" (structured outputs), "json_object" (JSON mode)
+# or "none", per model support. Replies that still don't parse are repaired locally,
+# then re-asked at most PLANNER_MAX_REASKS times before the turn fails.
+PLANNER_RESPONSE_FORMAT = os.getenv("PLANNER_RESPONSE_FORMAT", "json_object")
+VISION_PLANNER_RESPONSE_FORMAT = os.getenv("VISION_PLANNER_RESPONSE_FORMAT", "json_schema")
+PLANNER_MAX_REASKS = int(os.getenv("PLANNER_MAX_REASKS", "1"))
+
 IMAGE_PROVIDER = os.getenv("IMAGE_PROVIDER", "openai")
 IMAGE_MODEL = os.getenv("IMAGE_MODEL", "gpt-image-1")
+# split num_outputs into concurrent single-image requests
+IMAGE_FANOUT = os.getenv("IMAGE_FANOUT", "true").lower() == "true"
+IMAGE_FANOUT_CONCURRENCY = int(os.getenv("IMAGE_FANOUT_CONCURRENCY", "4"))
+
+# Guards around every upstream image request, per provider ("name=value" lists,
+# unlisted providers get the default): token bucket in requests/s (0 = unlimited),
+# max requests in flight, jittered retries that honor Retry-After, and a circuit
+# breaker that fails fast for a while after repeated upstream failures.
+PROVIDER_RATE_LIMITS = os.getenv("PROVIDER_RATE_LIMITS", "openai=2")
+PROVIDER_BURST = int(os.getenv("PROVIDER_BURST", "8"))
+PROVIDER_MAX_IN_FLIGHT = os.getenv("PROVIDER_MAX_IN_FLIGHT", "openai=16,mockup=64,fake=64")
+PROVIDER_DEFAULT_MAX_IN_FLIGHT = int(os.getenv("PROVIDER_DEFAULT_MAX_IN_FLIGHT", "8"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "3"))
+PROVIDER_RETRY_BASE_DELAY = float(os.getenv("PROVIDER_RETRY_BASE_DELAY", "0.5"))
+PROVIDER_RETRY_MAX_DELAY = float(os.getenv("PROVIDER_RETRY_MAX_DELAY", "20"))
+PROVIDER_BREAKER_FAILURES = int(os.getenv("PROVIDER_BREAKER_FAILURES", "5"))
+PROVIDER_BREAKER_COOLDOWN_SECONDS = float(os.getenv("PROVIDER_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# IMAGE_PROVIDER=fake: local images after FAKE_PROVIDER_LATENCY (+- jitter) seconds, failing
+# with the given probabilities, e.g. "429=0.1,500=0.05,timeout=0.02" (for tests / load benchmarks)
+FAKE_PROVIDER_LATENCY = float(os.getenv("FAKE_PROVIDER_LATENCY", "0.5"))
+FAKE_PROVIDER_JITTER = float(os.getenv("FAKE_PROVIDER_JITTER", "0.2"))
+FAKE_PROVIDER_FAULTS = os.getenv("FAKE_PROVIDER_FAULTS", "")
+FAKE_PROVIDER_RETRY_AFTER = float(os.getenv("FAKE_PROVIDER_RETRY_AFTER", "1"))
+
+# Prompt-level cache of generated images
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+GENERATION_CACHE_TTL_SECONDS = int(os.getenv("GENERATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1000"))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# In-memory planner reply cache (identical messages -> same reply, in-flight calls shared)
+PLANNER_CACHE_ENABLED = os.getenv("PLANNER_CACHE_ENABLED", "true").lower() == "true"
+PLANNER_CACHE_TTL_SECONDS = int(os.getenv("PLANNER_CACHE_TTL_SECONDS", "300"))
+PLANNER_CACHE_MAX_ENTRIES = int(os.getenv("PLANNER_CACHE_MAX_ENTRIES", "512"))
+
+# In-process tail of recent messages per conversation, so a chat turn usually skips the
+# history query. Only safe with a single app process (like the job queue).
+HISTORY_BUFFER_ENABLED = os.getenv("HISTORY_BUFFER_ENABLED", "true").lower() == "true"
+HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", "20"))
+HISTORY_BUFFER_MAX_CONVERSATIONS = int(os.getenv("HISTORY_BUFFER_MAX_CONVERSATIONS", "1000"))
+
+# Formatted preferences memory per user, dropped whenever the user's memory changes
+PREFERENCES_CACHE_ENABLED = os.getenv("PREFERENCES_CACHE_ENABLED", "true").lower() == "true"
+PREFERENCES_CACHE_MAX_USERS = int(os.getenv("PREFERENCES_CACHE_MAX_USERS", "10000"))
+
+# Planner context: everything run_planner / run_vision_planner send besides the static
+# system prompt is kept under PLANNER_CONTEXT_BUDGET_TOKENS (estimated, ~4 chars a token).
+# Older turns are folded into a rolling per-conversation summary.
+PLANNER_CONTEXT_BUDGET_TOKENS = int(os.getenv("PLANNER_CONTEXT_BUDGET_TOKENS", "1200"))
+# raw recent messages; keep it below HISTORY_BUFFER_SIZE so the buffer serves them
+PLANNER_HISTORY_MAX_MESSAGES = int(os.getenv("PLANNER_HISTORY_MAX_MESSAGES", "12"))
+PLANNER_SUMMARY_MAX_TOKENS = int(os.getenv("PLANNER_SUMMARY_MAX_TOKENS", "300"))
+PLANNER_PREFERENCES_MAX_TOKENS = int(os.getenv("PLANNER_PREFERENCES_MAX_TOKENS", "300"))
+
+# Local fast path: while the planner waits on its question, a reply the intent classifier
+# is sure is only a confirmation ("yes", "looks good, generate") turns a draft of at least
+# PLANNER_FAST_PATH_MIN_DRAFT_WORDS words into the final prompt without a planner call.
+PLANNER_FAST_PATH_ENABLED = os.getenv("PLANNER_FAST_PATH_ENABLED", "true").lower() == "true"
+PLANNER_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("PLANNER_FAST_PATH_MIN_CONFIDENCE", "0.9"))
+PLANNER_FAST_PATH_MIN_DRAFT_WORDS = int(os.getenv("PLANNER_FAST_PATH_MIN_DRAFT_WORDS", "8"))
+
+# Shared HTTP clients for the LLM / image APIs (keep-alive pools)
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+# Background generation jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+# per-provider max concurrent jobs, e.g. "openai=4,mockup=16"
+JOB_PROVIDER_CONCURRENCY = os.getenv("JOB_PROVIDER_CONCURRENCY", "openai=4,mockup=16")
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "2"))
 
 
 BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:8000")
 
+# Where generated images are stored: "local" (content-addressed under storage/generated,
+# served by the app) or "s3" (any S3-compatible bucket: AWS, MinIO, ...; needs boto3).
+# S3 credentials come from the usual AWS_* env vars.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+# public URL prefix for objects (CDN / public bucket); defaults to the endpoint
+S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL") or None
+S3_KEY_PREFIX = os.getenv("S3_KEY_PREFIX", "")
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "10"))
+
+# Downscaled copies of generated images for the chat grid, rendered in a process pool
+# after each job. VARIANT_SIZES is name=longest edge in px.
+VARIANTS_ENABLED = os.getenv("VARIANTS_ENABLED", "true").lower() == "true"
+VARIANT_SIZES = os.getenv("VARIANT_SIZES", "thumb=384,medium=1024")
+VARIANT_FORMATS = os.getenv("VARIANT_FORMATS", "avif,webp")
+VARIANT_QUALITY = int(os.getenv("VARIANT_QUALITY", "70"))
+# AVIF's scale runs higher: q50 looks about like WebP q70 at a smaller size
+VARIANT_AVIF_QUALITY = int(os.getenv("VARIANT_AVIF_QUALITY", "50"))
+VARIANT_WORKERS = int(os.getenv("VARIANT_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Storage GC: a sweep every GC_INTERVAL_SECONDS (0 = off) deletes expired uploads and
+# blobs no asset points at any more. GC_DRY_RUN only reports what it would delete.
+GC_INTERVAL_SECONDS = int(os.getenv("GC_INTERVAL_SECONDS", "3600"))
+GC_DRY_RUN = os.getenv("GC_DRY_RUN", "false").lower() == "true"
+# blobs younger than this are never deleted (a running job writes files before its asset rows)
+GC_GRACE_SECONDS = int(os.getenv("GC_GRACE_SECONDS", "3600"))
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "500"))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", str(24 * 3600)))
+
+# Per-user cap on generated image storage, in bytes (0 = unlimited)
+USER_STORAGE_QUOTA_BYTES = int(os.getenv("USER_STORAGE_QUOTA_BYTES", "0"))
+
+# HTTP caching for /storage, /mockups and /frontend. Files whose name is never reused
+# (content hash / uuid) are cached by browsers this long without revalidating.
+STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", str(365 * 24 * 3600)))
+# content hashes of files without one in their name, keyed by path + mtime + size
+STATIC_ETAG_CACHE_SIZE = int(os.getenv("STATIC_ETAG_CACHE_SIZE", "4096"))
+# text files (js/css/svg/...) up to this size are gzip'd once and kept in memory
+STATIC_GZIP_MAX_BYTES = int(os.getenv("STATIC_GZIP_MAX_BYTES", str(1024 * 1024)))
+
+# Reference image uploads (/upload/image)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Remote (non-BASE_URL) transform inputs are downloaded once and reused for this long
+REMOTE_INPUT_CACHE_TTL_SECONDS = int(os.getenv("REMOTE_INPUT_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Prometheus-style /metrics (per process: request / stage / upstream latency histograms,
+# DB statements per request). Scrapers send METRICS_TOKEN as a Bearer token; without one
+# the route refuses everyone unless METRICS_PUBLIC=true (e.g. only reachable on a private network).
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
@@ -1,22 +1,39 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW
 
 connect_args = {}
 
 if DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# pool_size + max_overflow should cover the threadpool (40 by default), otherwise
+# threads can sit waiting on a connection while the holders wait on a thread
+engine = create_engine(
+    DATABASE_URL,
+    connect_args=connect_args,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW
+)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
+# Async generator so the teardown (which hands the connection back to the pool)
+# runs on the event loop instead of waiting for a free threadpool slot.
+async def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# create_all skips tables that already exist, so indexes added to a model
+# later would never reach an existing database without this
+def ensure_indexes():
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.db import Base, engine
-from app.models import User, Conversation, Message, Asset, UserMemory, ConversationState
+from app.db import Base, engine, ensure_indexes
+from app.config import METRICS_ENABLED
+from app.models import User, Conversation, Message, Asset, UserMemory, ConversationState, ConversationSummary, GenerationJob, GenerationCacheEntry, AssetVariant, UserStorageUsage
 from app.routes.memory import router as memory_router
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.upload import router as upload_router
@@ -8,12 +10,34 @@ from app.routes.upload import router as upload_router
 from app.routes.auth import router as auth_router
 from app.routes.conversations import router as conversations_router
 from app.routes.chat import router as chat_router
-from fastapi.staticfiles import StaticFiles
+from app.routes.jobs import router as jobs_router
+from app.routes.stats import router as stats_router
+from app.routes.metrics import router as metrics_router
+from app.services.job_service import start_job_workers, stop_job_workers
+from app.services.clients import close_clients
+from app.services.auth_service import shutdown_hash_executor
+from app.services.variant_service import shutdown_variant_pipeline
+from app.services.storage_gc import start_storage_gc, stop_storage_gc
+from app.services.static_files import AssetFiles
+from app.services.metrics import MetricsMiddleware, instrument_engine
+from app.services.storage.base import BLOB_PREFIXES
 import os
 from fastapi.responses import FileResponse
 
 
-app = FastAPI(title="Vizzy Chat API", version="0.0.1")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_job_workers()
+    start_storage_gc()
+    yield
+    await stop_storage_gc()
+    await stop_job_workers()
+    await shutdown_variant_pipeline()
+    await close_clients()
+    shutdown_hash_executor()
+
+
+app = FastAPI(title="Vizzy Chat API", version="0.0.1", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -22,23 +46,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# outermost, so a request's time includes everything below it
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+
 Base.metadata.create_all(bind=engine)
+ensure_indexes()
 
 app.include_router(auth_router)
 app.include_router(conversations_router)
 app.include_router(chat_router)
 app.include_router(memory_router)
 app.include_router(upload_router)
+app.include_router(jobs_router)
+app.include_router(stats_router)
+if METRICS_ENABLED:
+    app.include_router(metrics_router)
 os.makedirs("storage/generated", exist_ok=True)
 os.makedirs("storage/tmp", exist_ok=True)
 
-app.mount("/storage", StaticFiles(directory="storage"), name="storage")
-app.mount("/mockups", StaticFiles(directory="mockups"), name="mockups")
+# generated blobs, variants and uploads are never rewritten under the same name
+app.mount("/storage", AssetFiles(directory="storage", immutable_dirs=BLOB_PREFIXES + ("tmp",)), name="storage")
+app.mount("/mockups", AssetFiles(directory="mockups"), name="mockups")
 
 
 FRONTEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "frontend"))
 
-app.mount("/frontend", StaticFiles(directory=FRONTEND_PATH), name="frontend")
+app.mount("/frontend", AssetFiles(directory=FRONTEND_PATH, compress=True), name="frontend")
 @app.get("/app")
 def serve_app():
     return FileResponse(os.path.join(FRONTEND_PATH, "index.html"))
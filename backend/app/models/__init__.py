@@ -4,3 +4,8 @@ from .message import Message
 from .asset import Asset
 from .user_memory import UserMemory
 from .conversation_state import ConversationState
+from .conversation_summary import ConversationSummary
+from .generation_job import GenerationJob
+from .generation_cache import GenerationCacheEntry
+from .asset_variant import AssetVariant
+from .user_storage_usage import UserStorageUsage
@@ -12,7 +12,8 @@ class Asset(Base):
     message_id = Column(Integer, ForeignKey("messages.id"), nullable=False, index=True)
 
     type = Column(String, nullable=False) 
-    url = Column(String, nullable=False)
+    # indexed for storage GC / quota lookups by file
+    url = Column(String, nullable=False, index=True)
 
     prompt_used = Column(Text, nullable=True)
     model_used = Column(String, nullable=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+from app.db import Base
+
+
+class AssetVariant(Base):
+    __tablename__ = "asset_variants"
+    __table_args__ = (
+        UniqueConstraint("source_url", "name", "format", name="uq_asset_variants_source_name_format"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # keyed by the original image, not the asset row: generated images are
+    # content-addressed, so every asset showing the same image (cache hits too)
+    # shares one set of variants
+    source_url = Column(String, nullable=False, index=True)
+
+    name = Column(String, nullable=False)  # "thumb" / "medium"
+    format = Column(String, nullable=False)  # "avif" / "webp"
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+
+    url = Column(String, nullable=False, index=True)
+    size_bytes = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
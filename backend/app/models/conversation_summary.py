@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Text
+from datetime import datetime
+from app.db import Base
+
+
+class ConversationSummary(Base):
+    """
+    Rolling summary of the older part of a conversation, sent to the planner
+    instead of those messages. Unlike ConversationState it outlives final turns.
+    """
+    __tablename__ = "conversation_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    conversation_id = Column(
+        Integer,
+        ForeignKey("conversations.id"),
+        nullable=False,
+        unique=True,
+        index=True
+    )
+
+    summary = Column(Text, nullable=False, default="")
+
+    # every message up to this id is folded into the summary
+    covered_message_id = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
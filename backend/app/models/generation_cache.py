@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from app.db import Base
+
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # sha256 of (normalized prompt, aspect_ratio, model, num_outputs)
+    cache_key = Column(String, nullable=False, unique=True, index=True)
+
+    prompt = Column(Text, nullable=False)
+    aspect_ratio = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    num_outputs = Column(Integer, nullable=False)
+
+    # JSON list of asset urls
+    urls = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from datetime import datetime
+from app.db import Base
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # placeholder assistant message the generated assets get attached to
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    provider = Column(String, nullable=False)
+
+    # queued -> running -> done | failed
+    status = Column(String, nullable=False, default="queued", index=True)
+
+    prompt = Column(Text, nullable=False)
+    image_url = Column(String, nullable=True)
+    num_outputs = Column(Integer, nullable=False, default=4)
+    aspect_ratio = Column(String, nullable=False, default="1:1")
+
+    completed_outputs = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db import Base
@@ -6,6 +6,10 @@ from app.db import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # history loads: last N messages of one conversation
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
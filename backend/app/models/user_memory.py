@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from datetime import datetime
 from app.db import Base
 
 
 class UserMemory(Base):
     __tablename__ = "user_memory"
+    __table_args__ = (
+        # last-N reads and the FIFO trim
+        Index("ix_user_memory_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
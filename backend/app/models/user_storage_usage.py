@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey
+from datetime import datetime
+from app.db import Base
+
+
+class UserStorageUsage(Base):
+    __tablename__ = "user_storage_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # bytes of generated images this user's assets point at (each image counted once per user).
+    # Recomputed by every storage GC sweep, bumped in between as jobs finish.
+    used_bytes = Column(BigInteger, nullable=False, default=0)
+    files = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.models.user import User
-from app.services.auth_service import hash_password, verify_password
+from app.services.principal_cache import Principal
+from app.services.auth_service import hash_password_async, verify_and_update_async
 from app.services.jwt_service import create_access_token
 from app.routes.schemas import SignupRequest, LoginRequest, AuthResponse, UserResponse
 from app.routes.deps import get_current_user
@@ -11,39 +13,76 @@ from app.routes.deps import get_current_user
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
+# ----------------------------
+# DB helpers (threadpool); hashing runs on its own executor in between
+# ----------------------------
+def _email_taken(db: Session, email: str) -> bool:
+    try:
+        return db.query(User.id).filter(User.email == email).first() is not None
+    finally:
+        db.close()
+
+
+def _create_user(db: Session, email: str, password_hash: str) -> User:
+    try:
+        user = User(email=email, password_hash=password_hash)
+        db.add(user)
+        db.commit()
+        return user
+    finally:
+        db.close()
+
+
+def _find_user(db: Session, email: str):
+    try:
+        return db.query(User.id, User.password_hash).filter(User.email == email).first()
+    finally:
+        db.close()
+
+
+def _update_password_hash(db: Session, user_id: int, password_hash: str):
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user:
+            user.password_hash = password_hash
+            db.commit()
+    finally:
+        db.close()
+
+
 @router.post("/signup", response_model=AuthResponse)
-def signup(payload: SignupRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
+async def signup(payload: SignupRequest, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_email_taken, db, payload.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    user = User(
-        email=payload.email,
-        password_hash=hash_password(payload.password)
-    )
+    password_hash = await hash_password_async(payload.password)
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = await run_in_threadpool(_create_user, db, payload.email, password_hash)
 
     token = create_access_token({"user_id": user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.post("/login", response_model=AuthResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
+async def login(payload: LoginRequest, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, payload.email)
 
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    if not verify_password(payload.password, user.password_hash):
+    valid, new_hash = await verify_and_update_async(payload.password, user.password_hash)
+
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # stored hash used an old BCRYPT_ROUNDS: swap in the re-hashed one
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user.id, new_hash)
+
     token = create_access_token({"user_id": user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
-def me(current_user: User = Depends(get_current_user)):
+def me(current_user: Principal = Depends(get_current_user)):
     return {"id": current_user.id, "email": current_user.email}
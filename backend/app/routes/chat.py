@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import json
-from app.services.memory_service import get_last_memory, format_memory_for_prompt
+import asyncio
+from app.services.memory_service import get_formatted_preferences
 from app.services.vision_planner_service import run_vision_planner
 
 from app.services.memory_service import add_memory_row
@@ -9,53 +12,58 @@ from app.services.memory_service import add_memory_row
 from app.db import get_db
 from app.routes.deps import get_current_user
 
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.asset import Asset
+from app.models.generation_job import GenerationJob
 
 from app.routes.schemas import (
     ChatSendRequest,
     ChatSendResponse,
     MessageWithAssetsResponse,
-    AssetResponse
+    AssetResponse,
+    AssetVariantResponse
 )
 
-from app.services.image_generation.image_generator_service import generate_images, transform_images
-from app.services.history_service import get_conversation_history
+from app.services.job_service import create_generation_job, submit_job, subscribe_job, unsubscribe_job
+from app.services.generation_cache import lookup_cached_generation, CACHE_HIT_PREFIX
+from app.services.storage_quota import check_quota
+from app.services.variant_service import get_variants
+from app.services.image_generation.image_generator_service import generation_model_name
+from app.services.planner_context import PlannerContext, assemble_planner_context
+from app.services.intent_classifier import fast_path_plan
+from app.services.metrics import begin_turn, turn_stage, end_turn
 from app.services.planner_service import run_planner
-from app.services.conversation_state_service import (
-    get_state,
-    set_collecting_state,
-    clear_state
-)
+from app.services.conversation_state_service import set_collecting_state, clear_state
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
-@router.post("/send", response_model=ChatSendResponse)
-def chat_send(
-    payload: ChatSendRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    # ----------------------------
-    # Step 1: Load / Create conversation
-    # ----------------------------
-    convo = None
-    preferences_memory_text = None
+# ----------------------------
+# DB helpers (sync, run in threadpool so the event loop never blocks on the DB)
+# ----------------------------
+async def _run_db(db: Session, fn, *args):
+    # Close the session after each step so its pooled connection is returned
+    # instead of being held while we await the planner / image provider.
+    def step():
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(step)
 
-    if payload.use_preferences:
-        rows = get_last_memory(db, current_user.id, limit=25)
-        preferences_memory_text = format_memory_for_prompt(rows)
 
+def _load_or_create_conversation(db: Session, user_id: int, payload: ChatSendRequest) -> Conversation:
+    convo = None
 
     if payload.conversation_id:
         convo = (
             db.query(Conversation)
             .filter(
                 Conversation.id == payload.conversation_id,
-                Conversation.user_id == current_user.id
+                Conversation.user_id == user_id
             )
             .first()
         )
@@ -67,45 +75,221 @@ def chat_send(
         if payload.text and payload.text.strip():
             title = payload.text.strip()[:40]
 
-        convo = Conversation(user_id=current_user.id, title=title)
+        convo = Conversation(user_id=user_id, title=title)
         db.add(convo)
+        db.flush()
+
+    return convo
+
+
+def _load_preferences(db: Session, user_id: int) -> str:
+    return get_formatted_preferences(db, user_id)
+
+
+def _save_message(db: Session, conversation_id: int, role: str, text: str | None) -> Message:
+    # flush only: ids/defaults are filled in, the turn step commits once at the end
+    msg = Message(
+        conversation_id=conversation_id,
+        role=role,
+        text=text
+    )
+    db.add(msg)
+    db.flush()
+    return msg
+
+
+# ----------------------------
+# Units of work: each runs in one threadpool hop and commits once
+# ----------------------------
+def _begin_turn(db: Session, user_id: int, payload: ChatSendRequest):
+    # over quota: refuse before the planner round-trip is paid for, not after
+    check_quota(db, user_id)
+
+    preferences_memory_text = None
+
+    if payload.use_preferences:
+        with turn_stage("load_preferences"):
+            preferences_memory_text = _load_preferences(db, user_id)
+
+    with turn_stage("load_conversation"):
+        convo = _load_or_create_conversation(db, user_id, payload)
+
+    with turn_stage("save_user_message"):
+        user_msg = _save_message(db, convo.id, "user", payload.text)
         db.commit()
-        db.refresh(convo)
 
-    # ----------------------------
-    # Step 2: Save user message
-    # ----------------------------
+    with turn_stage("load_context"):
+        # the message just saved goes to the planner on its own, not as history
+        planner_context = assemble_planner_context(
+            db,
+            convo.id,
+            (payload.text or "").strip(),
+            preferences_memory_text,
+            exclude_message_id=user_msg.id
+        )
+
+        # older turns were folded into the summary
+        if db.new or db.dirty:
+            db.commit()
+
+    return convo, user_msg, planner_context
+
+
+def _save_question_turn(db: Session, conversation_id: int, question: str, draft_prompt: str | None) -> Message:
+    assistant_msg = _save_message(db, conversation_id, "assistant", question)
+
+    # Save collecting state
+    set_collecting_state(
+        db,
+        conversation_id=conversation_id,
+        draft_prompt=draft_prompt,
+        questions=[question]
+    )
+
+    db.commit()
+    return assistant_msg
+
+
+def _save_final_turn(
+    db: Session,
+    user_id: int,
+    conversation_id: int,
+    final_prompt: str,
+    num_outputs: int,
+    aspect_ratio: str,
+    payload: ChatSendRequest
+) -> tuple[Message, GenerationJob | None, list[Asset]]:
+    # Save final prompt into preferences memory (only if enabled)
+    if payload.use_preferences and final_prompt:
+        add_memory_row(
+            db=db,
+            user_id=user_id,
+            conversation_id=conversation_id,
+            memory_type="text",
+            text=final_prompt
+        )
+
+    # IMPORTANT: Clear state now
+    clear_state(db, conversation_id)
+
+    # placeholder assistant message (store final prompt!)
+    assistant_msg = _save_message(db, conversation_id, "assistant", final_prompt)
+
+    # Same prompt generated before -> reuse its images (transforms depend on the input image, never cached)
+    model = generation_model_name()
+    urls = None
+
+    if payload.use_cache and not payload.image_url:
+        urls = lookup_cached_generation(db, final_prompt, aspect_ratio, model, num_outputs)
+
+    job = None
+    assets = []
+
+    if urls:
+        assets = [
+            Asset(
+                message_id=assistant_msg.id,
+                type="image",
+                url=url,
+                prompt_used=final_prompt,
+                model_used=f"{CACHE_HIT_PREFIX}{model}"
+            )
+            for url in urls
+        ]
+        db.add_all(assets)
+    else:
+        # backstop for usage that grew while the planner ran (checked in _begin_turn too);
+        # rolls back this turn's writes, the user message is already saved
+        check_quota(db, user_id)
+
+        job = create_generation_job(
+            db,
+            user_id=user_id,
+            conversation_id=conversation_id,
+            message_id=assistant_msg.id,
+            prompt=final_prompt,
+            num_outputs=num_outputs,
+            aspect_ratio=aspect_ratio,
+            image_url=payload.image_url
+        )
+
+    db.commit()
+    return assistant_msg, job, assets
+
+
+def _message_response(
+    msg: Message,
+    assets: list[Asset] | None = None,
+    variants: dict | None = None
+) -> MessageWithAssetsResponse:
+    variants = variants or {}
+
+    return MessageWithAssetsResponse(
+        id=msg.id,
+        role=msg.role,
+        text=msg.text,
+        created_at=msg.created_at,
+        assets=[
+            AssetResponse(
+                id=a.id,
+                type=a.type,
+                url=a.url,
+                prompt_used=a.prompt_used,
+                model_used=a.model_used,
+                created_at=a.created_at,
+                variants=[
+                    AssetVariantResponse(name=v.name, format=v.format, width=v.width, height=v.height, url=v.url)
+                    for v in variants.get(a.url, [])
+                ]
+            )
+            for a in (assets or [])
+        ]
+    )
+
+
+async def _asset_variants(db: Session, assets: list[Asset]) -> dict:
+    # cache hits (and re-generated identical bytes) may already have their AVIF/WebP variants
+    if not assets:
+        return {}
+    return await _run_db(db, get_variants, [a.url for a in assets])
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# ----------------------------
+# Turn steps shared by /send and /stream
+# ----------------------------
+async def _start_turn(db: Session, current_user: Principal, payload: ChatSendRequest):
     user_text = (payload.text or "").strip()
 
     if not user_text and not payload.image_url:
         raise HTTPException(status_code=400, detail="Please type something or upload an image.")
 
-    user_msg = Message(
-        conversation_id=convo.id,
-        role="user",
-        text=payload.text
-    )
-    db.add(user_msg)
-    db.commit()
-    db.refresh(user_msg)
-    # Save user prompt into memory (FIFO) only if enabled
-    
+    begin_turn()
 
     # ----------------------------
-    # Step 3: Load state + history
+    # Step 1-3: Load / Create conversation, save user message, load state + history
     # ----------------------------
-    state = get_state(db, convo.id)
+    convo, user_msg, planner_context = await _run_db(db, _begin_turn, current_user.id, payload)
 
-    draft_prompt = state.draft_prompt if state else None
-    pending_questions = []
+    return convo, user_msg, user_text, planner_context
 
-    if state and state.pending_questions:
-        try:
-            pending_questions = json.loads(state.pending_questions)
-        except:
-            pending_questions = []
 
-    history = get_conversation_history(db, convo.id, limit=20)
+async def _plan_turn(
+    payload: ChatSendRequest,
+    user_text: str,
+    planner_context: PlannerContext,
+    on_question_delta=None
+) -> tuple[dict, str | None]:
+    # ----------------------------
+    # Step 4a: Plain confirmation of a complete draft -> final prompt, no planner call
+    # ----------------------------
+    with turn_stage("fast_path"):
+        planner = fast_path_plan(user_text, planner_context)
+    if planner:
+        return planner, planner_context.draft_prompt
 
     # ----------------------------
     # Step 4: Call Groq planner
@@ -113,27 +297,35 @@ def chat_send(
     try:
         # If user uploaded an image -> use Vision planner (OpenAI)
         if payload.image_url:
-            planner = run_vision_planner(
-                user_message=user_text,
-                image_url=payload.image_url,
-                history=history,
-                draft_prompt=draft_prompt,
-                pending_questions=pending_questions,
-                preferences_memory=preferences_memory_text
-            )
+            with turn_stage("vision_planner"):
+                planner = await run_vision_planner(
+                    user_message=user_text,
+                    image_url=payload.image_url,
+                    context=planner_context,
+                    on_question_delta=on_question_delta
+                )
         else:
-            planner = run_planner(
-                user_message=user_text,
-                history=history,
-                draft_prompt=draft_prompt,
-                pending_questions=pending_questions,
-                preferences_memory=preferences_memory_text
-            )
-
-
+            with turn_stage("planner"):
+                planner = await run_planner(
+                    user_message=user_text,
+                    context=planner_context,
+                    on_question_delta=on_question_delta
+                )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return planner, planner_context.draft_prompt
+
+
+async def _finish_turn(
+    db: Session,
+    current_user: Principal,
+    payload: ChatSendRequest,
+    convo: Conversation,
+    user_text: str,
+    draft_prompt: str | None,
+    planner: dict
+) -> tuple[Message, GenerationJob | None, list[Asset]]:
     # ----------------------------
     # Case A: Planner asks questions
     # ----------------------------
@@ -143,43 +335,16 @@ def chat_send(
         if not questions:
             questions = ["What would you like to generate?"]
 
-        assistant_text = questions[0]
-
-
-        assistant_msg = Message(
-            conversation_id=convo.id,
-            role="assistant",
-            text=assistant_text
-        )
-        db.add(assistant_msg)
-        db.commit()
-        db.refresh(assistant_msg)
-
-        # Save collecting state
-        set_collecting_state(
-            db,
-            conversation_id=convo.id,
-            draft_prompt=planner.get("draft_prompt") or draft_prompt or user_text,
-            questions=questions
-        )
-
-        return ChatSendResponse(
-            conversation_id=convo.id,
-            user_message=MessageWithAssetsResponse(
-                id=user_msg.id,
-                role=user_msg.role,
-                text=user_msg.text,
-                created_at=user_msg.created_at,
-                assets=[]
-            ),
-            assistant_message=MessageWithAssetsResponse(
-                id=assistant_msg.id,
-                role=assistant_msg.role,
-                text=assistant_msg.text,
-                created_at=assistant_msg.created_at,
-                assets=[]
+        with turn_stage("save_reply"):
+            assistant_msg = await _run_db(
+                db,
+                _save_question_turn,
+                convo.id,
+                questions[0],
+                planner.get("draft_prompt") or draft_prompt or user_text
             )
-        )
+
+        return assistant_msg, None, []
 
     # ----------------------------
     # Case B: Planner returns final prompt
@@ -187,99 +352,167 @@ def chat_send(
     if planner["type"] != "final":
         raise HTTPException(status_code=500, detail=f"Planner returned invalid type: {planner.get('type')}")
 
-    final_prompt = planner["final_prompt"]
-    # Save final prompt into preferences memory (only if enabled)
-    if payload.use_preferences and final_prompt:
-        add_memory_row(
-            db=db,
-            user_id=current_user.id,
-            conversation_id=convo.id,
-            memory_type="text",
-            text=final_prompt
+    # ----------------------------
+    # Step 5: Save memory + assistant message, then either cached assets or a generation job
+    # ----------------------------
+    with turn_stage("save_reply"):
+        return await _run_db(
+            db,
+            _save_final_turn,
+            current_user.id,
+            convo.id,
+            planner["final_prompt"],
+            planner.get("num_outputs", 4),
+            planner.get("aspect_ratio", "1:1"),
+            payload
         )
 
-    num_outputs = planner.get("num_outputs", 4)
-    aspect_ratio = planner.get("aspect_ratio", "1:1")
 
-    # IMPORTANT: Clear state now
-    clear_state(db, convo.id)
+def _turn_type(planner: dict, job: GenerationJob | None) -> str:
+    if planner["type"] == "question":
+        return "question"
+    return "final" if job else "cached"
+
+
+@router.post("/send", response_model=ChatSendResponse)
+async def chat_send(
+    payload: ChatSendRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    convo, user_msg, user_text, planner_context = await _start_turn(db, current_user, payload)
 
-    # ----------------------------
-    # Step 5: Generate images
-    # ----------------------------
     try:
-        if payload.image_url:
-            generated_urls, model_used = transform_images(
-                prompt=final_prompt,
-                image_url=payload.image_url,
-                num_outputs=num_outputs
-            )
-        else:
-            generated_urls, model_used = generate_images(
-                prompt=final_prompt,
-                num_outputs=num_outputs,
-                aspect_ratio=aspect_ratio
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Image generation failed: {str(e)}")
+        planner, draft_prompt = await _plan_turn(payload, user_text, planner_context)
 
-    # ----------------------------
-    # Step 6: Save assistant message (store final prompt!)
-    # ----------------------------
-    assistant_msg = Message(
-        conversation_id=convo.id,
-        role="assistant",
-        text=final_prompt
-    )
-    db.add(assistant_msg)
-    db.commit()
-    db.refresh(assistant_msg)
+        assistant_msg, job, assets = await _finish_turn(db, current_user, payload, convo, user_text, draft_prompt, planner)
+    except HTTPException:
+        end_turn("error")
+        raise
+
+    end_turn(_turn_type(planner, job))
 
     # ----------------------------
-    # Step 7: Save assets
+    # Step 6: Return right away, assets arrive via /jobs/{id} (cache hits carry them already)
     # ----------------------------
-    saved_assets = []
+    if job:
+        submit_job(job.id)
 
-    for url in generated_urls:
-        asset = Asset(
-            message_id=assistant_msg.id,
-            type="image",
-            url=url,
-            prompt_used=final_prompt,
-            model_used=model_used
-        )
-        db.add(asset)
-        db.commit()
-        db.refresh(asset)
-        saved_assets.append(asset)
+    variants = await _asset_variants(db, assets)
 
-    # ----------------------------
-    # Step 8: Return response
-    # ----------------------------
     return ChatSendResponse(
         conversation_id=convo.id,
-        user_message=MessageWithAssetsResponse(
-            id=user_msg.id,
-            role=user_msg.role,
-            text=user_msg.text,
-            created_at=user_msg.created_at,
-            assets=[]
-        ),
-        assistant_message=MessageWithAssetsResponse(
-            id=assistant_msg.id,
-            role=assistant_msg.role,
-            text=assistant_msg.text,
-            created_at=assistant_msg.created_at,
-            assets=[
-                AssetResponse(
-                    id=a.id,
-                    type=a.type,
-                    url=a.url,
-                    prompt_used=a.prompt_used,
-                    model_used=a.model_used,
-                    created_at=a.created_at
-                )
-                for a in saved_assets
-            ]
+        user_message=_message_response(user_msg),
+        assistant_message=_message_response(assistant_msg, assets, variants),
+        job_id=job.id if job else None
+    )
+
+
+@router.post("/stream")
+async def chat_stream(
+    payload: ChatSendRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Server-sent-events version of /chat/send.
+
+    Events: conversation, token (planner question text as it streams),
+    question | final, image (one per generated file), done, error.
+    """
+    # validation errors still come back as plain HTTP errors
+    convo, user_msg, user_text, planner_context = await _start_turn(db, current_user, payload)
+
+    async def events():
+        yield _sse("conversation", {
+            "conversation_id": convo.id,
+            "user_message": _message_response(user_msg).model_dump(mode="json")
+        })
+
+        tokens = asyncio.Queue()
+
+        async def on_question_delta(text: str):
+            tokens.put_nowait(text)
+
+        planner_task = asyncio.create_task(
+            _plan_turn(payload, user_text, planner_context, on_question_delta)
         )
+
+        try:
+            while True:
+                getter = asyncio.ensure_future(tokens.get())
+                await asyncio.wait({getter, planner_task}, return_when=asyncio.FIRST_COMPLETED)
+
+                if getter.done():
+                    yield _sse("token", {"text": getter.result()})
+                    continue
+
+                getter.cancel()
+                while not tokens.empty():
+                    yield _sse("token", {"text": tokens.get_nowait()})
+                break
+
+            planner, draft_prompt = planner_task.result()
+            assistant_msg, job, assets = await _finish_turn(
+                db, current_user, payload, convo, user_text, draft_prompt, planner
+            )
+        except HTTPException as e:
+            end_turn("error")
+            yield _sse("error", {"detail": e.detail})
+            return
+        finally:
+            if not planner_task.done():
+                planner_task.cancel()
+
+        end_turn(_turn_type(planner, job))
+
+        if planner["type"] == "question":
+            yield _sse("question", {"assistant_message": _message_response(assistant_msg).model_dump(mode="json")})
+            return
+
+        if not job:
+            # cache hit: images are already there
+            yield _sse("final", {
+                "job_id": None,
+                "assistant_message": _message_response(assistant_msg).model_dump(mode="json")
+            })
+            variants = await _asset_variants(db, assets)
+            yield _sse("done", {
+                "job_id": None,
+                "assistant_message": _message_response(assistant_msg, assets, variants).model_dump(mode="json")
+            })
+            return
+
+        yield _sse("final", {
+            "job_id": job.id,
+            "assistant_message": _message_response(assistant_msg).model_dump(mode="json")
+        })
+
+        # subscribe before the job is queued so no image event is missed
+        job_events = subscribe_job(job.id)
+        submit_job(job.id)
+
+        try:
+            while True:
+                event, data = await job_events.get()
+
+                if event == "image":
+                    yield _sse("image", data)
+                elif event == "done":
+                    variants = await _asset_variants(db, data["assets"])
+                    yield _sse("done", {
+                        "job_id": job.id,
+                        "assistant_message": _message_response(assistant_msg, data["assets"], variants).model_dump(mode="json")
+                    })
+                    return
+                elif event == "failed":
+                    yield _sse("error", {"job_id": job.id, "detail": data["error"]})
+                    return
+        finally:
+            unsubscribe_job(job.id, job_events)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
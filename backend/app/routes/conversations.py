@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 
 from app.db import get_db
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.asset import Asset
+from app.models.generation_job import GenerationJob
 from app.routes.deps import get_current_user
-from app.models.user import User
+from app.services.principal_cache import Principal
+from app.services.variant_service import get_variants
+from app.services.storage_gc import release_files
+from app.services.conversation_state_service import delete_conversation_context
 from app.routes.schemas import (
     ConversationCreateRequest,
     ConversationResponse,
     ConversationDetailResponse,
     MessageWithAssetsResponse,
-    AssetResponse
+    AssetResponse,
+    AssetVariantResponse
 )
 
 router = APIRouter(prefix="/conversations", tags=["Conversations"])
@@ -23,7 +28,7 @@ router = APIRouter(prefix="/conversations", tags=["Conversations"])
 def create_conversation(
     payload: ConversationCreateRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     title = payload.title or "New Chat"
 
@@ -38,7 +43,7 @@ def create_conversation(
 @router.get("", response_model=List[ConversationResponse])
 def list_conversations(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     convos = (
         db.query(Conversation)
@@ -52,8 +57,11 @@ def list_conversations(
 @router.get("/{conversation_id}", response_model=ConversationDetailResponse)
 def get_conversation(
     conversation_id: int,
+    before: Optional[int] = Query(None, description="Only messages older than this message id"),
+    after: Optional[int] = Query(None, description="Only messages newer than this message id"),
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     convo = (
         db.query(Conversation)
@@ -64,9 +72,55 @@ def get_conversation(
     if not convo:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+    # one query for the page + one for all of its assets (no per-message lazy loads)
+    query = (
+        db.query(Message)
+        .options(selectinload(Message.assets))
+        .filter(Message.conversation_id == convo.id)
+    )
+
+    if after is not None:
+        # newer messages, oldest first
+        rows = query.filter(Message.id > after).order_by(Message.id.asc()).limit(limit + 1).all()
+        has_more_after = len(rows) > limit
+        messages = rows[:limit]
+
+        # anything older than the page's first message (or the cursor, for an empty page)
+        oldest = messages[0].id if messages else after + 1
+        has_more_before = db.query(
+            db.query(Message.id)
+            .filter(Message.conversation_id == convo.id, Message.id < oldest)
+            .exists()
+        ).scalar()
+    else:
+        # latest page (or the page before a cursor), fetched newest first then flipped
+        if before is not None:
+            query = query.filter(Message.id < before)
+
+        rows = query.order_by(Message.id.desc()).limit(limit + 1).all()
+        has_more_before = len(rows) > limit
+        messages = list(reversed(rows[:limit]))
+        has_more_after = before is not None
+
+    # thumbnails etc. for every asset on the page in one more query
+    variants = get_variants(db, [a.url for msg in messages for a in msg.assets])
+
+    # placeholders whose images are still being generated, so the client can pick up polling
+    waiting = [msg.id for msg in messages if msg.role == "assistant" and not msg.assets]
+    pending_jobs = {}
+    if waiting:
+        pending_jobs = dict(
+            db.query(GenerationJob.message_id, GenerationJob.id)
+            .filter(GenerationJob.message_id.in_(waiting), GenerationJob.status.in_(["queued", "running"]))
+            .all()
+        )
+
     messages_out = []
 
-    for msg in convo.messages:
+    for msg in messages:
         assets_out = [
             AssetResponse(
                 id=a.id,
@@ -74,7 +128,11 @@ def get_conversation(
                 url=a.url,
                 prompt_used=a.prompt_used,
                 model_used=a.model_used,
-                created_at=a.created_at
+                created_at=a.created_at,
+                variants=[
+                    AssetVariantResponse(name=v.name, format=v.format, width=v.width, height=v.height, url=v.url)
+                    for v in variants.get(a.url, [])
+                ]
             )
             for a in msg.assets
         ]
@@ -85,7 +143,8 @@ def get_conversation(
                 role=msg.role,
                 text=msg.text,
                 created_at=msg.created_at,
-                assets=assets_out
+                assets=assets_out,
+                job_id=pending_jobs.get(msg.id)
             )
         )
 
@@ -93,14 +152,17 @@ def get_conversation(
         id=convo.id,
         title=convo.title,
         created_at=convo.created_at,
-        messages=messages_out
+        messages=messages_out,
+        has_more_before=has_more_before,
+        has_more_after=has_more_after
     )
 
 @router.delete("/{conversation_id}")
 def delete_conversation(
     conversation_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     convo = (
         db.query(Conversation)
@@ -114,7 +176,16 @@ def delete_conversation(
     if not convo:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
+    urls = [
+        r.url for r in
+        db.query(Asset.url).join(Message, Asset.message_id == Message.id).filter(Message.conversation_id == convo.id)
+    ]
+
+    delete_conversation_context(db, convo.id)
     db.delete(convo)
     db.commit()
 
+    # files go after the response (S3 deletes are network calls); the GC sweep is the backstop
+    background_tasks.add_task(release_files, current_user.id, urls)
+
     return {"status": "ok", "message": "Conversation deleted"}
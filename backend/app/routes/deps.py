@@ -1,20 +1,37 @@
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.services.jwt_service import decode_access_token
+from app.services.principal_cache import Principal, get_cached_principal, cache_principal, principal_version
 from app.models.user import User
 
 security = HTTPBearer()
 
 
-def get_current_user(
+def _load_principal(db: Session, user_id: int) -> Principal | None:
+    row = db.query(User.id, User.email).filter(User.id == user_id).first()
+
+    # End the read transaction so the pooled connection goes back right away
+    # (async routes may hold the session across long awaits).
+    db.commit()
+
+    return Principal(id=row.id, email=row.email) if row else None
+
+
+# async so a cache hit (most polling requests) needs neither a threadpool slot nor the DB
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     token = credentials.credentials
 
+    principal = get_cached_principal(token)
+    if principal:
+        return principal
+
     try:
         payload = decode_access_token(token)
         user_id = payload.get("user_id")
@@ -24,9 +41,12 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    version = principal_version(user_id)
+    principal = await run_in_threadpool(_load_principal, db, user_id)
 
-    if not user:
+    if not principal:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    cache_principal(token, principal, version, payload.get("exp"))
+
+    return principal
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.routes.deps import get_current_user
+from app.services.principal_cache import Principal
+from app.routes.schemas import JobResponse, AssetResponse, AssetVariantResponse
+from app.services.job_service import get_job, get_job_assets
+from app.services.variant_service import get_variants
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    job = get_job(db, job_id, current_user.id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    assets = get_job_assets(db, job) if job.status == "done" else []
+    variants = get_variants(db, [a.url for a in assets])
+
+    return JobResponse(
+        id=job.id,
+        status=job.status,
+        conversation_id=job.conversation_id,
+        message_id=job.message_id,
+        num_outputs=job.num_outputs,
+        completed_outputs=job.completed_outputs,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        assets=[
+            AssetResponse(
+                id=a.id,
+                type=a.type,
+                url=a.url,
+                prompt_used=a.prompt_used,
+                model_used=a.model_used,
+                created_at=a.created_at,
+                variants=[
+                    AssetVariantResponse(name=v.name, format=v.format, width=v.width, height=v.height, url=v.url)
+                    for v in variants.get(a.url, [])
+                ]
+            )
+            for a in assets
+        ]
+    )
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.routes.deps import get_current_user
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.memory_service import clear_memory
 from app.services.memory_service import get_last_memory
 
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/memory", tags=["Memory"])
 @router.post("/reset")
 def reset_memory(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     clear_memory(db, current_user.id)
     return {"status": "ok", "message": "Memory reset successful"}
@@ -21,7 +21,7 @@ def reset_memory(
 @router.get("")
 def get_memory(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     rows = get_last_memory(db, current_user.id, limit=25)
 
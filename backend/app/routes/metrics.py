@@ -0,0 +1,22 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.config import METRICS_TOKEN, METRICS_PUBLIC
+from app.services.metrics import render_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(authorization: str | None = Header(default=None)):
+    # scrapers can't log in, so this takes a static token instead of a user JWT
+    if METRICS_TOKEN:
+        if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif not METRICS_PUBLIC:
+        # per-route traffic and upstream latencies are not for everyone
+        raise HTTPException(status_code=401, detail="Set METRICS_TOKEN (or METRICS_PUBLIC=true) to serve metrics")
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
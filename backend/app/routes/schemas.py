@@ -38,6 +38,14 @@ class MessageResponse(BaseModel):
     created_at: datetime
 
 
+class AssetVariantResponse(BaseModel):
+    name: str
+    format: str
+    width: int
+    height: int
+    url: str
+
+
 class AssetResponse(BaseModel):
     id: int
     type: str
@@ -45,6 +53,8 @@ class AssetResponse(BaseModel):
     prompt_used: Optional[str]
     model_used: Optional[str]
     created_at: datetime
+    # downscaled copies (smallest first); empty until built, then use url
+    variants: List[AssetVariantResponse] = []
 
 
 class MessageWithAssetsResponse(BaseModel):
@@ -53,6 +63,8 @@ class MessageWithAssetsResponse(BaseModel):
     text: Optional[str]
     created_at: datetime
     assets: List[AssetResponse] = []
+    # generation job still queued / running for this message (poll /jobs/{id})
+    job_id: Optional[int] = None
 
 
 class ConversationDetailResponse(BaseModel):
@@ -60,12 +72,16 @@ class ConversationDetailResponse(BaseModel):
     title: str
     created_at: datetime
     messages: List[MessageWithAssetsResponse] = []
+    # cursor pagination: pass messages[0].id as ?before= / messages[-1].id as ?after=
+    has_more_before: bool = False
+    has_more_after: bool = False
 
 class ChatSendRequest(BaseModel):
     conversation_id: Optional[int] = None
     text: Optional[str] = None
     image_url: Optional[str] = None
     use_preferences: bool = True
+    use_cache: bool = True
 
 
 
@@ -74,3 +90,18 @@ class ChatSendResponse(BaseModel):
     conversation_id: int
     user_message: MessageWithAssetsResponse
     assistant_message: MessageWithAssetsResponse
+    job_id: Optional[int] = None
+
+
+class JobResponse(BaseModel):
+    id: int
+    status: str
+    conversation_id: int
+    message_id: int
+    num_outputs: int
+    completed_outputs: int
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    assets: List[AssetResponse] = []
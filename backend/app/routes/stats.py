@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+
+from app.routes.deps import get_current_user
+from app.services.principal_cache import Principal
+from app.services.planner_cache import planner_cache_stats
+from app.services.planner_output import planner_output_stats
+from app.services.generation_cache import cache_stats
+from app.services.intent_classifier import fast_path_stats
+from app.services.storage_quota import get_usage
+from app.services.storage_gc import last_report
+from app.services.image_generation.resilience import provider_stats
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/cache")
+def get_cache_stats(current_user: Principal = Depends(get_current_user)):
+    return {
+        "planner": planner_cache_stats(),
+        "generation": cache_stats(),
+        # confirmations answered locally vs sent on to the planner
+        "fast_path": fast_path_stats()
+    }
+
+
+@router.get("/storage")
+def get_storage_stats(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return {
+        "usage": get_usage(db, current_user.id),
+        "last_gc": last_report()
+    }
+
+
+@router.get("/providers")
+def get_provider_stats(current_user: Principal = Depends(get_current_user)):
+    return provider_stats()
+
+
+@router.get("/planner")
+def get_planner_stats(current_user: Principal = Depends(get_current_user)):
+    # upstream calls per usable reply, local JSON repairs and re-asks, per planner
+    return planner_output_stats()
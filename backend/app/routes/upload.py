@@ -1,38 +1,33 @@
-import os
-import uuid
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, Depends, Request
 from app.routes.deps import get_current_user
-from app.models.user import User
-from app.config import BASE_URL
+from app.services.principal_cache import Principal
+from app.services.upload_service import receive_image_upload
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 ALLOWED_EXT = {"png", "jpg", "jpeg", "webp"}
 
 
-@router.post("/image")
+# The body is read as a stream (not as UploadFile) so a too-large file is
+# rejected mid-upload instead of being spooled whole first.
+@router.post("/image", openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+})
 async def upload_image(
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
 ):
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file uploaded")
+    upload = await receive_image_upload(request, "file", ALLOWED_EXT)
 
-    ext = file.filename.split(".")[-1].lower()
-
-    if ext not in ALLOWED_EXT:
-        raise HTTPException(status_code=400, detail="Only png/jpg/jpeg/webp allowed")
-
-    os.makedirs("storage/tmp", exist_ok=True)
-
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    out_path = os.path.join("storage", "tmp", filename)
-
-    contents = await file.read()
-
-    with open(out_path, "wb") as f:
-        f.write(contents)
-
-    url = f"{BASE_URL}/storage/tmp/{filename}"
-
-    return {"status": "ok", "image_url": url}
+    return {"status": "ok", "image_url": upload.url, "sha256": upload.sha256}
@@ -1,6 +1,24 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import BCRYPT_ROUNDS, AUTH_HASH_EXECUTOR, AUTH_HASH_WORKERS
+
+# min == max == default: hashes made with any other work factor report needs_update,
+# so changing BCRYPT_ROUNDS rehashes each user on their next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt gets its own small pool so a login burst can't take the threadpool
+# the DB steps of /chat/send run on
+_executor: Executor | None = None
 
 
 def hash_password(password: str) -> str:
@@ -9,3 +27,44 @@ def hash_password(password: str) -> str:
 
 def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
+
+
+def verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """(valid, new hash if the stored one uses an outdated work factor)"""
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+def _get_executor() -> Executor:
+    global _executor
+
+    if _executor is None:
+        if AUTH_HASH_EXECUTOR == "process":
+            # spawn, not fork: the server process already runs threads
+            _executor = ProcessPoolExecutor(
+                max_workers=AUTH_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+    return _executor
+
+
+async def _offload(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> tuple[bool, str | None]:
+    return await _offload(verify_and_update, password, password_hash)
+
+
+def shutdown_hash_executor():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
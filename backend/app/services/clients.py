@@ -0,0 +1,81 @@
+import httpx
+from groq import AsyncGroq
+from groq import DefaultAsyncHttpxClient as GroqHttpClient
+from openai import AsyncOpenAI
+from openai import DefaultAsyncHttpxClient as OpenAIHttpClient
+
+from app.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    GROQ_API_KEY,
+    GROQ_BASE_URL,
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT
+)
+
+# One long-lived client per upstream, so requests reuse keep-alive
+# connections (and TLS sessions) instead of paying setup on every call.
+# Closed from the FastAPI lifespan.
+_clients: dict[str, object] = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def get_groq_client() -> AsyncGroq:
+    if "groq" not in _clients:
+        _clients["groq"] = AsyncGroq(
+            api_key=GROQ_API_KEY,
+            base_url=GROQ_BASE_URL,
+            timeout=_timeout(),
+            http_client=GroqHttpClient(limits=_limits(), timeout=_timeout())
+        )
+    return _clients["groq"]
+
+
+def get_openai_client() -> AsyncOpenAI:
+    if "openai" not in _clients:
+        _clients["openai"] = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=_timeout(),
+            http_client=OpenAIHttpClient(limits=_limits(), timeout=_timeout())
+        )
+    return _clients["openai"]
+
+
+def get_openai_image_client() -> AsyncOpenAI:
+    """Same pool as get_openai_client, without the SDK's own retries: image requests retry in their provider guard."""
+    if "openai_images" not in _clients:
+        _clients["openai_images"] = get_openai_client().with_options(max_retries=0)
+    return _clients["openai_images"]
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Plain client for fetching input images etc."""
+    if "http" not in _clients:
+        _clients["http"] = httpx.AsyncClient(limits=_limits(), timeout=_timeout(), follow_redirects=True)
+    return _clients["http"]
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+
+    for client in clients:
+        if isinstance(client, httpx.AsyncClient):
+            await client.aclose()
+        else:
+            await client.close()
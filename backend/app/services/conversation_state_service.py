@@ -2,6 +2,9 @@ import json
 from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.conversation_state import ConversationState
+from app.models.conversation_summary import ConversationSummary
+
+# Writers here don't commit: they are part of the chat turn's unit of work.
 
 
 def get_state(db: Session, conversation_id: int) -> ConversationState | None:
@@ -38,8 +41,6 @@ def set_collecting_state(
         state.pending_questions = questions_json
         state.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(state)
     return state
 
 
@@ -48,4 +49,30 @@ def clear_state(db: Session, conversation_id: int):
     if not state:
         return
     db.delete(state)
-    db.commit()
+
+
+def get_summary(db: Session, conversation_id: int) -> ConversationSummary | None:
+    return (
+        db.query(ConversationSummary)
+        .filter(ConversationSummary.conversation_id == conversation_id)
+        .first()
+    )
+
+
+def save_summary(db: Session, conversation_id: int, summary: str, covered_message_id: int) -> ConversationSummary:
+    row = get_summary(db, conversation_id)
+
+    if not row:
+        row = ConversationSummary(conversation_id=conversation_id)
+        db.add(row)
+
+    row.summary = summary
+    row.covered_message_id = covered_message_id
+    row.updated_at = datetime.utcnow()
+    return row
+
+
+def delete_conversation_context(db: Session, conversation_id: int):
+    """State + summary rows, before the conversation they point at is deleted."""
+    db.query(ConversationState).filter(ConversationState.conversation_id == conversation_id).delete()
+    db.query(ConversationSummary).filter(ConversationSummary.conversation_id == conversation_id).delete()
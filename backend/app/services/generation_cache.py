@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import hashlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import (
+    GENERATION_CACHE_ENABLED,
+    GENERATION_CACHE_TTL_SECONDS,
+    GENERATION_CACHE_MAX_ENTRIES,
+    GENERATION_CACHE_MAX_BYTES
+)
+from app.models.generation_cache import GenerationCacheEntry
+from app.services.storage import get_storage
+from app.services.storage_resolver import local_path_for_url
+
+CACHE_HIT_PREFIX = "cache-hit:"
+
+# in-process counters, reset on restart
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def normalize_prompt(prompt: str) -> str:
+    text = re.sub(r"\s+", " ", (prompt or "").strip().lower())
+    return text.rstrip(" .!")
+
+
+def cache_key(prompt: str, aspect_ratio: str, model: str, num_outputs: int) -> str:
+    raw = json.dumps([normalize_prompt(prompt), aspect_ratio, model, int(num_outputs)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _files_exist(urls: list[str]) -> bool:
+    # local files only: a HEAD per blob on every lookup would cost more than the
+    # rare dangling remote URL
+    for url in urls:
+        path = local_path_for_url(url)
+        if path and not os.path.exists(path):
+            return False
+    return True
+
+
+def _size_of(urls: list[str]) -> int:
+    storage = get_storage()
+    return sum(storage.size(url) or 0 for url in urls)
+
+
+def _delete_entry(db: Session, entry: GenerationCacheEntry):
+    # row only: this runs inside the caller's transaction, and a rollback must
+    # not leave the row pointing at deleted files. Once nothing references
+    # them, storage GC removes the files after the grace period.
+    db.delete(entry)
+    _stats["evictions"] += 1
+
+
+def lookup_cached_generation(
+    db: Session,
+    prompt: str,
+    aspect_ratio: str,
+    model: str,
+    num_outputs: int
+) -> list[str] | None:
+    if not GENERATION_CACHE_ENABLED:
+        return None
+
+    key = cache_key(prompt, aspect_ratio, model, num_outputs)
+    entry = db.query(GenerationCacheEntry).filter(GenerationCacheEntry.cache_key == key).first()
+
+    if not entry:
+        _stats["misses"] += 1
+        return None
+
+    urls = json.loads(entry.urls)
+    expired = entry.created_at < datetime.utcnow() - timedelta(seconds=GENERATION_CACHE_TTL_SECONDS)
+
+    # the caller commits (chat turn unit of work)
+    if expired or not _files_exist(urls):
+        _delete_entry(db, entry)
+        _stats["misses"] += 1
+        return None
+
+    entry.hits += 1
+    entry.last_used_at = datetime.utcnow()
+
+    _stats["hits"] += 1
+    return urls
+
+
+def store_cached_generation(
+    db: Session,
+    prompt: str,
+    aspect_ratio: str,
+    model: str,
+    num_outputs: int,
+    urls: list[str]
+):
+    # partial results are not worth serving to the next request
+    if not GENERATION_CACHE_ENABLED or len(urls) != num_outputs:
+        return
+
+    key = cache_key(prompt, aspect_ratio, model, num_outputs)
+    entry = db.query(GenerationCacheEntry).filter(GenerationCacheEntry.cache_key == key).first()
+
+    if entry:
+        _delete_entry(db, entry)
+        db.flush()
+
+    db.add(GenerationCacheEntry(
+        cache_key=key,
+        prompt=normalize_prompt(prompt),
+        aspect_ratio=aspect_ratio,
+        model=model,
+        num_outputs=num_outputs,
+        urls=json.dumps(urls),
+        size_bytes=_size_of(urls)
+    ))
+    db.flush()
+    _stats["stores"] += 1
+
+    evict_cached_generations(db)
+    db.commit()
+
+
+def evict_cached_generations(db: Session):
+    """Drops expired entries, then least-recently-used ones until under the size/count limits."""
+    cutoff = datetime.utcnow() - timedelta(seconds=GENERATION_CACHE_TTL_SECONDS)
+
+    for entry in db.query(GenerationCacheEntry).filter(GenerationCacheEntry.created_at < cutoff).all():
+        _delete_entry(db, entry)
+    db.flush()
+
+    count, total_bytes = db.query(
+        func.count(GenerationCacheEntry.id),
+        func.coalesce(func.sum(GenerationCacheEntry.size_bytes), 0)
+    ).one()
+
+    if count <= GENERATION_CACHE_MAX_ENTRIES and total_bytes <= GENERATION_CACHE_MAX_BYTES:
+        return
+
+    # bounded by GENERATION_CACHE_MAX_ENTRIES, so loading them is fine
+    lru = db.query(GenerationCacheEntry).order_by(GenerationCacheEntry.last_used_at.asc()).all()
+
+    for entry in lru:
+        if count <= GENERATION_CACHE_MAX_ENTRIES and total_bytes <= GENERATION_CACHE_MAX_BYTES:
+            break
+
+        count -= 1
+        total_bytes -= entry.size_bytes
+        _delete_entry(db, entry)
+
+
+def cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": _stats["hits"] / lookups if lookups else 0.0}
@@ -1,42 +1,56 @@
-import os
-import uuid
-import base64
-import requests
-
-from openai import OpenAI
-from app.config import OPENAI_API_KEY, BASE_URL, IMAGE_MODEL
-
-
-def transform_image_openai(prompt: str, image_url: str, num_outputs: int, model_name: str | None = None) -> list[str]:
+import asyncio
+from typing import Awaitable, Callable
+
+from app.config import OPENAI_API_KEY, IMAGE_MODEL, IMAGE_FANOUT
+from app.services.clients import get_openai_image_client
+from app.services.storage import save_b64_image
+from app.services.storage_resolver import resolve_input_image
+from app.services.image_generation.fanout import fan_out
+from app.services.image_generation.resilience import get_guard
+
+
+async def transform_image_openai(
+    prompt: str,
+    image_url: str,
+    num_outputs: int,
+    model_name: str | None = None,
+    on_image: Callable[[str], Awaitable[None]] | None = None
+) -> list[str]:
     
 
     if not OPENAI_API_KEY:
         raise RuntimeError("OPENAI_API_KEY missing in .env")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    # our own uploads are opened straight from disk, remote inputs come from the fetch cache
+    input_path = await resolve_input_image(image_url)
 
-    r = requests.get(image_url, timeout=30)
-    if r.status_code != 200:
-        raise RuntimeError(f"Could not download input image: {r.status_code}")
+    used_model = model_name or IMAGE_MODEL or "gpt-image-1"
 
-    os.makedirs("storage/generated", exist_ok=True)
+    guard = get_guard("openai")
 
-    tmp_filename = f"{uuid.uuid4().hex}_input.png"
-    tmp_path = os.path.join("storage", "generated", tmp_filename)
+    async def edit(n: int):
+        # reopened per attempt: a retry has to send the whole file again
+        with open(input_path, "rb") as img_file:
+            return await get_openai_image_client().images.edit(
+                model=used_model,
+                image=img_file,
+                prompt=prompt,
+                n=n,
+                size="1024x1024"
+            )
 
-    with open(tmp_path, "wb") as f:
-        f.write(r.content)
+    if IMAGE_FANOUT and num_outputs > 1:
+        async def transform_one() -> str:
+            resp = await guard.run(lambda: edit(1), model=used_model)
+            img = resp.data[0]
+            if not hasattr(img, "b64_json") or not img.b64_json:
+                raise RuntimeError("Transform API did not return b64_json")
 
-    used_model = model_name or IMAGE_MODEL or "gpt-image-1"
+            return await asyncio.to_thread(save_b64_image, img.b64_json)
 
-    with open(tmp_path, "rb") as img_file:
-        resp = client.images.edit(
-            model=used_model,
-            image=img_file,
-            prompt=prompt,
-            n=num_outputs,
-            size="1024x1024"
-        )
+        return await fan_out(num_outputs, transform_one, on_image)
+
+    resp = await guard.run(lambda: edit(num_outputs), model=used_model)
 
     urls = []
 
@@ -44,19 +58,10 @@ def transform_image_openai(prompt: str, image_url: str, num_outputs: int, model_
         if not hasattr(img, "b64_json") or not img.b64_json:
             raise RuntimeError("Transform API did not return b64_json")
 
-        img_bytes = base64.b64decode(img.b64_json)
-
-        filename = f"{uuid.uuid4().hex}.png"
-        out_path = os.path.join("storage", "generated", filename)
-
-        with open(out_path, "wb") as f:
-            f.write(img_bytes)
-
-        urls.append(f"{BASE_URL}/storage/generated/{filename}")
+        url = await asyncio.to_thread(save_b64_image, img.b64_json)
+        urls.append(url)
 
-    try:
-        os.remove(tmp_path)
-    except:
-        pass
+        if on_image:
+            await on_image(url)
 
     return urls
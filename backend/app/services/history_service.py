@@ -1,20 +1,127 @@
-from sqlalchemy.orm import Session
+import threading
+from collections import OrderedDict, deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.config import HISTORY_BUFFER_ENABLED, HISTORY_BUFFER_SIZE, HISTORY_BUFFER_MAX_CONVERSATIONS
 from app.models.message import Message
+from app.models.conversation import Conversation
 
 
-def get_conversation_history(db: Session, conversation_id: int, limit: int = 12) -> list[dict]:
-    msgs = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at.asc())
+# conversation_id -> last HISTORY_BUFFER_SIZE text messages as (id, role, text)
+_buffers: OrderedDict[int, deque] = OrderedDict()
+
+# conversation_id -> messages committed while a buffer for it is being loaded from the DB
+_priming: dict[int, list] = {}
+
+# DB steps run on threadpool threads
+_lock = threading.Lock()
+
+
+def _load_from_db(db: Session, conversation_id: int, limit: int) -> list[tuple]:
+    rows = (
+        db.query(Message.id, Message.role, Message.text)
+        .filter(
+            Message.conversation_id == conversation_id,
+            Message.text.isnot(None),
+            Message.text != ""
+        )
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
         .all()
     )
+    return [tuple(r) for r in reversed(rows)]
+
+
+def _as_history(rows) -> list[dict]:
+    return [{"role": role, "content": text} for _, role, text in rows]
+
+
+def _load_buffer(db: Session, conversation_id: int) -> list[tuple]:
+    with _lock:
+        _priming.setdefault(conversation_id, [])
+
+    rows = _load_from_db(db, conversation_id, HISTORY_BUFFER_SIZE)
+
+    with _lock:
+        pending = _priming.pop(conversation_id, None)
+
+        # another loader finished first and owns the buffer now
+        if pending is None:
+            return rows
+
+        merged = {r[0]: r for r in rows}
+        merged.update({r[0]: r for r in pending})
+
+        _buffers[conversation_id] = deque(
+            (merged[i] for i in sorted(merged)),
+            maxlen=HISTORY_BUFFER_SIZE
+        )
+        while len(_buffers) > HISTORY_BUFFER_MAX_CONVERSATIONS:
+            _buffers.popitem(last=False)
+
+        return list(_buffers[conversation_id])
+
+
+def get_recent_messages(db: Session, conversation_id: int, limit: int = 12) -> list[tuple]:
+    """Last `limit` text messages as (id, role, text), oldest first."""
+    if not HISTORY_BUFFER_ENABLED or limit > HISTORY_BUFFER_SIZE:
+        return _load_from_db(db, conversation_id, limit)
+
+    with _lock:
+        buffer = _buffers.get(conversation_id)
+        if buffer is not None:
+            _buffers.move_to_end(conversation_id)
+            rows = list(buffer)
+
+    if buffer is None:
+        rows = _load_buffer(db, conversation_id)
+
+    return rows[-limit:]
+
+
+def get_conversation_history(db: Session, conversation_id: int, limit: int = 12) -> list[dict]:
+    return _as_history(get_recent_messages(db, conversation_id, limit))
+
+
+# ----------------------------
+# Keep buffers in sync with committed writes
+# ----------------------------
+@event.listens_for(Message, "after_insert")
+def _message_inserted(mapper, connection, target: Message):
+    if target.text:
+        session = object_session(target)
+        session.info.setdefault("history_inserts", []).append(
+            (target.conversation_id, (target.id, target.role, target.text))
+        )
+
+
+@event.listens_for(Conversation, "after_delete")
+def _conversation_deleted(mapper, connection, target: Conversation):
+    object_session(target).info.setdefault("history_deletes", []).append(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session):
+    inserts = session.info.pop("history_inserts", None)
+    deletes = session.info.pop("history_deletes", None)
+
+    if not inserts and not deletes:
+        return
+
+    with _lock:
+        for conversation_id, row in inserts or []:
+            if conversation_id in _buffers:
+                _buffers[conversation_id].append(row)
+            if conversation_id in _priming:
+                _priming[conversation_id].append(row)
+
+        for conversation_id in deletes or []:
+            _buffers.pop(conversation_id, None)
 
-    msgs = msgs[-limit:]
 
-    out = []
-    for m in msgs:
-        if not m.text:
-            continue
-        out.append({"role": m.role, "content": m.text})
-    return out
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(session: Session):
+    session.info.pop("history_inserts", None)
+    session.info.pop("history_deletes", None)
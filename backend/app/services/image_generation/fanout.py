@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from app.config import IMAGE_FANOUT_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+async def fan_out(
+    num_outputs: int,
+    generate_one: Callable[[], Awaitable[str]],
+    on_image: Callable[[str], Awaitable[None]] | None = None
+) -> list[str]:
+    """
+    Runs num_outputs single-image requests with at most IMAGE_FANOUT_CONCURRENCY
+    in flight. Each image is reported as soon as it is written; failed
+    sub-requests are dropped and only raise if every one of them failed.
+    """
+    sem = asyncio.Semaphore(max(1, IMAGE_FANOUT_CONCURRENCY))
+
+    async def one() -> str:
+        async with sem:
+            return await generate_one()
+
+    tasks = [asyncio.create_task(one()) for _ in range(num_outputs)]
+
+    urls = []
+    errors = []
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                url = await next_done
+            except Exception as e:
+                errors.append(e)
+                continue
+
+            urls.append(url)
+            if on_image:
+                await on_image(url)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if not urls:
+        raise RuntimeError(f"All {num_outputs} image requests failed: {errors[0]}")
+
+    if errors:
+        logger.warning("%s of %s image requests failed, returning partial results: %s", len(errors), num_outputs, errors[0])
+
+    return urls
@@ -1 +1,2 @@
-from . import mockup_provider
+# importing a provider module registers it
+from . import mockup_provider, openai_provider, fake_provider
@@ -0,0 +1,97 @@
+"""
+IMAGE_PROVIDER=fake: a local stand-in for an image API, for tests and load
+benchmarks. Every image is one "request" through the provider guard, like
+the OpenAI fan-out. Each takes FAKE_PROVIDER_LATENCY +- FAKE_PROVIDER_JITTER
+seconds and fails with the FAKE_PROVIDER_FAULTS probabilities:
+
+    429      rate limited, with Retry-After: FAKE_PROVIDER_RETRY_AFTER
+    500/503  upstream error
+    400      rejected prompt (not retried)
+    timeout  hangs for the latency, then raises TimeoutError
+
+Images are tiny PNGs written to the configured storage.
+"""
+import io
+import random
+import asyncio
+
+from PIL import Image
+
+from app.config import FAKE_PROVIDER_LATENCY, FAKE_PROVIDER_JITTER, FAKE_PROVIDER_FAULTS, FAKE_PROVIDER_RETRY_AFTER
+from app.services.storage import get_storage
+from app.services.generators.base import GenerationInput, GenerationResult
+from app.services.image_generation.fanout import fan_out
+from app.services.image_generation.registry import ImageProvider, OnImage, register_provider, to_result
+from app.services.image_generation.resilience import get_guard, parse_provider_values
+
+_settings = {
+    "latency": FAKE_PROVIDER_LATENCY,
+    "jitter": FAKE_PROVIDER_JITTER,
+    "faults": parse_provider_values(FAKE_PROVIDER_FAULTS, float),
+    "retry_after": FAKE_PROVIDER_RETRY_AFTER
+}
+
+
+class FakeProviderError(Exception):
+    """Shaped like openai.APIStatusError where the guard looks: status_code and response headers."""
+
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"Fake provider returned {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def configure(latency: float | None = None, jitter: float | None = None, faults: dict | None = None, retry_after: float | None = None):
+    """Change the behavior at runtime (benchmarks switch between fault mixes without restarting)."""
+    for key, value in (("latency", latency), ("jitter", jitter), ("faults", faults), ("retry_after", retry_after)):
+        if value is not None:
+            _settings[key] = value
+
+
+def _pick_fault() -> str | None:
+    roll = random.random()
+    for fault, probability in _settings["faults"].items():
+        if roll < probability:
+            return fault
+        roll -= probability
+    return None
+
+
+def _render_png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), tuple(random.randrange(256) for _ in range(3))).save(buf, "PNG")
+    return buf.getvalue()
+
+
+async def _request() -> str:
+    latency = max(0.0, random.uniform(_settings["latency"] - _settings["jitter"], _settings["latency"] + _settings["jitter"]))
+    fault = _pick_fault()
+
+    if fault == "429":
+        # throttled requests come back fast
+        await asyncio.sleep(min(latency, 0.05))
+        raise FakeProviderError(429, {"retry-after": str(_settings["retry_after"])})
+
+    await asyncio.sleep(latency)
+
+    if fault == "timeout":
+        raise TimeoutError("Fake provider timed out")
+    if fault:
+        raise FakeProviderError(int(fault))
+
+    png = await asyncio.to_thread(_render_png)
+    return (await asyncio.to_thread(get_storage().put, png, "png", "image/png")).url
+
+
+async def _generate(inp: GenerationInput, on_image: OnImage | None) -> GenerationResult:
+    guard = get_guard("fake")
+    urls = await fan_out(inp.num_outputs, lambda: guard.run(_request, model="fake-image"), on_image)
+    return to_result(urls, inp, "fake-image")
+
+
+register_provider(ImageProvider(
+    name="fake",
+    model="fake-image",
+    generate=_generate,
+    transform=_generate
+))
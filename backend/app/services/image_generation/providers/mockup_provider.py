@@ -1,6 +1,11 @@
 import os
 import random
+import asyncio
+
 from app.config import BASE_URL
+from app.services.generators.base import GenerationInput, GenerationResult
+from app.services.image_generation.registry import ImageProvider, OnImage, register_provider, to_result, notify_each
+from app.services.image_generation.resilience import get_guard
 
 MOCKUP_IMAGES_DIR = os.path.join("mockups", "images")
 
@@ -25,3 +30,30 @@ def generate_images(prompt: str, num_outputs: int, aspect_ratio: str, model_name
         urls.append(f"{BASE_URL}/mockups/images/{chosen}")
 
     return urls
+
+
+async def _generate(inp: GenerationInput, on_image: OnImage | None) -> GenerationResult:
+    urls = await get_guard("mockup").run(lambda: asyncio.to_thread(
+        generate_images,
+        prompt=inp.prompt,
+        num_outputs=inp.num_outputs,
+        aspect_ratio=inp.aspect_ratio,
+        model_name="mockup"
+    ), model="mockup-image")
+    await notify_each(urls, on_image)
+    return to_result(urls, inp, "mockup-image")
+
+
+async def _transform(inp: GenerationInput, on_image: OnImage | None) -> GenerationResult:
+    # even transform just returns mock images
+    result = await _generate(inp.model_copy(update={"aspect_ratio": "1:1"}), on_image)
+    return to_result([a.url for a in result.assets], inp, "mockup-transform")
+
+
+register_provider(ImageProvider(
+    name="mockup",
+    model="mockup-image",
+    generate=_generate,
+    transform=_transform,
+    transform_model="mockup-transform"
+))
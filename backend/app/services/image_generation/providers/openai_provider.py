@@ -1,9 +1,14 @@
-import os
-import uuid
-import base64
+import asyncio
+from typing import Awaitable, Callable
 
-from openai import OpenAI
-from app.config import OPENAI_API_KEY, BASE_URL
+from app.config import OPENAI_API_KEY, IMAGE_MODEL, IMAGE_FANOUT
+from app.services.clients import get_openai_image_client
+from app.services.storage import save_b64_image
+from app.services.generators.base import GenerationInput, GenerationResult
+from app.services.generators.openai_transform import transform_image_openai
+from app.services.image_generation.fanout import fan_out
+from app.services.image_generation.registry import ImageProvider, OnImage, register_provider, to_result
+from app.services.image_generation.resilience import get_guard
 
 
 def _aspect_to_size(aspect: str) -> str:
@@ -18,36 +23,71 @@ def _aspect_to_size(aspect: str) -> str:
     return "1024x1024"
 
 
-def generate_images(prompt: str, num_outputs: int, aspect_ratio: str, model_name: str) -> list[str]:
+async def generate_images(
+    prompt: str,
+    num_outputs: int,
+    aspect_ratio: str,
+    model_name: str,
+    on_image: Callable[[str], Awaitable[None]] | None = None
+) -> list[str]:
     if not OPENAI_API_KEY:
         raise RuntimeError("OPENAI_API_KEY missing in .env")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
     size = _aspect_to_size(aspect_ratio)
+    guard = get_guard("openai")
+
+    if IMAGE_FANOUT and num_outputs > 1:
+        async def generate_one() -> str:
+            resp = await guard.run(lambda: get_openai_image_client().images.generate(
+                model=model_name,
+                prompt=prompt,
+                size=size,
+                n=1
+            ), model=model_name)
+            img = resp.data[0]
+            if not hasattr(img, "b64_json") or not img.b64_json:
+                raise RuntimeError("OpenAI did not return b64_json")
+
+            return await asyncio.to_thread(save_b64_image, img.b64_json)
 
-    resp = client.images.generate(
+        return await fan_out(num_outputs, generate_one, on_image)
+
+    resp = await guard.run(lambda: get_openai_image_client().images.generate(
         model=model_name,
         prompt=prompt,
         size=size,
         n=num_outputs
-    )
+    ), model=model_name)
 
     urls = []
-    os.makedirs("storage/generated", exist_ok=True)
 
     for img in resp.data:
         if not hasattr(img, "b64_json") or not img.b64_json:
             raise RuntimeError("OpenAI did not return b64_json")
 
-        img_bytes = base64.b64decode(img.b64_json)
+        # decode + write off the event loop
+        url = await asyncio.to_thread(save_b64_image, img.b64_json)
+        urls.append(url)
+
+        if on_image:
+            await on_image(url)
 
-        filename = f"{uuid.uuid4().hex}.png"
-        out_path = os.path.join("storage", "generated", filename)
+    return urls
 
-        with open(out_path, "wb") as f:
-            f.write(img_bytes)
 
-        urls.append(f"{BASE_URL}/storage/generated/{filename}")
+async def _generate(inp: GenerationInput, on_image: OnImage | None) -> GenerationResult:
+    urls = await generate_images(inp.prompt, inp.num_outputs, inp.aspect_ratio, IMAGE_MODEL, on_image)
+    return to_result(urls, inp, f"openai-{IMAGE_MODEL}")
 
-    return urls
+
+async def _transform(inp: GenerationInput, on_image: OnImage | None) -> GenerationResult:
+    urls = await transform_image_openai(inp.prompt, inp.image_url, inp.num_outputs, IMAGE_MODEL, on_image)
+    return to_result(urls, inp, f"openai-{IMAGE_MODEL}")
+
+
+register_provider(ImageProvider(
+    name="openai",
+    model=f"openai-{IMAGE_MODEL}",
+    generate=_generate,
+    transform=_transform
+))
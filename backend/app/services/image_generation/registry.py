@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from app.config import IMAGE_PROVIDER
+from app.services.generators.base import GenerationInput, GenerationResult, GeneratedAsset
+
+OnImage = Callable[[str], Awaitable[None]]
+ProviderCall = Callable[[GenerationInput, OnImage | None], Awaitable[GenerationResult]]
+
+
+@dataclass(frozen=True)
+class ImageProvider:
+    """
+    One image backend. generate/transform make their upstream requests through
+    get_guard(name) (rate limit, retries, breaker), one guarded call per request.
+    """
+    name: str
+    # model_used label on the assets it makes
+    model: str
+    generate: ProviderCall
+    transform: ProviderCall
+    transform_model: str | None = None
+
+
+# provider name -> provider; filled in by the modules in image_generation/providers
+_providers: dict[str, ImageProvider] = {}
+
+
+def register_provider(provider: ImageProvider):
+    _providers[provider.name] = provider
+
+
+def get_provider(name: str | None = None) -> ImageProvider:
+    name = name or IMAGE_PROVIDER
+    if name not in _providers:
+        raise RuntimeError(f"Unknown IMAGE_PROVIDER: {name}")
+    return _providers[name]
+
+
+def provider_names() -> list[str]:
+    return sorted(_providers)
+
+
+async def notify_each(urls: list[str], on_image: OnImage | None):
+    """For providers that get all images at once: report them after the fact."""
+    if on_image:
+        for url in urls:
+            await on_image(url)
+
+
+def to_result(urls: list[str], inp: GenerationInput, model_used: str) -> GenerationResult:
+    return GenerationResult(assets=[
+        GeneratedAsset(type="image", url=url, prompt_used=inp.prompt, model_used=model_used)
+        for url in urls
+    ])
@@ -0,0 +1,323 @@
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+import openai
+
+from app.config import (
+    PROVIDER_RATE_LIMITS,
+    PROVIDER_BURST,
+    PROVIDER_MAX_IN_FLIGHT,
+    PROVIDER_DEFAULT_MAX_IN_FLIGHT,
+    PROVIDER_MAX_RETRIES,
+    PROVIDER_RETRY_BASE_DELAY,
+    PROVIDER_RETRY_MAX_DELAY,
+    PROVIDER_BREAKER_FAILURES,
+    PROVIDER_BREAKER_COOLDOWN_SECONDS
+)
+from app.services.metrics import upstream_call
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# worth another try: throttled, timed out, or the upstream fell over
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# provider name -> its guard, built on first use
+_guards: dict[str, "ProviderGuard"] = {}
+
+
+class ProviderUnavailableError(RuntimeError):
+    """The circuit is open: the provider failed repeatedly and is not called until the cooldown ends."""
+
+
+def parse_provider_values(raw: str, cast=int) -> dict:
+    """ "openai=4,mockup=16" -> {"openai": 4, "mockup": 16} """
+    values = {}
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        values[name.strip()] = cast(value)
+    return values
+
+
+def _status_code(exc: BaseException) -> int | None:
+    return getattr(exc, "status_code", None)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if _status_code(exc) in RETRYABLE_STATUS:
+        return True
+    return isinstance(exc, (openai.APIConnectionError, httpx.TransportError, TimeoutError))
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds the upstream asked us to wait (Retry-After / OpenAI's retry-after-ms), if it said."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    rate requests/second with bursts of up to `burst`. Callers reserve a token
+    and sleep off the debt, so waiters are served in arrival order without a lock.
+    rate <= 0 means unlimited.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return
+
+        try:
+            await asyncio.sleep(-self.tokens / self.rate)
+        except asyncio.CancelledError:
+            self.tokens += 1
+            raise
+
+    def pause(self, seconds: float):
+        """Upstream said 429 + Retry-After: hold every caller back, not just the one that was told."""
+        if self.rate <= 0:
+            return
+
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` upstream failures in a row; open -> half-open
+    after `cooldown` seconds, where one probe request decides whether it closes again.
+    """
+
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self, name: str) -> bool:
+        """Raises while open; True when this call is the half-open probe."""
+        state = self.state
+        if state == "closed" or self.failures <= 0:
+            return False
+
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+
+        wait = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+        raise ProviderUnavailableError(
+            f"Image provider {name} is failing, not calling it for another {wait:.0f}s"
+        )
+
+    def record_success(self):
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.consecutive += 1
+        if self.probing or (self.failures > 0 and self.consecutive >= self.failures):
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class ProviderGuard:
+    """Everything one upstream request goes through: breaker, rate limit, in-flight cap, retries."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_in_flight: int,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        breaker_failures: int,
+        breaker_cooldown: float
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_cooldown)
+        self.max_in_flight = max(1, max_in_flight)
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        # set whenever no half-open probe is out
+        self.probe_settled = asyncio.Event()
+        self.probe_settled.set()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0, "rejected": 0}
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float | None:
+        """Delay before the next attempt, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(exc):
+            return None
+
+        asked = retry_after(exc)
+        if asked is not None:
+            # waiting longer than we'd ever back off means the turn times out anyway
+            if asked > self.max_delay:
+                return None
+            # a little jitter on top, so everyone told "1s" doesn't come back in the same tick
+            return asked + random.uniform(0, self.base_delay)
+
+        # full jitter: spreads out callers that failed together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, request: Callable[[], Awaitable[T]], model: str = "") -> T:
+        """`model` only labels the upstream latency metric."""
+        attempt = 0
+
+        while True:
+            # half-open: one request is checking whether the provider is back, wait for its answer
+            while self.breaker.probing:
+                await self.probe_settled.wait()
+
+            try:
+                probe = self.breaker.before_call(self.name)
+            except ProviderUnavailableError:
+                self.counters["rejected"] += 1
+                raise
+
+            if probe:
+                self.probe_settled.clear()
+
+            await self.bucket.acquire()
+
+            try:
+                async with self.semaphore:
+                    self.counters["requests"] += 1
+                    self.in_flight += 1
+                    try:
+                        with upstream_call("image", self.name, model):
+                            result = await request()
+                    finally:
+                        self.in_flight -= 1
+            except asyncio.CancelledError:
+                # a half-open probe that got cancelled decided nothing
+                if probe:
+                    self.breaker.probing = False
+                    self.probe_settled.set()
+                raise
+            except Exception as exc:
+                if _status_code(exc) == 429:
+                    # the provider is up, we're just too fast: the bucket backs off, the breaker stays out of it
+                    self.counters["rate_limited"] += 1
+                    if probe:
+                        self.breaker.probing = False
+                elif is_retryable(exc):
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                else:
+                    # a rejected prompt (400) still means the provider is up
+                    self.breaker.record_success()
+                self.probe_settled.set()
+
+                delay = self._backoff(attempt, exc)
+                if delay is None:
+                    raise
+
+                if _status_code(exc) == 429:
+                    self.bucket.pause(delay)
+
+                self.counters["retries"] += 1
+                attempt += 1
+                logger.warning(
+                    "%s request failed (%s), retry %s/%s in %.1fs",
+                    self.name, exc, attempt, self.max_retries, delay
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.probe_settled.set()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rate": self.bucket.rate or None,
+            **self.counters
+        }
+
+
+def get_guard(name: str) -> ProviderGuard:
+    if name not in _guards:
+        _guards[name] = ProviderGuard(
+            name=name,
+            rate=parse_provider_values(PROVIDER_RATE_LIMITS, float).get(name, 0),
+            burst=PROVIDER_BURST,
+            max_in_flight=parse_provider_values(PROVIDER_MAX_IN_FLIGHT).get(name, PROVIDER_DEFAULT_MAX_IN_FLIGHT),
+            max_retries=PROVIDER_MAX_RETRIES,
+            base_delay=PROVIDER_RETRY_BASE_DELAY,
+            max_delay=PROVIDER_RETRY_MAX_DELAY,
+            breaker_failures=PROVIDER_BREAKER_FAILURES,
+            breaker_cooldown=PROVIDER_BREAKER_COOLDOWN_SECONDS
+        )
+    return _guards[name]
+
+
+def provider_stats() -> dict:
+    return {name: guard.stats() for name, guard in _guards.items()}
+
+
+def reset_guards():
+    """Semaphores belong to an event loop; dropped with the job workers."""
+    _guards.clear()
@@ -0,0 +1,225 @@
+"""
+Local fast path in front of run_planner / run_vision_planner.
+
+When the planner has asked its question and holds a complete draft, a reply
+that is nothing but a confirmation ("yes", "looks good, generate 👍") is
+classified here and the draft becomes the final prompt without an LLM call.
+
+The classifier is a small word list, deliberately conservative: every word
+of the reply has to be an affirmation, a generate verb or filler. Any
+unknown word lowers the confidence, any negation / edit word ("no", "but",
+"add", "instead") drops it to 0, and a bare "yes" does not answer an
+either/or or open ("what colors?") question. Everything under
+PLANNER_FAST_PATH_MIN_CONFIDENCE goes to the LLM as before, which
+understands confirmation naturally.
+
+A bare affirmation only counts when the pending question asks to confirm or
+generate the draft itself ("Ready to generate?", "Does this look good?"). A
+"yes" to "Would you like me to add a sunset?" accepts a change the draft
+doesn't have yet, so it goes to the planner.
+"""
+import re
+import threading
+
+from app.config import (
+    PLANNER_FAST_PATH_ENABLED,
+    PLANNER_FAST_PATH_MIN_CONFIDENCE,
+    PLANNER_FAST_PATH_MIN_DRAFT_WORDS
+)
+from app.services.planner_context import PlannerContext
+
+# replies longer than this always go to the planner
+_MAX_WORDS = 12
+
+# each unknown word / a question mark costs this much confidence
+_UNKNOWN_PENALTY = 0.5
+_QUESTION_PENALTY = 0.3
+
+# a plain affirmation to anything but "generate this draft?" answers something else
+_PROPOSAL_CAP = 0.5
+
+_EMOJI = {
+    "👍": " yes ", "👌": " ok ", "✅": " yes ", "✔": " yes ", "🚀": " go ",
+    "🔥": " great ", "💯": " perfect ", "🙌": " great ", "😍": " love ", "❤": " love ",
+}
+
+# multi-word confirmations, matched before splitting into words
+_PHRASES = {
+    "go ahead": "go_ahead",
+    "good to go": "good_to_go",
+    "looks good": "looks_good",
+    "sounds good": "sounds_good",
+    "do it": "do_it",
+    "lets go": "lets_go",
+    "lets do it": "do_it",
+    "ship it": "ship_it",
+    "love it": "love_it",
+    "all good": "all_good",
+    "thats it": "thats_it",
+    "go for it": "go_ahead",
+    "sure thing": "sure",
+}
+
+# confirms the draft and asks for images
+_ACTION = {
+    "generate": 1.0, "render": 1.0, "create": 1.0, "draw": 1.0, "proceed": 1.0, "go": 1.0,
+    "go_ahead": 1.0, "good_to_go": 1.0, "do_it": 1.0, "lets_go": 1.0, "ship_it": 1.0, "make": 0.9,
+}
+
+# agrees, without saying what with
+_AFFIRM = {
+    "yes": 1.0, "yeah": 1.0, "yep": 1.0, "yup": 1.0, "yess": 1.0, "ya": 0.95, "yea": 0.95,
+    "perfect": 1.0, "lgtm": 1.0, "confirm": 1.0, "confirmed": 1.0, "approved": 1.0,
+    "exactly": 1.0, "absolutely": 1.0, "definitely": 1.0, "looks_good": 1.0, "sounds_good": 1.0,
+    "thats_it": 0.95, "all_good": 0.95, "love_it": 0.95, "love": 0.9,
+    "ok": 0.9, "okay": 0.9, "okey": 0.9, "k": 0.9, "kk": 0.9, "sure": 0.9, "alright": 0.9,
+    "fine": 0.9, "great": 0.9, "awesome": 0.9, "nice": 0.9, "cool": 0.9, "good": 0.9,
+    "correct": 0.9, "right": 0.9, "amazing": 0.9, "excellent": 0.9,
+}
+
+# carries no meaning either way
+_FILLER = {
+    "please", "pls", "plz", "now", "it", "that", "this", "them", "those", "the", "a", "an",
+    "image", "images", "picture", "pictures", "pic", "pics", "one", "ones", "just", "then",
+    "and", "i", "we", "you", "can", "me", "for", "thanks", "thank", "ty", "so", "very",
+    "really", "is", "its", "looks", "sounds", "seems", "lets", "already", "ahead", "on",
+    "totally", "100", "sir", "mate", "buddy", "lol", "haha", "oh", "well", "ready", "all",
+    "thats",
+}
+
+# anything that changes or rejects the draft
+_BLOCKERS = {
+    "no", "nope", "nah", "not", "dont", "never", "wait", "hold", "stop", "but", "however",
+    "instead", "change", "add", "remove", "without", "more", "less", "except", "actually",
+    "hmm", "maybe", "rather", "different", "another", "other", "undo", "cancel", "isnt",
+    "doesnt", "wrong", "bad", "hate", "ugly", "which", "what", "how", "why", "or", "only",
+    "also", "should", "could", "would", "if", "later", "first", "before",
+}
+
+_OR_RE = re.compile(r"\bor\b", re.IGNORECASE)
+_WH_RE = re.compile(r"(what|which|how|where|who|when|why)\b", re.IGNORECASE)
+
+# the question is about the draft as it stands
+_CONFIRM_DRAFT_RE = re.compile(
+    r"\b(generate|generating|render|create|draw|ready|proceed|go ahead|good to go|"
+    r"(look|looks|sound|sounds) (good|right|ok|okay|great)|happy with|like this|this draft|the draft)\b",
+    re.IGNORECASE
+)
+# ... unless it also proposes a change to it
+_CHANGE_RE = re.compile(
+    r"\b(add|adding|include|including|instead|change|switch|make it|more|less|also|too|extra|"
+    r"different|another|with|without|remove|\d+:\d+)\b",
+    re.IGNORECASE
+)
+
+_RATIO_RE = re.compile(r"\b(1:1|16:9|9:16|4:5)\b")
+# framing asked for in words: the planner picks the ratio for those
+_FRAMING_RE = re.compile(r"\b(landscape|portrait|wide|widescreen|vertical|horizontal|tall|panoram\w*|\d+:\d+)\b", re.IGNORECASE)
+
+_stats_lock = threading.Lock()
+_stats = {"fast_path": 0, "planner": 0}
+
+
+def _words(text: str) -> tuple[list[str], bool]:
+    for emoji, word in _EMOJI.items():
+        text = text.replace(emoji, word)
+
+    text = text.lower().replace("’", "'").replace("'", "")
+    asked = "?" in text
+    text = " ".join(re.findall(r"[a-z0-9]+", text))
+
+    for phrase, token in _PHRASES.items():
+        text = re.sub(rf"\b{phrase}\b", token, text)
+
+    return text.split(), asked
+
+
+def _asks_to_confirm_draft(question: str) -> bool:
+    # the sentence the first "?" ends, without the "Love it! ❄️" in front of it
+    sentence = re.split(r"[.!…]", question.split("?")[0])[-1]
+    sentence = re.sub(r"^\W+", "", sentence)
+
+    if _OR_RE.search(sentence) or _WH_RE.match(sentence):
+        return False
+    return bool(_CONFIRM_DRAFT_RE.search(sentence)) and not _CHANGE_RE.search(sentence)
+
+
+def classify_reply(text: str, pending_question: str | None = None) -> tuple[str, float]:
+    """("confirm" | "other", confidence 0..1) for a reply to the planner's last question."""
+    words, asked = _words(text or "")
+
+    if not words or len(words) > _MAX_WORDS:
+        return "other", 0.0
+
+    if any(w in _BLOCKERS for w in words):
+        return "other", 0.0
+
+    action = max((_ACTION[w] for w in words if w in _ACTION), default=0.0)
+    affirm = max((_AFFIRM[w] for w in words if w in _AFFIRM), default=0.0)
+
+    if not action and not affirm:
+        return "other", 0.0
+
+    unknown = sum(1 for w in words if w not in _ACTION and w not in _AFFIRM and w not in _FILLER)
+
+    confidence = max(action, affirm) - unknown * _UNKNOWN_PENALTY - (_QUESTION_PENALTY if asked else 0.0)
+
+    # "yes" to "add a sunset?" / "A or B?" / "what colors?" is not a yes to the draft
+    if affirm and pending_question and not _asks_to_confirm_draft(pending_question):
+        confidence = min(confidence, _PROPOSAL_CAP)
+
+    confidence = max(0.0, round(confidence, 2))
+    return ("confirm" if confidence > 0 else "other"), confidence
+
+
+def fast_path_plan(user_message: str, context: PlannerContext) -> dict | None:
+    """
+    A planner-shaped "final" reply when the user just confirmed a complete
+    draft, otherwise None (call the planner).
+    """
+    if not PLANNER_FAST_PATH_ENABLED:
+        return None
+
+    draft = (context.draft_prompt or "").strip()
+
+    # only while a question is pending, i.e. the planner is collecting
+    if not context.pending_questions or len(draft.split()) < PLANNER_FAST_PATH_MIN_DRAFT_WORDS:
+        return None
+
+    intent, confidence = classify_reply(user_message, context.pending_questions[-1])
+    hit = intent == "confirm" and confidence >= PLANNER_FAST_PATH_MIN_CONFIDENCE
+
+    aspect_ratio = _aspect_ratio(draft, context) if hit else None
+
+    with _stats_lock:
+        _stats["fast_path" if aspect_ratio else "planner"] += 1
+
+    if not aspect_ratio:
+        return None
+
+    return {
+        "type": "final",
+        "questions": [],
+        "final_prompt": draft,
+        "draft_prompt": draft,
+        "num_outputs": 4,
+        "aspect_ratio": aspect_ratio
+    }
+
+
+def _aspect_ratio(draft: str, context: PlannerContext) -> str | None:
+    """The last ratio the conversation asked for, "1:1" if none, None if only the planner can tell."""
+    texts = [context.summary or ""] + [m["content"] for m in context.history if isinstance(m["content"], str)] + [draft]
+    text = "\n".join(texts)
+
+    ratios = _RATIO_RE.findall(text)
+    if ratios:
+        return ratios[-1]
+    if _FRAMING_RE.search(text):
+        return None
+    return "1:1"
+
+
+def fast_path_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,305 @@
+import time
+import asyncio
+import logging
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.config import IMAGE_PROVIDER, JOB_WORKERS, JOB_PROVIDER_CONCURRENCY, JOB_DEFAULT_CONCURRENCY
+from app.models.asset import Asset
+from app.models.generation_job import GenerationJob
+from app.services.image_generation.image_generator_service import generate_images, transform_images
+from app.services.image_generation.resilience import parse_provider_values, reset_guards
+from app.services.generation_cache import store_cached_generation
+from app.services.variant_service import schedule_variants
+from app.services.storage_quota import quota_enabled, user_urls, adjust_usage
+from app.services.metrics import JOB_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# In-process queue of job ids. The generation_jobs table is the source of
+# truth, so anything still queued/running is picked up again on restart.
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+_provider_limits: dict[str, asyncio.Semaphore] = {}
+
+# job id -> listener queues (used by the /chat/stream endpoint)
+_subscribers: dict[int, set[asyncio.Queue]] = {}
+
+
+def _provider_semaphore(provider: str) -> asyncio.Semaphore:
+    if provider not in _provider_limits:
+        limit = parse_provider_values(JOB_PROVIDER_CONCURRENCY).get(provider, JOB_DEFAULT_CONCURRENCY)
+        _provider_limits[provider] = asyncio.Semaphore(max(1, limit))
+    return _provider_limits[provider]
+
+
+# ----------------------------
+# DB helpers
+# ----------------------------
+def create_generation_job(
+    db: Session,
+    user_id: int,
+    conversation_id: int,
+    message_id: int,
+    prompt: str,
+    num_outputs: int,
+    aspect_ratio: str,
+    image_url: str | None = None
+) -> GenerationJob:
+    job = GenerationJob(
+        user_id=user_id,
+        conversation_id=conversation_id,
+        message_id=message_id,
+        provider=IMAGE_PROVIDER,
+        status="queued",
+        prompt=prompt,
+        image_url=image_url,
+        num_outputs=num_outputs,
+        aspect_ratio=aspect_ratio
+    )
+    # committed together with the rest of the chat turn
+    db.add(job)
+    db.flush()
+    return job
+
+
+def get_job(db: Session, job_id: int, user_id: int) -> GenerationJob | None:
+    return (
+        db.query(GenerationJob)
+        .filter(GenerationJob.id == job_id, GenerationJob.user_id == user_id)
+        .first()
+    )
+
+
+def get_job_assets(db: Session, job: GenerationJob) -> list[Asset]:
+    return db.query(Asset).filter(Asset.message_id == job.message_id).order_by(Asset.id.asc()).all()
+
+
+def _claim_job(job_id: int) -> GenerationJob | None:
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if not job or job.status in ("done", "failed"):
+            return None
+
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        db.commit()
+        return job
+    finally:
+        db.close()
+
+
+def _set_progress(job_id: int, completed_outputs: int):
+    db = SessionLocal()
+    try:
+        db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+            {GenerationJob.completed_outputs: completed_outputs}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _complete_job(job_id: int, urls: list[str], model_used: str) -> list[Asset]:
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if not job:
+            return []
+
+        # images this user's assets didn't show yet count towards their quota
+        new_urls = set(urls) - user_urls(db, job.user_id, urls) if quota_enabled() else set()
+
+        assets = [
+            Asset(
+                message_id=job.message_id,
+                type="image",
+                url=url,
+                prompt_used=job.prompt,
+                model_used=model_used
+            )
+            for url in urls
+        ]
+        db.add_all(assets)
+
+        job.status = "done"
+        job.completed_outputs = len(urls)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+        adjust_usage(job.user_id, new_urls)
+        return assets
+    finally:
+        db.close()
+
+
+def _cache_job_result(job: GenerationJob, urls: list[str], model_used: str):
+    db = SessionLocal()
+    try:
+        store_cached_generation(db, job.prompt, job.aspect_ratio, model_used, job.num_outputs, urls)
+    finally:
+        db.close()
+
+
+def _fail_job(job_id: int, error: str):
+    db = SessionLocal()
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        # a crash after the assets were saved doesn't undo the job
+        if not job or job.status == "done":
+            return
+
+        job.status = "failed"
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _pending_job_ids() -> list[int]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(GenerationJob.id)
+            .filter(GenerationJob.status.in_(["queued", "running"]))
+            .order_by(GenerationJob.id.asc())
+            .all()
+        )
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+
+# ----------------------------
+# Job events
+# ----------------------------
+def subscribe_job(job_id: int) -> asyncio.Queue:
+    queue = asyncio.Queue()
+    _subscribers.setdefault(job_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe_job(job_id: int, queue: asyncio.Queue):
+    listeners = _subscribers.get(job_id)
+    if not listeners:
+        return
+
+    listeners.discard(queue)
+    if not listeners:
+        _subscribers.pop(job_id, None)
+
+
+def _publish(job_id: int, event: str, data: dict):
+    for queue in _subscribers.get(job_id, ()):
+        queue.put_nowait((event, data))
+
+
+# ----------------------------
+# Worker pool
+# ----------------------------
+async def _run_job(job_id: int):
+    job = await run_in_threadpool(_claim_job, job_id)
+    if not job:
+        return
+
+    kind = "transform" if job.image_url else "generate"
+    JOB_STAGE_SECONDS.observe((job.started_at - job.created_at).total_seconds(), "queue_wait", job.provider, kind)
+
+    completed = 0
+
+    async def on_image(url: str):
+        nonlocal completed
+        completed += 1
+        index = completed - 1
+        _publish(job_id, "image", {"job_id": job_id, "index": index, "url": url})
+        await run_in_threadpool(_set_progress, job_id, completed)
+
+    t0 = time.perf_counter()
+
+    async with _provider_semaphore(job.provider):
+        try:
+            if job.image_url:
+                urls, model_used = await transform_images(
+                    prompt=job.prompt,
+                    image_url=job.image_url,
+                    num_outputs=job.num_outputs,
+                    on_image=on_image
+                )
+            else:
+                urls, model_used = await generate_images(
+                    prompt=job.prompt,
+                    num_outputs=job.num_outputs,
+                    aspect_ratio=job.aspect_ratio,
+                    on_image=on_image
+                )
+        except Exception as e:
+            error = f"Image generation failed: {str(e)}"
+            await run_in_threadpool(_fail_job, job_id, error)
+            _publish(job_id, "failed", {"job_id": job_id, "error": error})
+            return
+        finally:
+            # includes the wait for a provider slot
+            JOB_STAGE_SECONDS.observe(time.perf_counter() - t0, "generate", job.provider, kind)
+
+    t0 = time.perf_counter()
+    assets = await run_in_threadpool(_complete_job, job_id, urls, model_used)
+    JOB_STAGE_SECONDS.observe(time.perf_counter() - t0, "persist_assets", job.provider, kind)
+    _publish(job_id, "done", {"job_id": job_id, "assets": assets})
+
+    # thumbnails / mid-size copies for the chat grid, off the job worker
+    schedule_variants(urls)
+
+    # transforms depend on the input image, so only text-to-image results are reusable
+    if not job.image_url:
+        try:
+            await run_in_threadpool(_cache_job_result, job, urls, model_used)
+        except Exception:
+            logger.exception("Could not cache result of generation job %s", job_id)
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run_job(job_id)
+        except Exception:
+            logger.exception("Generation job %s crashed", job_id)
+            # otherwise the row stays "running" and pollers wait until the next restart
+            try:
+                await run_in_threadpool(_fail_job, job_id, "Generation job crashed")
+            except Exception:
+                logger.exception("Could not mark generation job %s as failed", job_id)
+            _publish(job_id, "failed", {"job_id": job_id, "error": "Generation job crashed"})
+        finally:
+            _queue.task_done()
+
+
+def submit_job(job_id: int):
+    _queue.put_nowait(job_id)
+
+
+async def start_job_workers():
+    global _queue
+
+    _queue = asyncio.Queue()
+    _provider_limits.clear()
+    reset_guards()
+
+    for job_id in await run_in_threadpool(_pending_job_ids):
+        submit_job(job_id)
+
+    for _ in range(max(1, JOB_WORKERS)):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_job_workers():
+    for task in _workers:
+        task.cancel()
+
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -1,10 +1,25 @@
+import threading
+
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
+
+from app.config import PREFERENCES_CACHE_ENABLED, PREFERENCES_CACHE_MAX_USERS
 from app.models.user_memory import UserMemory
 
 
 MAX_MEMORY = 25
 
+# user_id -> formatted preferences block (what format_memory_for_prompt returns)
+_formatted: dict[int, str] = {}
+
+# user_id -> bumped on every committed memory change, so a read that raced
+# with a write never stores the old text
+_versions: dict[int, int] = {}
+
+_lock = threading.Lock()
 
+
+# add_memory_row / trim_memory leave the commit to the caller (one per chat turn)
 def add_memory_row(
     db: Session,
     user_id: int,
@@ -22,35 +37,32 @@ def add_memory_row(
     )
 
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    db.flush()
 
     trim_memory(db, user_id)
+    _invalidate_on_commit(db, user_id)
 
     return row
 
 
 def trim_memory(db: Session, user_id: int):
-    rows = (
-        db.query(UserMemory)
-        .filter(UserMemory.user_id == user_id)
-        .order_by(UserMemory.created_at.desc())
-        .all()
+    keep = (
+        select(UserMemory.id)
+        .where(UserMemory.user_id == user_id)
+        .order_by(UserMemory.created_at.desc(), UserMemory.id.desc())
+        .limit(MAX_MEMORY)
     )
 
-    if len(rows) <= MAX_MEMORY:
-        return
-
-    to_delete = rows[MAX_MEMORY:]
-
-    for r in to_delete:
-        db.delete(r)
-
-    db.commit()
+    # single DELETE of everything past the newest MAX_MEMORY rows
+    db.query(UserMemory).filter(
+        UserMemory.user_id == user_id,
+        UserMemory.id.not_in(keep.scalar_subquery())
+    ).delete(synchronize_session=False)
 
 
 def clear_memory(db: Session, user_id: int):
     db.query(UserMemory).filter(UserMemory.user_id == user_id).delete()
+    _invalidate_on_commit(db, user_id)
     db.commit()
 
 
@@ -58,12 +70,12 @@ def get_last_memory(db: Session, user_id: int, limit: int = 25):
     return (
         db.query(UserMemory)
         .filter(UserMemory.user_id == user_id)
-        .order_by(UserMemory.created_at.desc())
+        .order_by(UserMemory.created_at.desc(), UserMemory.id.desc())
         .limit(limit)
         .all()
     )
 def format_memory_for_prompt(rows: list[UserMemory]) -> str:
-   
+
     if not rows:
         return ""
 
@@ -75,3 +87,49 @@ def format_memory_for_prompt(rows: list[UserMemory]) -> str:
             lines.append(f"- [image preference] {r.image_url}")
 
     return "\n".join(lines)
+
+
+def get_formatted_preferences(db: Session, user_id: int) -> str:
+    if not PREFERENCES_CACHE_ENABLED:
+        return format_memory_for_prompt(get_last_memory(db, user_id, limit=MAX_MEMORY))
+
+    with _lock:
+        cached = _formatted.get(user_id)
+        version = _versions.get(user_id, 0)
+
+    if cached is not None:
+        return cached
+
+    text = format_memory_for_prompt(get_last_memory(db, user_id, limit=MAX_MEMORY))
+
+    with _lock:
+        if _versions.get(user_id, 0) == version:
+            if len(_formatted) >= PREFERENCES_CACHE_MAX_USERS:
+                _formatted.pop(next(iter(_formatted)))
+            _formatted[user_id] = text
+
+    return text
+
+
+# ----------------------------
+# Cache invalidation, applied once the write is committed
+# ----------------------------
+def _invalidate_on_commit(db: Session, user_id: int):
+    db.info.setdefault("memory_changed", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_changed(session: Session):
+    changed = session.info.pop("memory_changed", None)
+    if not changed:
+        return
+
+    with _lock:
+        for user_id in changed:
+            _formatted.pop(user_id, None)
+            _versions[user_id] = _versions.get(user_id, 0) + 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session: Session):
+    session.info.pop("memory_changed", None)
@@ -0,0 +1,228 @@
+"""
+In-process metrics, rendered at /metrics in the Prometheus text format.
+
+Counters and histograms are plain dicts behind a lock: an observation is a
+bisect and two additions, cheap enough to leave on everywhere. Like the job
+queue and the caches they are per process; with several workers, scrape
+each one (or run one).
+
+What is recorded:
+
+    vizzy_http_request_seconds        per route template and status
+    vizzy_db_queries_per_request      statements run while serving a request
+    vizzy_chat_stage_seconds          each numbered step of a chat turn, by turn type
+    vizzy_chat_turn_seconds           whole turns, by turn type
+    vizzy_upstream_request_seconds    every planner / image API call, by provider, model, outcome
+    vizzy_job_stage_seconds           queue wait, generation and persisting of generation jobs
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.config import METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "vizzy_http_request_seconds", "HTTP request latency.", ("method", "route", "status")
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "vizzy_db_queries_per_request", "SQL statements executed per HTTP request.", ("route",), COUNT_BUCKETS
+)
+DB_QUERIES = Counter("vizzy_db_queries_total", "SQL statements executed, in requests or not.")
+CHAT_STAGE_SECONDS = Histogram(
+    "vizzy_chat_stage_seconds", "Time spent in each step of a chat turn.", ("stage", "turn_type")
+)
+CHAT_TURN_SECONDS = Histogram("vizzy_chat_turn_seconds", "Whole chat turns, until the reply is saved.", ("turn_type",))
+UPSTREAM_SECONDS = Histogram(
+    "vizzy_upstream_request_seconds", "Planner and image API calls (each attempt).",
+    ("kind", "provider", "model", "outcome")
+)
+JOB_STAGE_SECONDS = Histogram(
+    "vizzy_job_stage_seconds", "Generation job steps.", ("stage", "provider", "kind")
+)
+
+# per request: [statements run]
+_request_queries: ContextVar[list | None] = ContextVar("request_queries", default=None)
+
+# per chat turn: stage -> seconds, plus the start time
+_turn: ContextVar[dict | None] = ContextVar("chat_turn", default=None)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# Chat turn stages
+# ----------------------------
+def begin_turn():
+    if METRICS_ENABLED:
+        _turn.set({"started": time.perf_counter(), "stages": {}})
+
+
+@contextmanager
+def turn_stage(stage: str):
+    """Times a step of the current chat turn; the turn type is only known at the end."""
+    turn = _turn.get()
+    if turn is None:
+        yield
+        return
+
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        turn["stages"][stage] = turn["stages"].get(stage, 0.0) + time.perf_counter() - t0
+
+
+def end_turn(turn_type: str):
+    turn = _turn.get()
+    if turn is None:
+        return
+    _turn.set(None)
+
+    for stage, seconds in turn["stages"].items():
+        CHAT_STAGE_SECONDS.observe(seconds, stage, turn_type)
+    CHAT_TURN_SECONDS.observe(time.perf_counter() - turn["started"], turn_type)
+
+
+# ----------------------------
+# Upstream calls
+# ----------------------------
+@contextmanager
+def upstream_call(kind: str, provider: str, model: str):
+    """Times one upstream attempt; outcome is "ok" or the error's status code / class name."""
+    if not METRICS_ENABLED:
+        yield
+        return
+
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = getattr(e, "status_code", None)
+        outcome = str(status) if status else type(e).__name__
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - t0, kind, provider, model, outcome)
+
+
+# ----------------------------
+# HTTP requests + DB statements
+# ----------------------------
+class MetricsMiddleware:
+    """Plain ASGI (streaming responses pass straight through), labeled by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        status = [500]
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - t0, scope["method"], path, status[0])
+            DB_QUERIES_PER_REQUEST.observe(queries[0], path)
+
+
+def _count_statement(*args):
+    DB_QUERIES.inc()
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _count_statement)
@@ -0,0 +1,142 @@
+import json
+import time
+import copy
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from app.config import PLANNER_CACHE_ENABLED, PLANNER_CACHE_TTL_SECONDS, PLANNER_CACHE_MAX_ENTRIES
+
+# key -> (stored_at, planner result)
+_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+# key -> future of the upstream call currently running for it
+_inflight: dict[str, asyncio.Future] = {}
+
+# in-process counters, reset on restart
+_stats = {"hits": 0, "misses": 0, "shared": 0}
+
+
+def _collapse_repeats(messages: list[dict]) -> list[dict]:
+    # a double-submit / retry leaves the same user turn in history more than once
+    out = []
+    for m in messages:
+        if out and m["role"] == "user" and out[-1] == m:
+            continue
+        out.append(m)
+
+    # the draft / pending-question system messages sit between history and the
+    # new turn, so the first copy of a resent turn isn't right before it
+    if out and out[-1]["role"] == "user":
+        i = len(out) - 2
+        while i >= 0 and out[i]["role"] == "system":
+            i -= 1
+        if i >= 0 and out[i] == out[-1]:
+            del out[i]
+
+    return out
+
+
+def planner_cache_key(request: dict) -> str:
+    keyed = {**request, "messages": _collapse_repeats(request["messages"])}
+    raw = json.dumps(keyed, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _get(key: str) -> dict | None:
+    item = _cache.get(key)
+    if not item:
+        return None
+
+    stored_at, data = item
+    if time.monotonic() - stored_at > PLANNER_CACHE_TTL_SECONDS:
+        del _cache[key]
+        return None
+
+    _cache.move_to_end(key)
+    return data
+
+
+def _put(key: str, data: dict):
+    _cache[key] = (time.monotonic(), data)
+    _cache.move_to_end(key)
+
+    while len(_cache) > PLANNER_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+async def _replay(data: dict, on_question_delta: Callable[[str], Awaitable[None]] | None) -> dict:
+    # the streaming caller still expects the question text, just in one piece
+    if on_question_delta and data["type"] == "question" and data["questions"]:
+        await on_question_delta(data["questions"][0])
+    return copy.deepcopy(data)
+
+
+async def cached_planner_call(
+    request: dict,
+    call: Callable[[], Awaitable[dict]],
+    on_question_delta: Callable[[str], Awaitable[None]] | None = None
+) -> dict:
+    """
+    Runs `call` (the upstream planner request) unless an identical request
+    was answered recently or is already in flight, in which case its result is reused.
+    """
+    if not PLANNER_CACHE_ENABLED:
+        return await call()
+
+    key = planner_cache_key(request)
+
+    while True:
+        data = _get(key)
+        if data is not None:
+            _stats["hits"] += 1
+            return await _replay(data, on_question_delta)
+
+        pending = _inflight.get(key)
+        if pending is None:
+            break
+
+        try:
+            data = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # the leading request went away (client disconnect): try again ourselves
+            if pending.cancelled():
+                continue
+            raise
+
+        _stats["shared"] += 1
+        return await _replay(data, on_question_delta)
+
+    _stats["misses"] += 1
+
+    future = asyncio.get_running_loop().create_future()
+    # nobody may be waiting on it, don't let asyncio warn about an unread error
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+
+    try:
+        data = await call()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+    _put(key, data)
+    future.set_result(data)
+
+    return copy.deepcopy(data)
+
+
+def planner_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"] + _stats["shared"]
+    return {
+        **_stats,
+        "entries": len(_cache),
+        "in_flight": len(_inflight),
+        "hit_rate": (_stats["hits"] + _stats["shared"]) / lookups if lookups else 0.0
+    }
@@ -0,0 +1,188 @@
+"""
+What the planners send besides their system prompt, under a token budget.
+
+Messages go most-stable first, so the provider's prompt cache (a prefix
+match) reuses as much as possible from one turn to the next:
+
+    system prompt              identical for every request
+    preferences memory         changes when the user finishes a prompt
+    conversation summary       changes when older turns are folded in
+    recent turns               grows by a question/answer pair per turn
+    draft + pending question   changes every turn
+    user message
+
+When the recent turns outgrow PLANNER_HISTORY_MAX_MESSAGES or the budget,
+the oldest are folded into the summary, down to half of both limits, so
+the summary (and with it everything after it) changes every few turns
+rather than on every one.
+"""
+import json
+from dataclasses import dataclass, field
+
+from sqlalchemy.orm import Session
+
+from app.config import (
+    PLANNER_CONTEXT_BUDGET_TOKENS,
+    PLANNER_HISTORY_MAX_MESSAGES,
+    PLANNER_SUMMARY_MAX_TOKENS,
+    PLANNER_PREFERENCES_MAX_TOKENS
+)
+from app.services.history_service import get_recent_messages
+from app.services.conversation_state_service import get_state, get_summary, save_summary
+
+# per-message framing (role, separators) in chat templates
+_MESSAGE_OVERHEAD = 4
+
+# a folded message keeps this much of its text in the summary
+_SUMMARY_LINE_CHARS = 240
+
+
+@dataclass
+class PlannerContext:
+    draft_prompt: str | None = None
+    pending_questions: list[str] = field(default_factory=list)
+    history: list[dict] = field(default_factory=list)
+    summary: str | None = None
+    preferences: str | None = None
+    # estimated tokens of all of the above
+    tokens: int = 0
+
+
+def estimate_tokens(text: str | None) -> int:
+    """~4 characters a token: close enough for English on the Llama and GPT tokenizers, and free."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def message_tokens(message: dict) -> int:
+    content = message["content"]
+    if isinstance(content, list):
+        # vision messages: only the text part is billed as text
+        content = " ".join(p.get("text", "") for p in content if p.get("type") == "text")
+    return estimate_tokens(content) + _MESSAGE_OVERHEAD
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _keep_newest_lines(text: str | None, max_tokens: int, newest_first: bool) -> str | None:
+    """Drops the oldest lines until the block fits."""
+    if not text:
+        return text
+
+    lines = text.splitlines()
+    if not newest_first:
+        lines.reverse()
+
+    kept, used = [], 0
+    for line in lines:
+        used += estimate_tokens(line) + 1
+        if used > max_tokens:
+            break
+        kept.append(line)
+
+    if not newest_first:
+        kept.reverse()
+    return "\n".join(kept)
+
+
+def _fold(summary: str, rows: list[tuple]) -> str:
+    lines = [summary] if summary else []
+    for _, role, text in rows:
+        lines.append(f"{'User' if role == 'user' else 'Assistant'}: {_clip(text, _SUMMARY_LINE_CHARS)}")
+    return _keep_newest_lines("\n".join(lines), PLANNER_SUMMARY_MAX_TOKENS, newest_first=False)
+
+
+def _state_messages(draft_prompt: str | None, pending_questions: list[str]) -> list[dict]:
+    messages = []
+    if draft_prompt:
+        messages.append({"role": "system", "content": f"Current draft prompt:\n{draft_prompt}"})
+    if pending_questions:
+        questions = "\n".join(f"- {q}" for q in pending_questions)
+        messages.append({"role": "system", "content": f"Pending questions previously asked:\n{questions}"})
+    return messages
+
+
+def assemble_planner_context(
+    db: Session,
+    conversation_id: int,
+    user_message: str,
+    preferences: str | None,
+    exclude_message_id: int | None = None
+) -> PlannerContext:
+    """
+    Loads state, summary and recent turns, and folds whatever doesn't fit into
+    the summary. The summary write is left to the caller's commit.
+    """
+    state = get_state(db, conversation_id)
+
+    draft_prompt = state.draft_prompt if state else None
+    pending_questions = []
+
+    if state and state.pending_questions:
+        try:
+            pending_questions = json.loads(state.pending_questions)
+        except ValueError:
+            pending_questions = []
+
+    summary_row = get_summary(db, conversation_id)
+    summary = summary_row.summary if summary_row else ""
+    covered = summary_row.covered_message_id if summary_row else 0
+
+    # a little more than we keep, so nothing slides out of the window before it is folded
+    rows = [
+        r for r in get_recent_messages(db, conversation_id, PLANNER_HISTORY_MAX_MESSAGES + 4)
+        if r[0] > covered and r[0] != exclude_message_id
+    ]
+
+    preferences = _keep_newest_lines(preferences, PLANNER_PREFERENCES_MAX_TOKENS, newest_first=True)
+
+    fixed = estimate_tokens(user_message) + estimate_tokens(preferences) + sum(
+        message_tokens(m) for m in _state_messages(draft_prompt, pending_questions)
+    )
+    history_budget = max(0, PLANNER_CONTEXT_BUDGET_TOKENS - fixed - estimate_tokens(summary))
+
+    row_tokens = [estimate_tokens(text) + _MESSAGE_OVERHEAD for _, _, text in rows]
+
+    if len(rows) > PLANNER_HISTORY_MAX_MESSAGES or sum(row_tokens) > history_budget:
+        # newest first, down to half of both limits
+        keep, used = 0, 0
+        for tokens in reversed(row_tokens):
+            if keep >= PLANNER_HISTORY_MAX_MESSAGES // 2 or used + tokens > history_budget // 2:
+                break
+            keep += 1
+            used += tokens
+
+        folded, rows = rows[:len(rows) - keep], rows[len(rows) - keep:]
+        summary = _fold(summary, folded)
+        save_summary(db, conversation_id, summary, folded[-1][0])
+
+    context = PlannerContext(
+        draft_prompt=draft_prompt,
+        pending_questions=pending_questions,
+        history=[{"role": role, "content": text} for _, role, text in rows],
+        summary=summary or None,
+        preferences=preferences or None
+    )
+    context.tokens = sum(message_tokens(m) for m in build_planner_messages("", context, user_message)[1:])
+    return context
+
+
+def build_planner_messages(system_prompt: str, context: PlannerContext, user_content) -> list[dict]:
+    messages = [{"role": "system", "content": system_prompt}]
+
+    if context.preferences:
+        messages.append({
+            "role": "system",
+            "content": f"User preferences memory (last 25):\n{context.preferences}"
+        })
+
+    if context.summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{context.summary}"})
+
+    messages.extend(context.history)
+    messages.extend(_state_messages(context.draft_prompt, context.pending_questions))
+    messages.append({"role": "user", "content": user_content})
+
+    return messages
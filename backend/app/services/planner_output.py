@@ -0,0 +1,253 @@
+"""
+Structured output for both planners: the reply has to become a valid
+question / final dict without failing the turn if at all possible.
+
+    1. ask for JSON (json_schema or json_object response_format, per model)
+    2. parse; if that fails, repair locally: code fences, prose around the
+       object, trailing commas, raw newlines in strings, and replies cut off
+       mid-object (closed, or cut back to the last complete field)
+    3. only then re-ask once, with the bad reply and what was wrong with it
+
+Counters (upstream calls per successful reply, repairs, re-asks) are in
+planner_output_stats().
+"""
+import json
+import re
+import threading
+from typing import Awaitable, Callable
+
+from app.config import PLANNER_MAX_REASKS
+from app.services.planner_stream import stream_completion
+from app.services.metrics import upstream_call
+
+PLANNER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string", "enum": ["question", "final"]},
+        "questions": {"type": "array", "items": {"type": "string"}},
+        "final_prompt": {"type": ["string", "null"]},
+        "draft_prompt": {"type": ["string", "null"]},
+        "num_outputs": {"type": "integer"},
+        "aspect_ratio": {"type": "string"}
+    },
+    "required": ["type", "questions", "final_prompt", "draft_prompt", "num_outputs", "aspect_ratio"],
+    "additionalProperties": False
+}
+
+# the bad reply is sent back with the re-ask, up to this much of it
+_REASK_ECHO_CHARS = 2000
+
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_CLOSERS = {"{": "}", "[": "]"}
+
+_stats_lock = threading.Lock()
+_stats: dict[str, dict] = {}
+
+
+class PlannerOutputError(ValueError):
+    pass
+
+
+def response_format(mode: str) -> dict:
+    """request kwargs for PLANNER_RESPONSE_FORMAT / VISION_PLANNER_RESPONSE_FORMAT"""
+    if mode == "json_schema":
+        return {"response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": "planner_reply", "schema": PLANNER_SCHEMA, "strict": True}
+        }}
+    if mode == "json_object":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def _close(out: list[str], stack: list[str]) -> str:
+    text = "".join(out).rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def repair_json(raw: str):
+    """json.loads, falling back to the repairs above. Raises PlannerOutputError."""
+    text = (raw or "").strip()
+
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    text = _FENCE_RE.sub("", text)
+    start = text.find("{")
+    if start < 0:
+        raise PlannerOutputError("the reply contains no JSON object")
+
+    out, stack = [], []
+    in_string = escaped = False
+    # (length of out, open brackets) after the last complete field, to cut back to
+    safe = None
+
+    for ch in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                ch = "\\n"
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            # trailing comma before the closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                out.append(ch)
+                break
+        elif ch == ",":
+            safe = (len(out), list(stack))
+
+        out.append(ch)
+
+    if stack:
+        # cut off mid-object
+        candidates = []
+        if in_string:
+            if escaped:
+                out.pop()
+            candidates.append(_close(out + ['"'], stack))
+        else:
+            candidates.append(_close(out, stack))
+        if safe:
+            candidates.append(_close(out[:safe[0]], safe[1]))
+    else:
+        candidates = ["".join(out)]
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate, strict=False)
+        except ValueError:
+            continue
+
+    raise PlannerOutputError("the reply is not valid JSON")
+
+
+def normalize_reply(data) -> dict:
+    """Validates a parsed reply and fills in defaults. Raises PlannerOutputError."""
+    if not isinstance(data, dict):
+        raise PlannerOutputError("the reply is not a JSON object")
+
+    questions = data.get("questions") or []
+    if isinstance(questions, str):
+        questions = [questions]
+    questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()]
+
+    kind = data.get("type")
+    if kind is None:
+        # left out, but the rest of the reply says which one it is
+        kind = "final" if data.get("final_prompt") else "question" if questions else None
+
+    if kind not in ("question", "final"):
+        raise PlannerOutputError('"type" must be "question" or "final"')
+
+    if kind == "final" and not (isinstance(data.get("final_prompt"), str) and data["final_prompt"].strip()):
+        raise PlannerOutputError('type "final" needs a non-empty "final_prompt"')
+
+    try:
+        num_outputs = int(data.get("num_outputs") or 4)
+    except (TypeError, ValueError):
+        num_outputs = 4
+
+    return {
+        **data,
+        "type": kind,
+        "questions": questions[:1] if kind == "question" else [],
+        "final_prompt": data["final_prompt"].strip() if kind == "final" else None,
+        "num_outputs": num_outputs,
+        "aspect_ratio": data.get("aspect_ratio") or "1:1"
+    }
+
+
+def _count(name: str, **deltas):
+    with _stats_lock:
+        counters = _stats.setdefault(name, {"replies": 0, "upstream_calls": 0, "repaired": 0, "reasked": 0, "failed": 0})
+        for key, delta in deltas.items():
+            counters[key] += delta
+
+
+async def structured_planner_call(
+    client,
+    request: dict,
+    on_question_delta: Callable[[str], Awaitable[None]] | None,
+    name: str,
+    provider: str
+) -> dict:
+    """
+    One planner reply as a normalized dict. `name` labels the counters and
+    errors ("planner", "vision planner"), `provider` the upstream latency metric.
+    """
+    kind = name.replace(" ", "_")
+    messages = request["messages"]
+    last_error = None
+
+    for attempt in range(PLANNER_MAX_REASKS + 1):
+        _count(name, upstream_calls=1)
+
+        with upstream_call(kind, provider, request["model"]):
+            # a re-ask is never streamed: part of the first question may already be on screen
+            if on_question_delta and attempt == 0:
+                raw = await stream_completion(client, on_question_delta, **request)
+            else:
+                resp = await client.chat.completions.create(**{**request, "messages": messages})
+                raw = resp.choices[0].message.content or ""
+
+        raw = raw.strip()
+
+        try:
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = repair_json(raw)
+                _count(name, repaired=1)
+
+            data = normalize_reply(data)
+        except PlannerOutputError as e:
+            last_error = f"{e}:\n{raw}"
+
+            if attempt < PLANNER_MAX_REASKS:
+                _count(name, reasked=1)
+                messages = request["messages"] + [
+                    {"role": "assistant", "content": raw[:_REASK_ECHO_CHARS]},
+                    {"role": "user", "content": f"That reply could not be used: {e}. Reply again with only the JSON object, in the format given above."}
+                ]
+            continue
+
+        _count(name, replies=1)
+        return data
+
+    _count(name, failed=1)
+    raise RuntimeError(f"{name.capitalize()} returned unusable JSON: {last_error}")
+
+
+def planner_output_stats() -> dict:
+    with _stats_lock:
+        return {
+            name: {
+                **counters,
+                "calls_per_reply": counters["upstream_calls"] / counters["replies"] if counters["replies"] else 0.0
+            }
+            for name, counters in _stats.items()
+        }
@@ -1,6 +1,9 @@
-import json
-from groq import Groq
-from app.config import GROQ_API_KEY, PLANNER_MODEL
+from typing import Awaitable, Callable
+from app.config import GROQ_API_KEY, PLANNER_MODEL, PLANNER_RESPONSE_FORMAT, PLANNER_PROVIDER
+from app.services.clients import get_groq_client
+from app.services.planner_output import response_format, structured_planner_call
+from app.services.planner_cache import cached_planner_call
+from app.services.planner_context import PlannerContext, build_planner_messages
 
 
 SYSTEM_PROMPT = """
@@ -55,66 +58,29 @@ Return JSON format:
 
 
 
-def run_planner(
+async def run_planner(
     user_message: str,
-    history: list[dict],
-    draft_prompt: str | None = None,
-    pending_questions: list[str] | None = None,
-    preferences_memory: str | None = None
+    context: PlannerContext,
+    on_question_delta: Callable[[str], Awaitable[None]] | None = None
 ) -> dict:
     
 
     if not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY missing in .env")
 
-    client = Groq(api_key=GROQ_API_KEY)
+    messages = build_planner_messages(SYSTEM_PROMPT, context, user_message)
 
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
-    if preferences_memory:
-        messages.append({
-            "role": "system",
-            "content": f"User preferences memory (last 25):\n{preferences_memory}"
-        })
-
-    if draft_prompt:
-        messages.append({"role": "system", "content": f"Current draft prompt:\n{draft_prompt}"})
-
-    if pending_questions:
-        messages.append({"role": "system", "content": f"Pending questions previously asked:\n{pending_questions}"})
-
-    if history:
-        messages.extend(history[-20:])
-
-    messages.append({"role": "user", "content": user_message})
-
-
-    resp = client.chat.completions.create(
+    request = dict(
         model=PLANNER_MODEL,
         messages=messages,
         temperature=0.2,
+        **response_format(PLANNER_RESPONSE_FORMAT)
     )
 
-    raw = resp.choices[0].message.content.strip()
-
-    try:
-        data = json.loads(raw)
-    except Exception:
-        raise RuntimeError(f"Planner returned invalid JSON:\n{raw}")
-
-    if "type" not in data:
-        raise RuntimeError(f"Planner JSON missing type:\n{raw}")
-
-    if data["type"] == "question":
-        data["final_prompt"] = None
-        data["questions"] = (data.get("questions") or [])[:1]
-
-    if data["type"] == "final":
-        if not data.get("final_prompt"):
-            raise RuntimeError(f"Planner returned final without final_prompt:\n{raw}")
-        data["questions"] = []
+    client = get_groq_client()
 
-    data["num_outputs"] = int(data.get("num_outputs") or 4)
-    data["aspect_ratio"] = data.get("aspect_ratio") or "1:1"
+    async def call_planner() -> dict:
+        return await structured_planner_call(client, request, on_question_delta, "planner", PLANNER_PROVIDER)
 
-    return data
+    return await cached_planner_call(request, call_planner, on_question_delta)
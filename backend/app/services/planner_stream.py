@@ -0,0 +1,104 @@
+import re
+from typing import Awaitable, Callable
+
+_QUESTIONS_START = re.compile(r'"questions"\s*:\s*\[\s*"')
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class QuestionStreamer:
+    """
+    Pulls the first entry of "questions" out of a planner JSON reply while it
+    is still being streamed, so the question can be shown token by token.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        if self.done or not chunk:
+            return ""
+
+        self.buf += chunk
+
+        if self.pos is None:
+            m = _QUESTIONS_START.search(self.buf)
+            if not m:
+                return ""
+            self.pos = m.end()
+
+        out = []
+        i = self.pos
+        n = len(self.buf)
+
+        while i < n:
+            ch = self.buf[i]
+
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+
+            # escape sequence: wait for the rest of it if it was split across chunks
+            if i + 1 >= n:
+                break
+
+            esc = self.buf[i + 1]
+            if esc == "u":
+                if i + 6 > n:
+                    break
+                try:
+                    code = int(self.buf[i + 2:i + 6], 16)
+                except ValueError:
+                    code = None
+
+                # emoji etc. arrive as a surrogate pair: \ud83c\udfa8
+                if code is not None and 0xD800 <= code < 0xDC00:
+                    if i + 12 > n:
+                        break
+                    try:
+                        low = int(self.buf[i + 8:i + 12], 16)
+                    except ValueError:
+                        low = 0
+                    if self.buf[i + 6:i + 8] == "\\u" and 0xDC00 <= low < 0xE000:
+                        out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                        i += 12
+                        continue
+
+                if code is not None and not 0xD800 <= code < 0xE000:
+                    out.append(chr(code))
+                i += 6
+            else:
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+
+        self.pos = i
+        return "".join(out)
+
+
+async def stream_completion(client, on_question_delta: Callable[[str], Awaitable[None]], **kwargs) -> str:
+    """Streams a chat completion, forwarding question text as it arrives. Returns the full raw reply."""
+    streamer = QuestionStreamer()
+    parts = []
+
+    stream = await client.chat.completions.create(stream=True, **kwargs)
+
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+
+        delta = chunk.choices[0].delta.content or ""
+        parts.append(delta)
+
+        text = streamer.feed(delta)
+        if text:
+            await on_question_delta(text)
+
+    return "".join(parts)
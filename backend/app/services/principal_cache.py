@@ -0,0 +1,109 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller. Enough for ownership checks, so routes never load the User row."""
+    id: int
+    email: str
+
+
+# token -> (expires at, monotonic clock; principal)
+_cache: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+
+# user_id -> bumped when the user is deleted or changes password/email, so a
+# lookup that raced with that change never caches the old identity
+_versions: dict[int, int] = {}
+
+# get_current_user runs on the event loop, the invalidation hooks on threadpool threads
+_lock = threading.Lock()
+
+
+def principal_version(user_id: int) -> int:
+    with _lock:
+        return _versions.get(user_id, 0)
+
+
+def get_cached_principal(token: str) -> Principal | None:
+    with _lock:
+        item = _cache.get(token)
+        if not item:
+            return None
+
+        expires_at, principal = item
+        if time.monotonic() >= expires_at:
+            del _cache[token]
+            return None
+
+        _cache.move_to_end(token)
+        return principal
+
+
+def cache_principal(token: str, principal: Principal, version: int, token_exp: float | None):
+    ttl = AUTH_CACHE_TTL_SECONDS
+
+    # never outlive the token itself
+    if token_exp is not None:
+        ttl = min(ttl, token_exp - time.time())
+
+    if ttl <= 0:
+        return
+
+    with _lock:
+        if _versions.get(principal.id, 0) != version:
+            return
+
+        _cache[token] = (time.monotonic() + ttl, principal)
+        _cache.move_to_end(token)
+
+        while len(_cache) > AUTH_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def invalidate_user(user_id: int):
+    with _lock:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+
+        for token in [t for t, (_, p) in _cache.items() if p.id == user_id]:
+            del _cache[token]
+
+
+# ----------------------------
+# Drop cached identities once a delete / credential change is committed
+# ----------------------------
+def _mark_changed(target: User):
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault("auth_changed", set()).add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User):
+    _mark_changed(target)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User):
+    state = inspect(target)
+    if state.attrs.password_hash.history.has_changes() or state.attrs.email.history.has_changes():
+        _mark_changed(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_changed(session: Session):
+    for user_id in session.info.pop("auth_changed", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session: Session):
+    session.info.pop("auth_changed", None)
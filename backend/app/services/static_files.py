@@ -0,0 +1,222 @@
+"""
+StaticFiles with HTTP caching, for /storage, /mockups and /frontend.
+
+Files whose name is never reused (content-addressed blobs, uuid-named legacy
+files) go out as `immutable`, so reopening a conversation doesn't even
+revalidate its images. Everything else is `no-cache`: the browser asks again
+and gets a 304 while the ETag matches.
+
+ETags are strong: the sha256 in a content-addressed name, otherwise the
+sha256 of the file, computed once per (path, mtime, size). Text files are
+sent gzip'd/brotli'd when the client accepts it, from a `.br`/`.gz` file next
+to them if there is one, else gzip'd once and kept in memory. Images are
+already compressed; the AVIF/WebP variants are their smaller encodings.
+
+Range requests (and If-Range against our ETag) are left to FileResponse.
+"""
+import os
+import re
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.config import STATIC_IMMUTABLE_MAX_AGE, STATIC_ETAG_CACHE_SIZE, STATIC_GZIP_MAX_BYTES
+
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}\.[A-Za-z0-9]+$")
+_UUID_NAME = re.compile(r"^[0-9a-f]{32}\.[A-Za-z0-9]+$")
+
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# below this, compression headers cost more than they save
+_COMPRESS_MIN_BYTES = 1024
+
+_READ_CHUNK = 1024 * 1024
+
+# (path, mtime_ns, size) -> sha256 hex / gzip'd body
+_etags: OrderedDict[tuple, str] = OrderedDict()
+_gzipped: OrderedDict[tuple, bytes] = OrderedDict()
+_GZIP_CACHE_ENTRIES = 256
+
+# responses are built on the event loop, hashes and gzip bodies in the threadpool
+_lock = threading.Lock()
+
+
+def _cache_get(cache: OrderedDict, key: tuple):
+    with _lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache: OrderedDict, key: tuple, value, max_entries: int):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+
+
+def _file_key(full_path: str, stat_result: os.stat_result) -> tuple:
+    return (full_path, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def _hash_file(full_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _gzip_file(full_path: str) -> bytes:
+    with open(full_path, "rb") as f:
+        return gzip.compress(f.read(), compresslevel=9, mtime=0)
+
+
+def _accepted_encodings(headers: Headers) -> set[str]:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def _not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+class _AssetResponse:
+    """Defers to AssetFiles.build_response, which has to await (hashing, gzip)."""
+
+    def __init__(self, files: "AssetFiles", full_path: str, stat_result: os.stat_result, status_code: int):
+        self.files = files
+        self.full_path = full_path
+        self.stat_result = stat_result
+        self.status_code = status_code
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        response = await self.files.build_response(self.full_path, self.stat_result, scope, self.status_code)
+        await response(scope, receive, send)
+
+
+class AssetFiles(StaticFiles):
+    """
+    immutable_dirs: top-level directories whose hash/uuid-named files are never
+    rewritten (storage/generated, ...). compress: serve text files compressed.
+    """
+
+    def __init__(self, *args, immutable_dirs: tuple[str, ...] = (), compress: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_dirs = tuple(immutable_dirs)
+        self.compress = compress
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        return _AssetResponse(self, full_path, stat_result, status_code)
+
+    def _content_addressed(self, rel_path: str) -> bool:
+        parts = rel_path.replace(os.sep, "/").split("/")
+        return len(parts) > 1 and parts[0] in self.immutable_dirs and bool(_SHA256_NAME.match(parts[-1]))
+
+    def _immutable(self, rel_path: str) -> bool:
+        parts = rel_path.replace(os.sep, "/").split("/")
+        name = parts[-1]
+        return len(parts) > 1 and parts[0] in self.immutable_dirs and bool(
+            _SHA256_NAME.match(name) or _UUID_NAME.match(name)
+        )
+
+    async def _etag(self, rel_path: str, full_path: str, stat_result: os.stat_result) -> str:
+        if self._content_addressed(rel_path):
+            return os.path.basename(full_path).split(".", 1)[0]
+
+        key = _file_key(full_path, stat_result)
+        etag = _cache_get(_etags, key)
+        if etag is None:
+            etag = await anyio.to_thread.run_sync(_hash_file, full_path)
+            _cache_put(_etags, key, etag, STATIC_ETAG_CACHE_SIZE)
+        return etag
+
+    async def _compressed(self, full_path: str, stat_result: os.stat_result, accepted: set[str]):
+        """(encoding, sidecar path or None, gzip'd body or None), or None to send the file as is."""
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding in accepted and await anyio.to_thread.run_sync(os.path.isfile, full_path + suffix):
+                return encoding, full_path + suffix, None
+
+        if "gzip" not in accepted or stat_result.st_size > STATIC_GZIP_MAX_BYTES:
+            return None
+
+        key = _file_key(full_path, stat_result)
+        body = _cache_get(_gzipped, key)
+        if body is None:
+            body = await anyio.to_thread.run_sync(_gzip_file, full_path)
+            _cache_put(_gzipped, key, body, _GZIP_CACHE_ENTRIES)
+        return "gzip", None, body
+
+    async def build_response(self, full_path: str, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        rel_path = self.get_path(scope)
+        media_type = guess_type(full_path)[0] or "text/plain"
+
+        etag = await self._etag(rel_path, full_path, stat_result)
+        headers = {
+            "cache-control": (
+                f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+                if self._immutable(rel_path) else "public, no-cache"
+            )
+        }
+
+        compressed = None
+        if self.compress and media_type.startswith(_COMPRESSIBLE) and stat_result.st_size >= _COMPRESS_MIN_BYTES:
+            headers["vary"] = "Accept-Encoding"
+            compressed = await self._compressed(full_path, stat_result, _accepted_encodings(request_headers))
+
+        # each encoding is its own representation, so it gets its own strong tag
+        headers["etag"] = f'"{etag}-{compressed[0]}"' if compressed else f'"{etag}"'
+
+        if status_code == 200 and _not_modified(request_headers, headers["etag"], stat_result.st_mtime):
+            return NotModifiedResponse(Headers(headers))
+
+        if compressed is None:
+            return FileResponse(
+                full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+            )
+
+        encoding, sidecar, body = compressed
+        headers["content-encoding"] = encoding
+        if sidecar:
+            return FileResponse(sidecar, status_code=status_code, headers=headers, media_type=media_type)
+
+        # compressed in memory: no ranges, the whole body is small anyway
+        headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        return Response(body, status_code=status_code, headers=headers, media_type=media_type)
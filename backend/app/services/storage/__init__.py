@@ -0,0 +1,58 @@
+import base64
+import threading
+
+from app.config import (
+    BASE_URL,
+    STORAGE_BACKEND,
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_REGION,
+    S3_PUBLIC_BASE_URL,
+    S3_KEY_PREFIX,
+    S3_MAX_POOL_CONNECTIONS
+)
+from app.services.storage.base import BlobStore, StoredBlob
+
+_store: BlobStore | None = None
+_lock = threading.Lock()
+
+
+def _build_store() -> BlobStore:
+    if STORAGE_BACKEND == "s3":
+        from app.services.storage.s3 import S3BlobStore
+
+        return S3BlobStore(
+            bucket=S3_BUCKET,
+            endpoint_url=S3_ENDPOINT_URL,
+            region=S3_REGION,
+            public_base_url=S3_PUBLIC_BASE_URL,
+            key_prefix=S3_KEY_PREFIX,
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS
+        )
+
+    if STORAGE_BACKEND != "local":
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+    from app.services.storage.local import LocalBlobStore
+
+    return LocalBlobStore("storage", BASE_URL)
+
+
+def get_storage() -> BlobStore:
+    """The configured blob store (built on first use; called from worker threads too)."""
+    global _store
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = _build_store()
+
+    return _store
+
+
+def save_b64_image(b64_json: str) -> str:
+    """Stores a base64 PNG from an image API response, returns its URL (blocking: run in a thread)."""
+    return get_storage().put(base64.b64decode(b64_json), "png", "image/png").url
+
+
+__all__ = ["BlobStore", "StoredBlob", "get_storage", "save_b64_image"]
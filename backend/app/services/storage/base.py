@@ -0,0 +1,75 @@
+import hashlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator
+
+
+@dataclass
+class StoredBlob:
+    url: str
+    key: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+# top-level key prefixes: generated images, and their downscaled variants
+BLOB_PREFIXES = ("generated", "variants")
+
+
+@dataclass
+class BlobInfo:
+    url: str
+    size: int
+    mtime: float
+
+
+def blob_key(data: bytes, ext: str, prefix: str = "generated") -> tuple[str, str]:
+    """(sha256, key) for content-addressed storage: <prefix>/ab/cd/<sha256>.<ext>"""
+    sha256 = hashlib.sha256(data).hexdigest()
+    return sha256, f"{prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}.{ext}"
+
+
+class BlobStore(ABC):
+    """
+    Where generated images live. Blobs are keyed by content hash, so writing
+    the same bytes twice stores them once and a stored blob never changes.
+    A backend missing one of the abstract methods fails when it is built.
+    """
+
+    name = "base"
+
+    # every URL this store hands out starts with this
+    url_prefix = ""
+
+    @abstractmethod
+    def put(self, data: bytes, ext: str = "png", content_type: str = "image/png", prefix: str = "generated") -> StoredBlob:
+        ...
+
+    @abstractmethod
+    def owns_url(self, url: str) -> bool:
+        ...
+
+    def local_path(self, url: str) -> str | None:
+        """File on this machine behind the URL, if there is one."""
+        return None
+
+    @abstractmethod
+    def stat(self, url: str) -> BlobInfo | None:
+        ...
+
+    def size(self, url: str) -> int | None:
+        info = self.stat(url)
+        return info.size if info else None
+
+    @abstractmethod
+    def download(self, url: str, dest_path: str):
+        ...
+
+    @abstractmethod
+    def delete(self, url: str) -> bool:
+        ...
+
+    @abstractmethod
+    def iter_blobs(self) -> Iterator[BlobInfo]:
+        """Every stored blob, streamed (never the whole listing in memory)."""
@@ -0,0 +1,111 @@
+import os
+import uuid
+from typing import Iterator
+
+from app.services.storage.base import BLOB_PREFIXES, BlobInfo, BlobStore, StoredBlob, blob_key
+from app.services.storage_resolver import local_path_for_url
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs under storage/<prefix>/ab/cd/<sha256>.<ext>, served by the /storage
+    StaticFiles mount. Two-level hash sharding keeps directories small.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = "storage", base_url: str = ""):
+        self.root = root
+        self.base_url = base_url
+        self.url_prefix = f"{base_url}/storage/"
+
+    def put(self, data: bytes, ext: str = "png", content_type: str = "image/png", prefix: str = "generated") -> StoredBlob:
+        sha256, key = blob_key(data, ext, prefix)
+        path = os.path.join(self.root, key)
+        url = f"{self.base_url}/storage/{key}"
+
+        if os.path.exists(path):
+            # fresh use of the blob: storage GC leaves recently touched files alone, so a
+            # sweep can't delete it between here and the new asset row being committed
+            os.utime(path)
+            return StoredBlob(url=url, key=key, sha256=sha256, size=len(data), deduplicated=True)
+
+        shard_dir = os.path.dirname(path)
+        os.makedirs(shard_dir, exist_ok=True)
+        partial_path = os.path.join(shard_dir, f".{uuid.uuid4().hex}.partial")
+
+        # written in full and synced before the rename: a file under its hash name is
+        # always complete, so later writes can trust it for dedup
+        try:
+            with open(partial_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial_path, path)
+        except BaseException:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            raise
+
+        return StoredBlob(url=url, key=key, sha256=sha256, size=len(data), deduplicated=False)
+
+    def local_path(self, url: str) -> str | None:
+        # storage/... as served by the /storage mount, re-rooted at self.root
+        path = local_path_for_url(url)
+        if not path or not path.startswith("storage" + os.sep):
+            return None
+
+        rel = os.path.relpath(path, "storage")
+
+        # only our blobs (including pre-sharding generated/<uuid>.png) belong to us
+        if rel.split(os.sep, 1)[0] not in BLOB_PREFIXES:
+            return None
+
+        return os.path.join(self.root, rel)
+
+    def owns_url(self, url: str) -> bool:
+        return self.local_path(url) is not None
+
+    def stat(self, url: str) -> BlobInfo | None:
+        path = self.local_path(url)
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            return None
+        return BlobInfo(url=url, size=stat.st_size, mtime=stat.st_mtime) if stat else None
+
+    def download(self, url: str, dest_path: str):
+        raise RuntimeError("Local blobs are read in place, see local_path()")
+
+    def delete(self, url: str) -> bool:
+        path = self.local_path(url)
+        if not path:
+            return False
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def iter_blobs(self) -> Iterator[BlobInfo]:
+        for prefix in BLOB_PREFIXES:
+            yield from self._walk(os.path.join(self.root, prefix))
+
+    def _walk(self, directory: str) -> Iterator[BlobInfo]:
+        # scandir streams entries and hands back the stat, so a directory
+        # never has to be listed into memory in full
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            return
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._walk(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    rel = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+                    yield BlobInfo(url=f"{self.url_prefix}{rel}", size=stat.st_size, mtime=stat.st_mtime)
@@ -0,0 +1,147 @@
+from typing import Iterator
+from urllib.parse import quote, unquote
+
+from app.services.storage.base import BLOB_PREFIXES, BlobInfo, BlobStore, StoredBlob, blob_key
+
+# content-addressed keys never change, so clients/CDNs may cache them forever
+_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class S3BlobStore(BlobStore):
+    """
+    Blobs in an S3-compatible bucket (AWS S3, MinIO, moto server, ...).
+    Asset URLs point at public_base_url, e.g. a CDN or a public-read bucket.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        public_base_url: str | None = None,
+        key_prefix: str = "",
+        max_pool_connections: int = 10
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import BotoCoreError, ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 (pip install boto3)")
+
+        if not bucket:
+            raise RuntimeError("S3_BUCKET missing in .env")
+
+        self.bucket = bucket
+        self.key_prefix = key_prefix.strip("/")
+        self._client_error = ClientError
+        self._errors = (BotoCoreError, ClientError)
+
+        # boto3 clients are thread-safe; the pool covers concurrent job writes
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                retries={"max_attempts": 3, "mode": "standard"}
+            )
+        )
+
+        if public_base_url:
+            self.public_base_url = public_base_url.rstrip("/")
+        elif endpoint_url:
+            # path-style, what MinIO and moto serve
+            self.public_base_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_base_url = f"https://{bucket}.s3.{region or 'us-east-1'}.amazonaws.com"
+
+        self.url_prefix = self.public_base_url + "/"
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}/{key}" if self.key_prefix else key
+
+    def _key_for_url(self, url: str) -> str | None:
+        if not url or not url.startswith(self.url_prefix):
+            return None
+        return unquote(url[len(self.url_prefix):].split("?", 1)[0])
+
+    def _head(self, key: str) -> dict | None:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put(self, data: bytes, ext: str = "png", content_type: str = "image/png", prefix: str = "generated") -> StoredBlob:
+        sha256, key = blob_key(data, ext, prefix)
+        key = self._key(key)
+        url = f"{self.public_base_url}/{quote(key)}"
+
+        # a HEAD is much cheaper than re-uploading a few MB we already have
+        if self._head(key) is not None:
+            # copy onto itself to bump LastModified: storage GC leaves recently touched
+            # objects alone, so it can't delete this one before the new asset row exists
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE",
+                ContentType=content_type,
+                CacheControl=_CACHE_CONTROL
+            )
+            return StoredBlob(url=url, key=key, sha256=sha256, size=len(data), deduplicated=True)
+
+        # single PUT: the object only becomes visible once fully uploaded
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=_CACHE_CONTROL
+        )
+
+        return StoredBlob(url=url, key=key, sha256=sha256, size=len(data), deduplicated=False)
+
+    def owns_url(self, url: str) -> bool:
+        return self._key_for_url(url) is not None
+
+    def stat(self, url: str) -> BlobInfo | None:
+        key = self._key_for_url(url)
+        head = self._head(key) if key else None
+        if not head:
+            return None
+        return BlobInfo(url=url, size=head["ContentLength"], mtime=head["LastModified"].timestamp())
+
+    def download(self, url: str, dest_path: str):
+        key = self._key_for_url(url)
+        if not key:
+            raise RuntimeError(f"Not a {self.bucket} URL: {url}")
+        self.client.download_file(self.bucket, key, dest_path)
+
+    def delete(self, url: str) -> bool:
+        key = self._key_for_url(url)
+        if not key:
+            return False
+        # callers treat deletion as best effort (like os.remove on a local file)
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+            return True
+        except self._errors:
+            return False
+
+    def iter_blobs(self) -> Iterator[BlobInfo]:
+        # ListObjectsV2 pages of up to 1000 keys
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        for prefix in BLOB_PREFIXES:
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix) + "/"):
+                for obj in page.get("Contents", []):
+                    yield BlobInfo(
+                        url=f"{self.public_base_url}/{quote(obj['Key'])}",
+                        size=obj["Size"],
+                        mtime=obj["LastModified"].timestamp()
+                    )
@@ -0,0 +1,414 @@
+"""
+Storage garbage collection.
+
+A sweep:
+  1. expires reference uploads in storage/tmp after UPLOAD_TTL_SECONDS (unless a
+     queued/running job still needs one), stale partial writes and remote inputs
+     past REMOTE_INPUT_CACHE_TTL_SECONDS
+  2. streams every blob out of the storage backend in batches of GC_BATCH_SIZE and
+     deletes those no asset, live variant or generation cache entry points at
+     (set difference per batch, so memory stays flat however many files there are)
+  3. drops variant rows of images nothing shows any more, and recomputes each
+     user's storage usage from the batches it already walked
+
+Run by hand from backend/:
+    python -m app.services.storage_gc --dry-run
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from datetime import datetime
+from itertools import islice
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.config import (
+    GC_INTERVAL_SECONDS,
+    GC_DRY_RUN,
+    GC_GRACE_SECONDS,
+    GC_BATCH_SIZE,
+    UPLOAD_TTL_SECONDS,
+    REMOTE_INPUT_CACHE_TTL_SECONDS,
+    USER_STORAGE_QUOTA_BYTES
+)
+from app.models.asset import Asset
+from app.models.asset_variant import AssetVariant
+from app.models.message import Message
+from app.models.conversation import Conversation
+from app.models.generation_job import GenerationJob
+from app.models.generation_cache import GenerationCacheEntry
+from app.models.user_storage_usage import UserStorageUsage
+from app.services.storage import get_storage
+from app.services.storage.base import BlobStore
+from app.services.storage_quota import user_urls, adjust_usage
+from app.services.storage_resolver import REMOTE_CACHE_DIR, local_path_for_url
+from app.services.upload_service import UPLOAD_DIR, PARTIAL_DIR
+
+logger = logging.getLogger(__name__)
+
+# how many deletion candidates a report lists
+_EXAMPLES = 20
+
+_last_report: dict | None = None
+_task: asyncio.Task | None = None
+_stopping = threading.Event()
+
+
+def _batched(iterable, size: int):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ----------------------------
+# What is still in use
+# ----------------------------
+def _cached_urls(db: Session) -> set[str]:
+    # bounded by GENERATION_CACHE_MAX_ENTRIES
+    urls = set()
+    for row in db.query(GenerationCacheEntry.urls):
+        urls.update(json.loads(row.urls))
+    return urls
+
+
+def _active_job_inputs(db: Session) -> set[str]:
+    rows = db.query(GenerationJob.image_url).filter(
+        GenerationJob.status.in_(["queued", "running"]),
+        GenerationJob.image_url.isnot(None)
+    )
+    return {r.image_url for r in rows}
+
+
+def _asset_owners(db: Session, urls: list[str]) -> list[tuple[str, int]]:
+    """(url, user id) for every user whose assets show one of these urls"""
+    return (
+        db.query(Asset.url, Conversation.user_id)
+        .join(Message, Asset.message_id == Message.id)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .filter(Asset.url.in_(urls))
+        .distinct()
+        .all()
+    )
+
+
+def _live_variant_urls(db: Session, urls: list[str], cached: set[str]) -> set[str]:
+    """Variant files among urls whose source image is still shown (or cached)"""
+    by_source: dict[str, set[str]] = {}
+    for row in db.query(AssetVariant.url, AssetVariant.source_url).filter(AssetVariant.url.in_(urls)):
+        by_source.setdefault(row.source_url, set()).add(row.url)
+
+    if not by_source:
+        return set()
+
+    live_sources = {s for s in by_source if s in cached}
+    live_sources |= {
+        r.url for r in db.query(Asset.url).filter(Asset.url.in_(list(by_source))).distinct()
+    }
+
+    return {url for source in live_sources for url in by_source[source]}
+
+
+def _base_url_mismatch(db: Session, storage: BlobStore) -> int:
+    """
+    Assets pointing at local generated files under some other base URL. Their
+    files would look unreferenced, so the blob sweep refuses to run while any exist.
+    """
+    if storage.name != "local":
+        return 0
+
+    return db.query(func.count(Asset.id)).filter(
+        Asset.url.like("%/storage/generated/%") | Asset.url.like("%/storage/variants/%"),
+        ~Asset.url.startswith(storage.url_prefix)
+    ).scalar()
+
+
+# ----------------------------
+# Sweep steps
+# ----------------------------
+def _expire_files(
+    directory: str,
+    max_age: float,
+    now: float,
+    dry_run: bool,
+    stats: dict,
+    keep: set[str] = frozenset(),
+    partial_max_age: float | None = None
+):
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+
+    with entries:
+        for entry in entries:
+            if _stopping.is_set():
+                return
+            if not entry.is_file(follow_symlinks=False):
+                continue
+
+            stat = entry.stat(follow_symlinks=False)
+            stats["scanned"] += 1
+
+            limit = partial_max_age if partial_max_age is not None and entry.name.startswith(".") else max_age
+            if entry.path in keep or now - stat.st_mtime < limit:
+                continue
+
+            stats["expired"] += 1
+            stats["expired_bytes"] += stat.st_size
+
+            if not dry_run:
+                try:
+                    os.remove(entry.path)
+                    stats["deleted"] += 1
+                except OSError:
+                    pass
+
+
+def _sweep_blobs(db: Session, storage: BlobStore, cached: set[str], now: float, dry_run: bool, stats: dict) -> dict:
+    """Deletes unreferenced blobs; returns user id -> [bytes, files] of what their assets show."""
+    usage: dict[int, list[int]] = {}
+
+    for batch in _batched(storage.iter_blobs(), GC_BATCH_SIZE):
+        if _stopping.is_set():
+            stats["interrupted"] = True
+            break
+
+        urls = [blob.url for blob in batch]
+        sizes = {blob.url: blob.size for blob in batch}
+
+        owners = _asset_owners(db, urls)
+        referenced = {url for url, _ in owners}
+        referenced |= cached.intersection(urls)
+        referenced |= _live_variant_urls(db, urls, cached)
+
+        # end the read transaction between batches, the walk can take minutes
+        db.rollback()
+
+        for url, user_id in owners:
+            totals = usage.setdefault(user_id, [0, 0])
+            totals[0] += sizes[url]
+            totals[1] += 1
+
+        for blob in batch:
+            stats["scanned"] += 1
+            stats["scanned_bytes"] += blob.size
+
+            if blob.url in referenced:
+                stats["referenced"] += 1
+                continue
+
+            # may belong to a job that has not committed its assets yet
+            if now - blob.mtime < GC_GRACE_SECONDS:
+                stats["recent"] += 1
+                continue
+
+            stats["orphaned"] += 1
+            stats["orphaned_bytes"] += blob.size
+            if len(stats["examples"]) < _EXAMPLES:
+                stats["examples"].append(blob.url)
+
+            if not dry_run and storage.delete(blob.url):
+                stats["deleted"] += 1
+
+    return usage
+
+
+def _prune_variant_rows(db: Session, cached: set[str], dry_run: bool) -> int:
+    """Variant rows whose source image no asset shows (their files go in the next blob sweep)."""
+    orphaned = (
+        db.query(AssetVariant.source_url)
+        .filter(~exists().where(Asset.url == AssetVariant.source_url))
+        .distinct()
+    )
+    if cached:
+        orphaned = orphaned.filter(~AssetVariant.source_url.in_(cached))
+
+    if dry_run:
+        return orphaned.count()
+
+    pruned = 0
+    while not _stopping.is_set():
+        sources = [r.source_url for r in orphaned.limit(GC_BATCH_SIZE)]
+        if not sources:
+            break
+
+        db.query(AssetVariant).filter(AssetVariant.source_url.in_(sources)).delete(synchronize_session=False)
+        db.commit()
+        pruned += len(sources)
+
+    return pruned
+
+
+def _write_usage(db: Session, usage: dict[int, list[int]]):
+    db.query(UserStorageUsage).delete(synchronize_session=False)
+    db.add_all([
+        UserStorageUsage(user_id=user_id, used_bytes=total, files=files, updated_at=datetime.utcnow())
+        for user_id, (total, files) in usage.items()
+    ])
+    db.commit()
+
+
+def run_sweep(dry_run: bool | None = None) -> dict:
+    global _last_report
+
+    dry_run = GC_DRY_RUN if dry_run is None else dry_run
+    started = time.time()
+    storage = get_storage()
+
+    def file_stats():
+        return {"scanned": 0, "expired": 0, "expired_bytes": 0, "deleted": 0}
+
+    report = {
+        "dry_run": dry_run,
+        "started_at": datetime.utcnow().isoformat(),
+        "backend": storage.name,
+        "tmp_uploads": file_stats(),
+        "partial_uploads": file_stats(),
+        "remote_inputs": file_stats(),
+        "blobs": {
+            "scanned": 0, "scanned_bytes": 0, "referenced": 0, "recent": 0,
+            "orphaned": 0, "orphaned_bytes": 0, "deleted": 0, "examples": []
+        },
+    }
+
+    db = SessionLocal()
+    try:
+        cached = _cached_urls(db)
+        active_inputs = {p for p in map(local_path_for_url, _active_job_inputs(db)) if p}
+        mismatched = _base_url_mismatch(db, storage)
+        db.rollback()
+
+        _expire_files(UPLOAD_DIR, UPLOAD_TTL_SECONDS, started, dry_run, report["tmp_uploads"], keep=active_inputs)
+        _expire_files(PARTIAL_DIR, GC_GRACE_SECONDS, started, dry_run, report["partial_uploads"])
+        _expire_files(
+            REMOTE_CACHE_DIR, REMOTE_INPUT_CACHE_TTL_SECONDS, started, dry_run, report["remote_inputs"],
+            partial_max_age=GC_GRACE_SECONDS
+        )
+
+        if mismatched:
+            report["blobs"]["skipped"] = (
+                f"{mismatched} asset URLs point at generated files under another base URL "
+                "(BASE_URL changed?); not deleting any blobs"
+            )
+            logger.warning("Storage GC: %s", report["blobs"]["skipped"])
+        else:
+            usage = _sweep_blobs(db, storage, cached, started, dry_run, report["blobs"])
+            report["variant_sources_pruned"] = _prune_variant_rows(db, cached, dry_run)
+
+            report["usage"] = {"users": len(usage)}
+            if USER_STORAGE_QUOTA_BYTES:
+                report["usage"]["over_quota"] = sum(1 for total, _ in usage.values() if total >= USER_STORAGE_QUOTA_BYTES)
+
+            # a partial walk would under-count, keep the old numbers then
+            if not dry_run and not report["blobs"].get("interrupted"):
+                _write_usage(db, usage)
+    finally:
+        db.close()
+
+    report["duration_seconds"] = round(time.time() - started, 2)
+    _last_report = report
+    return report
+
+
+def last_report() -> dict | None:
+    return _last_report
+
+
+# ----------------------------
+# Conversation deletes
+# ----------------------------
+def release_files(user_id: int, urls: list[str]):
+    """
+    After a conversation is deleted: takes its images off the user's quota and
+    deletes the ones nothing else shows. Anything touched within the grace
+    period is left for the next sweep.
+    """
+    urls = set(urls)
+    if not urls:
+        return
+
+    storage = get_storage()
+    now = time.time()
+
+    db = SessionLocal()
+    try:
+        adjust_usage(user_id, urls - user_urls(db, user_id, urls), sign=-1)
+
+        still_shown = {r.url for r in db.query(Asset.url).filter(Asset.url.in_(urls)).distinct()}
+        orphaned = urls - still_shown - _cached_urls(db)
+
+        released = []
+        for url in orphaned:
+            info = storage.stat(url)
+            if info and now - info.mtime < GC_GRACE_SECONDS:
+                continue
+            if info:
+                storage.delete(url)
+            released.append(url)
+
+        if not released:
+            return
+
+        variants = db.query(AssetVariant).filter(AssetVariant.source_url.in_(released)).all()
+        for v in variants:
+            storage.delete(v.url)
+            db.delete(v)
+        db.commit()
+    except Exception:
+        logger.exception("Could not release files of a deleted conversation")
+    finally:
+        db.close()
+
+
+# ----------------------------
+# Scheduler
+# ----------------------------
+async def _gc_loop():
+    while True:
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+        try:
+            report = await run_in_threadpool(run_sweep)
+            blobs = report["blobs"]
+            logger.info(
+                "Storage GC%s: %s blobs scanned, %s orphaned (%s bytes), %s tmp uploads expired in %ss",
+                " (dry run)" if report["dry_run"] else "",
+                blobs["scanned"], blobs["orphaned"], blobs["orphaned_bytes"],
+                report["tmp_uploads"]["expired"], report["duration_seconds"]
+            )
+        except Exception:
+            logger.exception("Storage GC sweep failed")
+
+
+def start_storage_gc():
+    global _task
+
+    _stopping.clear()
+    if GC_INTERVAL_SECONDS > 0:
+        _task = asyncio.create_task(_gc_loop())
+
+
+async def stop_storage_gc():
+    global _task
+
+    # a sweep running in the threadpool stops at its next batch
+    _stopping.set()
+
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep orphaned and expired files out of storage")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    args = parser.parse_args()
+
+    print(json.dumps(run_sweep(dry_run=args.dry_run), indent=2))
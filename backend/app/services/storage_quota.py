@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.config import USER_STORAGE_QUOTA_BYTES
+from app.models.asset import Asset
+from app.models.message import Message
+from app.models.conversation import Conversation
+from app.models.user_storage_usage import UserStorageUsage
+from app.services.storage import get_storage
+
+
+def quota_enabled() -> bool:
+    return USER_STORAGE_QUOTA_BYTES > 0
+
+
+def user_urls(db: Session, user_id: int, urls) -> set[str]:
+    """Which of these urls the user's assets already point at."""
+    urls = set(urls)
+    if not urls:
+        return set()
+
+    rows = (
+        db.query(Asset.url)
+        .join(Message, Asset.message_id == Message.id)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .filter(Conversation.user_id == user_id, Asset.url.in_(urls))
+        .distinct()
+    )
+    return {r.url for r in rows}
+
+
+def get_usage(db: Session, user_id: int) -> dict:
+    row = db.get(UserStorageUsage, user_id)
+    return {
+        "used_bytes": row.used_bytes if row else 0,
+        "files": row.files if row else 0,
+        "quota_bytes": USER_STORAGE_QUOTA_BYTES or None,
+        "updated_at": row.updated_at if row else None
+    }
+
+
+def check_quota(db: Session, user_id: int):
+    if not quota_enabled():
+        return
+
+    row = db.get(UserStorageUsage, user_id)
+    if row and row.used_bytes >= USER_STORAGE_QUOTA_BYTES:
+        mb = 1024 * 1024
+        raise HTTPException(
+            status_code=403,
+            detail=(
+                f"Storage quota exceeded ({row.used_bytes / mb:.1f} of {USER_STORAGE_QUOTA_BYTES / mb:.1f}MB). "
+                "Delete some conversations to free space."
+            )
+        )
+
+
+def _apply_usage(db: Session, user_id: int, delta_bytes: int, delta_files: int):
+    updated = db.query(UserStorageUsage).filter(UserStorageUsage.user_id == user_id).update({
+        UserStorageUsage.used_bytes: UserStorageUsage.used_bytes + delta_bytes,
+        UserStorageUsage.files: UserStorageUsage.files + delta_files,
+        UserStorageUsage.updated_at: datetime.utcnow()
+    })
+
+    if not updated:
+        db.add(UserStorageUsage(
+            user_id=user_id,
+            used_bytes=max(0, delta_bytes),
+            files=max(0, delta_files),
+            updated_at=datetime.utcnow()
+        ))
+
+
+def adjust_usage(user_id: int, urls, sign: int = 1):
+    """
+    Adds (or with sign=-1 subtracts) the size of these files to the user's
+    usage. Own transaction and best effort: the next GC sweep recomputes
+    every user's usage from scratch anyway.
+    """
+    urls = set(urls)
+    if not quota_enabled() or not urls:
+        return
+
+    storage = get_storage()
+    total = sum(storage.size(url) or 0 for url in urls)
+
+    db = SessionLocal()
+    try:
+        _apply_usage(db, user_id, sign * total, sign * len(urls))
+        db.commit()
+    except IntegrityError:
+        # another job created the row first
+        db.rollback()
+        _apply_usage(db, user_id, sign * total, sign * len(urls))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,148 @@
+import os
+import time
+import uuid
+import hashlib
+from urllib.parse import urlsplit, unquote
+
+import anyio
+
+from app.config import BASE_URL, REMOTE_INPUT_CACHE_TTL_SECONDS, UPLOAD_MAX_BYTES
+from app.services.clients import get_http_client
+from app.services.storage import get_storage
+
+# URL prefix -> directory it is served from (see the StaticFiles mounts in main.py)
+LOCAL_ROOTS = {
+    "/storage/": "storage",
+    "/mockups/": "mockups",
+}
+
+REMOTE_CACHE_DIR = os.path.join("storage", "cache", "remote")
+
+_CONTENT_TYPE_EXT = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+}
+
+
+def local_path_for_url(url: str) -> str | None:
+    """Local file behind one of our own asset URLs, or None for anything else."""
+    if not url:
+        return None
+
+    if url.startswith(BASE_URL):
+        url_path = url[len(BASE_URL):]
+    elif url.startswith("/"):
+        url_path = url
+    else:
+        return None
+
+    url_path = unquote(urlsplit(url_path).path)
+
+    for prefix, root in LOCAL_ROOTS.items():
+        if not url_path.startswith(prefix):
+            continue
+
+        path = os.path.normpath(os.path.join(root, url_path[len(prefix):]))
+
+        # no ../ escapes out of the served directory
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(root)]) != os.path.abspath(root):
+            return None
+
+        return path
+
+    return None
+
+
+def _remote_cache_path(url: str) -> str | None:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    for ext in _CONTENT_TYPE_EXT.values():
+        path = os.path.join(REMOTE_CACHE_DIR, f"{key}.{ext}")
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < REMOTE_INPUT_CACHE_TTL_SECONDS:
+            return path
+
+    return None
+
+
+async def _fetch_remote(url: str) -> str:
+    os.makedirs(REMOTE_CACHE_DIR, exist_ok=True)
+
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    partial_path = os.path.join(REMOTE_CACHE_DIR, f".{uuid.uuid4().hex}.partial")
+    size = 0
+
+    try:
+        async with get_http_client().stream("GET", url, timeout=30) as r:
+            if r.status_code != 200:
+                raise RuntimeError(f"Could not download input image: {r.status_code}")
+
+            content_type = r.headers.get("content-type", "").split(";")[0].strip().lower()
+            ext = _CONTENT_TYPE_EXT.get(content_type) or _ext_from_url(url)
+
+            async with await anyio.open_file(partial_path, "wb") as out:
+                async for chunk in r.aiter_bytes():
+                    size += len(chunk)
+                    if size > UPLOAD_MAX_BYTES:
+                        raise RuntimeError("Input image is too large")
+                    await out.write(chunk)
+
+        path = os.path.join(REMOTE_CACHE_DIR, f"{key}.{ext}")
+        os.replace(partial_path, path)
+        return path
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+
+
+def _fetch_blob(url: str) -> str:
+    os.makedirs(REMOTE_CACHE_DIR, exist_ok=True)
+
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    partial_path = os.path.join(REMOTE_CACHE_DIR, f".{uuid.uuid4().hex}.partial")
+
+    try:
+        get_storage().download(url, partial_path)
+        path = os.path.join(REMOTE_CACHE_DIR, f"{key}.{_ext_from_url(url)}")
+        os.replace(partial_path, path)
+        return path
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+
+
+def _ext_from_url(url: str) -> str:
+    ext = urlsplit(url).path.rsplit(".", 1)[-1].lower()
+    if ext == "jpeg":
+        return "jpg"
+    return ext if ext in _CONTENT_TYPE_EXT.values() else "png"
+
+
+async def resolve_input_image(url: str) -> str:
+    """
+    Local path of an input image. Our own URLs map straight to the stored
+    file; anything else is downloaded once into storage/cache/remote and
+    reused for REMOTE_INPUT_CACHE_TTL_SECONDS. Blobs in a remote storage
+    backend (S3) are read through its API, so private buckets work too.
+    """
+    path = local_path_for_url(url)
+
+    if path:
+        if not os.path.isfile(path):
+            raise RuntimeError("Input image not found in storage")
+        return path
+
+    cached = await anyio.to_thread.run_sync(_remote_cache_path, url)
+    if cached:
+        return cached
+
+    if get_storage().owns_url(url):
+        return await anyio.to_thread.run_sync(_fetch_blob, url)
+
+    return await _fetch_remote(url)
@@ -0,0 +1,174 @@
+import os
+import uuid
+import hashlib
+from dataclasses import dataclass
+
+import anyio
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import BASE_URL, UPLOAD_MAX_BYTES
+
+UPLOAD_DIR = os.path.join("storage", "tmp")
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, ".partial")
+
+# multipart boundaries + headers on top of the file itself
+_ENVELOPE_BYTES = 16 * 1024
+
+
+@dataclass
+class StoredUpload:
+    url: str
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+class _FilePartReader:
+    """Feeds the request body through the multipart parser and hands back only the bytes of one file field."""
+
+    def __init__(self, boundary: bytes, field_name: str):
+        self.field_name = field_name.encode()
+        self.filename: str | None = None
+        self.chunks: list[bytes] = []
+
+        self._header_name = b""
+        self._header_value = b""
+        self._in_target = False
+        self._seen_target = False
+
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, data: bytes) -> list[bytes]:
+        self.parser.write(data)
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+    def _on_part_begin(self):
+        self._in_target = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            _, options = parse_options_header(self._header_value)
+            # only the first part with our field name counts
+            if options.get(b"name") == self.field_name and b"filename" in options and not self._seen_target:
+                self._in_target = True
+                self._seen_target = True
+                self.filename = options[b"filename"].decode("utf-8", errors="replace")
+
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_target:
+            self.chunks.append(data[start:end])
+
+    def _on_part_end(self):
+        self._in_target = False
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _finalize(partial_path: str, final_path: str) -> bool:
+    """Moves the upload into place. Returns True if identical content was already stored."""
+    if os.path.exists(final_path):
+        _remove(partial_path)
+        # re-upload counts as fresh use of the file (tmp uploads expire by age)
+        os.utime(final_path)
+        return True
+
+    os.replace(partial_path, final_path)
+    return False
+
+
+async def receive_image_upload(request: Request, field_name: str, allowed_ext: set[str]) -> StoredUpload:
+    """
+    Streams a multipart upload to disk chunk by chunk, hashing as it goes.
+
+    Files are stored as storage/tmp/<sha256>.<ext>, so uploading the same
+    image again reuses the stored file.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    too_large = HTTPException(status_code=413, detail=f"File too large (max {UPLOAD_MAX_BYTES // (1024 * 1024)}MB)")
+
+    # refuse before reading anything when the client tells us the size up front
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + _ENVELOPE_BYTES:
+        raise too_large
+
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    partial_path = os.path.join(PARTIAL_DIR, uuid.uuid4().hex)
+
+    reader = _FilePartReader(boundary, field_name)
+    hasher = hashlib.sha256()
+    size = 0
+
+    try:
+        async with await anyio.open_file(partial_path, "wb") as out:
+            async for data in request.stream():
+                for chunk in reader.feed(data):
+                    size += len(chunk)
+                    if size > UPLOAD_MAX_BYTES:
+                        raise too_large
+
+                    hasher.update(chunk)
+                    await out.write(chunk)
+
+        reader.parser.finalize()
+
+        if not reader.filename:
+            raise HTTPException(status_code=400, detail="No file uploaded")
+
+        ext = reader.filename.rsplit(".", 1)[-1].lower()
+
+        if ext not in allowed_ext:
+            raise HTTPException(status_code=400, detail="Only png/jpg/jpeg/webp allowed")
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    except FormParserError:
+        await anyio.to_thread.run_sync(_remove, partial_path)
+        raise HTTPException(status_code=400, detail="Malformed multipart upload")
+    except BaseException:
+        await anyio.to_thread.run_sync(_remove, partial_path)
+        raise
+
+    sha256 = hasher.hexdigest()
+    filename = f"{sha256}.{ext}"
+    final_path = os.path.join(UPLOAD_DIR, filename)
+
+    deduplicated = await anyio.to_thread.run_sync(_finalize, partial_path, final_path)
+
+    return StoredUpload(
+        url=f"{BASE_URL}/storage/tmp/{filename}",
+        path=final_path,
+        sha256=sha256,
+        size=size,
+        deduplicated=deduplicated
+    )
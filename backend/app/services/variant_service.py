@@ -0,0 +1,211 @@
+import io
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, features
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.config import (
+    VARIANTS_ENABLED,
+    VARIANT_SIZES,
+    VARIANT_FORMATS,
+    VARIANT_QUALITY,
+    VARIANT_AVIF_QUALITY,
+    VARIANT_WORKERS
+)
+from app.models.asset_variant import AssetVariant
+from app.services.storage import get_storage
+from app.services.storage_resolver import resolve_input_image
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+# encoder effort: AVIF's default speed is several times slower for a barely smaller file
+_SAVE_OPTIONS = {"avif": {"speed": 8}, "webp": {"method": 4}}
+
+# resizing + AVIF/WebP encoding is CPU-bound, so it runs in worker processes
+# instead of holding the GIL next to the event loop
+_executor: ProcessPoolExecutor | None = None
+
+# background builds, kept so shutdown can cancel them
+_tasks: set[asyncio.Task] = set()
+
+
+def _parse_sizes(raw: str) -> list[tuple[str, int]]:
+    sizes = []
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        name, edge = part.split("=", 1)
+        sizes.append((name.strip(), int(edge)))
+    return sizes
+
+
+def _formats() -> list[str]:
+    # AVIF needs a Pillow built with libavif; fall back to what is available
+    return [
+        fmt for fmt in (f.strip().lower() for f in VARIANT_FORMATS.split(","))
+        if fmt in _CONTENT_TYPES and features.check(fmt)
+    ]
+
+
+def _qualities() -> dict[str, int]:
+    return {"avif": VARIANT_AVIF_QUALITY, "webp": VARIANT_QUALITY}
+
+
+def render_variants(path: str, sizes: list[tuple[str, int]], formats: list[str], quality: dict[str, int]) -> list[dict]:
+    """Downscaled encodings of one image. Runs in a worker process."""
+    out = []
+
+    with Image.open(path) as im:
+        im.load()
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.has_transparency_data else "RGB")
+
+        longest = max(im.size)
+        current = im
+
+        # largest first, each size scaled from the previous one (much less work than from the original)
+        for name, edge in sorted(sizes, key=lambda s: -s[1]):
+            # never upscale; the original serves that size already
+            if edge >= longest:
+                continue
+
+            scaled = current.copy()
+            scaled.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            current = scaled
+
+            for fmt in formats:
+                buf = io.BytesIO()
+                scaled.save(buf, fmt.upper(), quality=quality[fmt], **_SAVE_OPTIONS.get(fmt, {}))
+                out.append({
+                    "name": name,
+                    "format": fmt,
+                    "width": scaled.width,
+                    "height": scaled.height,
+                    "data": buf.getvalue()
+                })
+
+    return out
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        # spawn, not fork: the server process already runs threads
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, VARIANT_WORKERS),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    return _executor
+
+
+# ----------------------------
+# DB helpers
+# ----------------------------
+def get_variants(db: Session, urls: list[str]) -> dict[str, list[AssetVariant]]:
+    """source url -> its variants, smallest first (one query for a whole page of assets)"""
+    if not urls:
+        return {}
+
+    rows = (
+        db.query(AssetVariant)
+        .filter(AssetVariant.source_url.in_(set(urls)))
+        .order_by(AssetVariant.width.asc(), AssetVariant.id.asc())
+        .all()
+    )
+
+    variants: dict[str, list[AssetVariant]] = {}
+    for row in rows:
+        variants.setdefault(row.source_url, []).append(row)
+    return variants
+
+
+def _missing_urls(urls: list[str]) -> list[str]:
+    db = SessionLocal()
+    try:
+        done = {
+            row.source_url
+            for row in db.query(AssetVariant.source_url).filter(AssetVariant.source_url.in_(set(urls))).distinct()
+        }
+        return [url for url in dict.fromkeys(urls) if url not in done]
+    finally:
+        db.close()
+
+
+def _save_variants(source_url: str, rendered: list[dict]):
+    storage = get_storage()
+    db = SessionLocal()
+    try:
+        for v in rendered:
+            blob = storage.put(v["data"], v["format"], _CONTENT_TYPES[v["format"]], prefix="variants")
+            db.add(AssetVariant(
+                source_url=source_url,
+                name=v["name"],
+                format=v["format"],
+                width=v["width"],
+                height=v["height"],
+                url=blob.url,
+                size_bytes=len(v["data"])
+            ))
+        db.commit()
+    except IntegrityError:
+        # built concurrently by another job showing the same image; its rows are as good
+        db.rollback()
+    finally:
+        db.close()
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+async def build_variants(urls: list[str]):
+    sizes = _parse_sizes(VARIANT_SIZES)
+    formats = _formats()
+    if not sizes or not formats:
+        return
+
+    loop = asyncio.get_running_loop()
+
+    for url in await run_in_threadpool(_missing_urls, urls):
+        try:
+            path = await resolve_input_image(url)
+            rendered = await loop.run_in_executor(
+                _get_executor(), render_variants, path, sizes, formats, _qualities()
+            )
+            if rendered:
+                await run_in_threadpool(_save_variants, url, rendered)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Could not build variants for %s", url)
+
+
+def schedule_variants(urls: list[str]):
+    """Builds variants in the background; assets show the original until they exist."""
+    if not VARIANTS_ENABLED or not urls:
+        return
+
+    task = asyncio.create_task(build_variants(urls))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def shutdown_variant_pipeline():
+    global _executor
+
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,105 @@
+"""
+Per-request latency of planner calls with and without client reuse.
+
+"per-call" builds a fresh AsyncGroq / AsyncOpenAI for every request (the old
+behaviour); "shared" goes through app.services.clients, which keeps one
+client with a keep-alive connection pool. Runs against the local fake
+backend with zero upstream latency, so the numbers are pure client overhead
+(construction + TCP connect). Against the real APIs the shared client also
+skips the TLS handshake on every request.
+
+Run from backend/:
+    python -m benchmarks.bench_client_reuse --requests 200
+"""
+import os
+import time
+import asyncio
+import argparse
+
+from benchmarks.common import free_port, start_server, stop_server, percentile
+
+
+async def _timed(make_call, n: int, concurrency: int) -> list[float]:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await make_call()
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*[one() for _ in range(n)])
+    return latencies
+
+
+async def _run(n: int, concurrency: int) -> dict[str, list[float]]:
+    from groq import AsyncGroq
+    from openai import AsyncOpenAI
+    from app.config import GROQ_BASE_URL, OPENAI_BASE_URL
+    from app.services.clients import get_groq_client, get_openai_client, close_clients
+
+    messages = [{"role": "user", "content": "hello"}]
+
+    async def groq_per_call():
+        async with AsyncGroq(api_key="bench", base_url=GROQ_BASE_URL) as client:
+            await client.chat.completions.create(model="fake", messages=messages)
+
+    async def groq_shared():
+        await get_groq_client().chat.completions.create(model="fake", messages=messages)
+
+    async def openai_per_call():
+        async with AsyncOpenAI(api_key="bench", base_url=OPENAI_BASE_URL) as client:
+            await client.chat.completions.create(model="fake", messages=messages)
+
+    async def openai_shared():
+        await get_openai_client().chat.completions.create(model="fake", messages=messages)
+
+    results = {}
+    try:
+        for name, call in [
+            ("groq per-call", groq_per_call),
+            ("groq shared", groq_shared),
+            ("openai per-call", openai_per_call),
+            ("openai shared", openai_shared),
+        ]:
+            await call()  # warm-up
+            results[name] = await _timed(call, n, concurrency)
+    finally:
+        await close_clients()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    fake = start_server("benchmarks.fake_backend:app", fake_port, {"FAKE_CHAT_LATENCY": 0})
+
+    os.environ.update({
+        "GROQ_API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+    })
+
+    try:
+        results = asyncio.run(_run(args.requests, args.concurrency))
+    finally:
+        stop_server(fake)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'client':<18} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, lat in results.items():
+        print(
+            f"{name:<18} {sum(lat) / len(lat) * 1000:>9.2f} {percentile(lat, 50) * 1000:>9.2f} "
+            f"{percentile(lat, 95) * 1000:>9.2f} {percentile(lat, 99) * 1000:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+How many concurrent in-flight chats can one app worker hold?
+
+Starts the fake LLM/image backend (fixed latency) and a single uvicorn worker
+of the app, then fires N concurrent /chat/send requests that all go through
+planner + image generation. With a non-blocking pipeline the wall time stays
+close to one request's latency as N grows; a blocking pipeline degrades once
+the threadpool is exhausted.
+
+Run from backend/:
+    python -m benchmarks.bench_concurrency --levels 10 50 100 200
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.common import free_port, start_server, stop_server, app_env, get_token
+
+
+async def _one_chat(client: httpx.AsyncClient, i: int, inflight: dict) -> float | None:
+    inflight["now"] += 1
+    inflight["max"] = max(inflight["max"], inflight["now"])
+    t0 = time.perf_counter()
+    try:
+        r = await client.post("/chat/send", json={"text": f"generate a cat #{i}", "use_preferences": False})
+        if r.status_code != 200:
+            return None
+
+        # generation runs as a background job; wait for it so we time the full turn
+        job_id = r.json().get("job_id")
+        while job_id:
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] == "done":
+                break
+            if job["status"] == "failed":
+                return None
+            await asyncio.sleep(0.1)
+
+        return time.perf_counter() - t0
+    except httpx.HTTPError:
+        return None
+    finally:
+        inflight["now"] -= 1
+
+
+async def _run_level(base_url: str, token: str, n: int) -> dict:
+    inflight = {"now": 0, "max": 0}
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=300,
+        limits=limits,
+    ) as client:
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*[_one_chat(client, i, inflight) for i in range(n)])
+        wall = time.perf_counter() - t0
+
+    ok = [r for r in results if r is not None]
+    return {
+        "n": n,
+        "ok": len(ok),
+        "failed": n - len(ok),
+        "wall_s": wall,
+        "max_inflight": inflight["max"],
+        "mean_latency_s": sum(ok) / len(ok) if ok else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    parser.add_argument("--image-latency", type=float, default=2.0)
+    parser.add_argument("--job-concurrency", type=int, default=256, help="generation jobs allowed in flight")
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    app_port = free_port()
+
+    fake = start_server("benchmarks.fake_backend:app", fake_port, {
+        "FAKE_CHAT_LATENCY": args.chat_latency,
+        "FAKE_IMAGE_LATENCY": args.image_latency,
+    })
+    app = start_server("app.main:app", app_port, app_env(
+        fake_port,
+        IMAGE_PROVIDER="openai",
+        JOB_WORKERS=args.job_concurrency,
+        JOB_PROVIDER_CONCURRENCY=f"openai={args.job_concurrency}",
+    ))
+
+    try:
+        base_url = f"http://127.0.0.1:{app_port}"
+        token = get_token(base_url)
+        ideal = args.chat_latency + args.image_latency
+
+        print(f"fake latency per chat: {ideal:.2f}s (planner {args.chat_latency}s + image {args.image_latency}s)")
+        print(f"{'N':>6} {'ok':>6} {'fail':>6} {'wall s':>8} {'mean s':>8} {'max inflight':>13} {'effective conc.':>16}")
+
+        for n in args.levels:
+            r = asyncio.run(_run_level(base_url, token, n))
+            effective = r["ok"] * ideal / r["wall_s"] if r["wall_s"] else 0.0
+            print(
+                f"{r['n']:>6} {r['ok']:>6} {r['failed']:>6} {r['wall_s']:>8.2f} "
+                f"{r['mean_latency_s']:>8.2f} {r['max_inflight']:>13} {effective:>16.1f}"
+            )
+    finally:
+        stop_server(app)
+        stop_server(fake)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+The local confirmation fast path: offline accuracy and turn latency.
+
+1) Offline: classifies every reply in benchmarks/data/intent_eval.jsonl
+   (reply, the planner question it answers, expected "confirm" | "other")
+   and reports precision / recall of the fast path per confidence
+   threshold. Precision is the one that matters: a false "confirm" starts a
+   generation the user didn't ask for, a missed one only costs a planner call.
+2) Online: two app processes against the fake backend (FAKE_CHAT_LATENCY
+   per planner call), fast path off and on. Each conversation describes a
+   scene (planner asks a question and keeps it as the draft), then
+   confirms; the confirmation turn's /chat/send latency is compared.
+
+Run from backend/:
+    python -m benchmarks.bench_intent_fast_path --conversations 50 --chat-latency 0.5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, free_port, start_server, stop_server, app_env, get_token, percentile
+
+EVAL_SET = os.path.join(os.path.dirname(__file__), "data", "intent_eval.jsonl")
+
+THRESHOLDS = [0.5, 0.7, 0.8, 0.9, 0.95, 1.0]
+
+DESCRIPTION = "a cozy wooden cabin in a snowy pine forest at night under the northern lights"
+# the fake planner asks "What style...?", so the confirmation has to ask for the images itself
+CONFIRMATION = "go ahead and generate it"
+
+
+def _offline():
+    from app.config import PLANNER_FAST_PATH_MIN_CONFIDENCE
+    from app.services.intent_classifier import classify_reply
+
+    with open(EVAL_SET, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    scored = [(c, *classify_reply(c["reply"], c["question"])) for c in cases]
+    positives = sum(1 for c in cases if c["expected"] == "confirm")
+
+    print(f"{len(cases)} labelled replies, {positives} confirmations")
+    print(f"{'threshold':>9} {'fast path':>9} {'precision':>9} {'recall':>7} {'false confirms':>14}")
+    for threshold in THRESHOLDS:
+        hits = [c for c, intent, conf in scored if intent == "confirm" and conf >= threshold]
+        correct = sum(1 for c in hits if c["expected"] == "confirm")
+        marker = " <- configured" if threshold == PLANNER_FAST_PATH_MIN_CONFIDENCE else ""
+        print(
+            f"{threshold:>9.2f} {len(hits):>9} {correct / len(hits) if hits else 1:>9.1%} "
+            f"{correct / positives:>7.1%} {len(hits) - correct:>14}{marker}"
+        )
+
+    wrong = [
+        (c, conf) for c, intent, conf in scored
+        if (intent == "confirm" and conf >= PLANNER_FAST_PATH_MIN_CONFIDENCE) != (c["expected"] == "confirm")
+    ]
+    for c, conf in wrong:
+        print(f"  misclassified: {c['reply']!r} -> {conf:.2f} (expected {c['expected']})")
+
+    rounds = 200
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for c in cases:
+            classify_reply(c["reply"], c["question"])
+    per_call = (time.perf_counter() - t0) / (rounds * len(cases))
+    print(f"classifier: {per_call * 1e6:.1f} µs per reply")
+
+
+def _confirm_latencies(base_url: str, conversations: int) -> tuple[list[float], dict]:
+    token = get_token(base_url)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+
+    with httpx.Client(base_url=base_url, headers=headers, timeout=60) as client:
+        for _ in range(conversations):
+            r = client.post("/chat/send", json={"text": DESCRIPTION, "use_preferences": False})
+            r.raise_for_status()
+            cid = r.json()["conversation_id"]
+
+            t0 = time.perf_counter()
+            r = client.post("/chat/send", json={"conversation_id": cid, "text": CONFIRMATION, "use_preferences": False})
+            latencies.append(time.perf_counter() - t0)
+            r.raise_for_status()
+            assert r.json()["job_id"], "confirmation did not start a generation"
+
+        stats = client.get("/stats/cache").json()["fast_path"]
+
+    return latencies, stats
+
+
+def _online(conversations: int, chat_latency: float):
+    fake_port = free_port()
+    fake = start_server("benchmarks.fake_backend:app", fake_port, {"FAKE_CHAT_LATENCY": chat_latency})
+
+    print(f"\n{conversations} confirmation turns, planner call {chat_latency * 1000:.0f}ms")
+    print(f"{'fast path':<10} {'p50 ms':>8} {'p95 ms':>8} {'answered locally':>17}")
+
+    try:
+        for enabled in ("false", "true"):
+            port = free_port()
+            server = start_server("app.main:app", port, app_env(
+                fake_port,
+                IMAGE_PROVIDER="fake",
+                FAKE_PROVIDER_LATENCY=0,
+                GC_INTERVAL_SECONDS=0,
+                PLANNER_FAST_PATH_ENABLED=enabled
+            ))
+            try:
+                latencies, stats = _confirm_latencies(f"http://127.0.0.1:{port}", conversations)
+            finally:
+                stop_server(server)
+
+            print(
+                f"{'on' if enabled == 'true' else 'off':<10} {percentile(latencies, 50) * 1000:>8.1f} "
+                f"{percentile(latencies, 95) * 1000:>8.1f} {stats['fast_path']:>17}"
+            )
+    finally:
+        stop_server(fake)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    parser.add_argument("--offline-only", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    _offline()
+
+    if not args.offline_only:
+        _online(args.conversations, args.chat_latency)
+
+
+if __name__ == "__main__":
+    main()
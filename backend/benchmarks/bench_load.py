@@ -0,0 +1,291 @@
+"""
+Load test: many users going through the whole product flow at once, per
+scenario, against the fake backend.
+
+Each virtual user signs up, then --journeys times: a question turn, a
+"generate" turn (final, starts a job), polling /jobs/{id} until it is done,
+and reopening the conversation (GET /conversations, GET /conversations/{id}).
+Every scenario gets a fresh app process, DB and fake backend, seeded with
+--seed, so two runs of the same commit see the same latencies and faults.
+
+    steady         normal-ish planner / image latency, no faults
+    slow_upstream  lognormal latency: most calls quick, a long slow tail
+    flaky          steady latency, plus planner 5xx, malformed planner JSON
+                   and image 429s / 5xx
+
+Reported per scenario: journeys/s and requests/s, p50 / p95 / p99 per step,
+failed steps, SQL statements per request by route (from /metrics) and
+upstream calls (from the fake's /_stats).
+
+For CI: --json writes the report; --baseline compares against an earlier
+one and exits 1 if a p95, statements per request or the error rate grew, or
+throughput dropped, by more than --max-regression (a p95 may also always
+grow by --latency-slack-ms: small steps are noisy on shared CI machines).
+
+Run from backend/:
+    python -m benchmarks.bench_load --users 20 --journeys 2
+    python -m benchmarks.bench_load --scenarios steady --json load.json
+    python -m benchmarks.bench_load --json load.json --baseline baseline.json --max-regression 0.25
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.common import free_port, start_server, stop_server, app_env, percentile, METRICS_HEADERS
+from benchmarks.bench_metrics import _parse, _means
+
+PASSWORD = "load-password"
+
+SCENARIOS = {
+    "steady": {
+        "fake": {"FAKE_CHAT_LATENCY": "normal:0.3,0.05", "FAKE_IMAGE_LATENCY": "normal:1.0,0.2"},
+        "app": {},
+    },
+    "slow_upstream": {
+        "fake": {"FAKE_CHAT_LATENCY": "lognormal:0.3,0.8", "FAKE_IMAGE_LATENCY": "lognormal:1.0,0.8"},
+        "app": {},
+    },
+    "flaky": {
+        "fake": {
+            "FAKE_CHAT_LATENCY": "normal:0.3,0.05",
+            "FAKE_IMAGE_LATENCY": "normal:1.0,0.2",
+            "FAKE_CHAT_ERRORS": "500=0.03",
+            "FAKE_CHAT_FAULTS": "fence=0.05,truncated=0.05,garbage=0.02",
+            "FAKE_IMAGE_FAULTS": "429=0.1,500=0.05",
+            "FAKE_RETRY_AFTER": "0.2",
+        },
+        "app": {"PROVIDER_RETRY_BASE_DELAY": 0.1},
+    },
+}
+
+STEPS = ("signup", "question", "final", "generation", "list", "reload")
+
+SUBJECTS = [
+    "a lighthouse on a cliff at dusk",
+    "a cat astronaut floating above the moon",
+    "a cozy cabin in a snowy forest",
+    "a neon city street in the rain",
+]
+
+
+async def _user(client: httpx.AsyncClient, user_id: int, args, results: dict, counts: dict):
+    async def call(step: str, method: str, url: str, **kwargs):
+        counts["requests"] += 1
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+            r.raise_for_status()
+        except httpx.HTTPError:
+            results[step]["failed"] += 1
+            return None
+        results[step]["latencies"].append(time.perf_counter() - t0)
+        return r.json()
+
+    body = await call("signup", "POST", "/auth/signup", json={"email": f"load-{user_id}@example.com", "password": PASSWORD})
+    if body is None:
+        return
+    headers = {"Authorization": f"Bearer {body['access_token']}"}
+
+    for j in range(args.journeys):
+        subject = SUBJECTS[(user_id + j) % len(SUBJECTS)]
+
+        reply = await call("question", "POST", "/chat/send", headers=headers, json={"text": f"{subject}, version {j}"})
+        if reply is None:
+            continue
+        cid = reply["conversation_id"]
+        await asyncio.sleep(args.think)
+
+        reply = await call("final", "POST", "/chat/send", headers=headers, json={"conversation_id": cid, "text": "generate it"})
+        if reply is None or not reply.get("job_id"):
+            if reply is not None:
+                results["final"]["failed"] += 1
+            continue
+
+        # ----------------------------
+        # poll the job like the frontend does
+        # ----------------------------
+        t0 = time.perf_counter()
+        status = None
+        while time.perf_counter() - t0 < args.job_timeout:
+            await asyncio.sleep(args.poll_interval)
+            counts["requests"] += 1
+            try:
+                r = await client.get(f"/jobs/{reply['job_id']}", headers=headers)
+                r.raise_for_status()
+            except httpx.HTTPError:
+                continue
+            status = r.json()["status"]
+            if status in ("done", "failed"):
+                break
+
+        if status == "done":
+            results["generation"]["latencies"].append(time.perf_counter() - t0)
+        else:
+            results["generation"]["failed"] += 1
+
+        await asyncio.sleep(args.think)
+        await call("list", "GET", "/conversations", headers=headers)
+        await call("reload", "GET", f"/conversations/{cid}", headers=headers)
+        counts["journeys"] += 1
+
+
+async def _drive(base_url: str, args) -> dict:
+    results = {step: {"latencies": [], "failed": 0} for step in STEPS}
+    counts = {"requests": 0, "journeys": 0}
+
+    limits = httpx.Limits(max_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*[_user(client, i, args, results, counts) for i in range(args.users)])
+        wall = time.perf_counter() - t0
+
+    return {"wall_s": wall, **counts, "steps": results}
+
+
+def _run_scenario(name: str, args) -> dict:
+    scenario = SCENARIOS[name]
+    fake_port, app_port = free_port(), free_port()
+
+    fake = start_server("benchmarks.fake_backend:app", fake_port, {"FAKE_SEED": args.seed, **scenario["fake"]})
+    try:
+        app = start_server("app.main:app", app_port, app_env(
+            fake_port,
+            IMAGE_PROVIDER="openai",
+            GC_INTERVAL_SECONDS=0,
+            METRICS_ENABLED="true",
+            BCRYPT_ROUNDS=args.bcrypt_rounds,
+            # a load test measures the app, not the per-account rate limit
+            PROVIDER_RATE_LIMITS="openai=1000",
+            PROVIDER_BURST=1000,
+            **scenario["app"]
+        ))
+        try:
+            base_url = f"http://127.0.0.1:{app_port}"
+            run = asyncio.run(_drive(base_url, args))
+            samples = _parse(httpx.get(f"{base_url}/metrics", headers=METRICS_HEADERS, timeout=30).text)
+            upstream = httpx.get(f"http://127.0.0.1:{fake_port}/_stats", timeout=30).json()
+        finally:
+            stop_server(app)
+    finally:
+        stop_server(fake)
+
+    steps = {}
+    for step, r in run["steps"].items():
+        lat = r["latencies"]
+        steps[step] = {
+            "ok": len(lat),
+            "failed": r["failed"],
+            "p50_ms": percentile(lat, 50) * 1000,
+            "p95_ms": percentile(lat, 95) * 1000,
+            "p99_ms": percentile(lat, 99) * 1000,
+        }
+
+    total_steps = sum(s["ok"] + s["failed"] for s in steps.values())
+    return {
+        "wall_s": run["wall_s"],
+        "journeys": run["journeys"],
+        "journeys_per_s": run["journeys"] / run["wall_s"],
+        "requests_per_s": run["requests"] / run["wall_s"],
+        "error_rate": sum(s["failed"] for s in steps.values()) / total_steps if total_steps else 0.0,
+        "steps": steps,
+        "db_queries_per_request": {
+            route: mean for route, (mean, _) in _means(samples, "vizzy_db_queries_per_request", "route").items()
+        },
+        "upstream": upstream,
+    }
+
+
+def _print(name: str, r: dict):
+    print(
+        f"\n== {name}: {r['journeys']} journeys in {r['wall_s']:.1f}s, "
+        f"{r['journeys_per_s']:.2f} journeys/s, {r['requests_per_s']:.1f} req/s, error rate {r['error_rate']:.1%}"
+    )
+    print(f"  {'step':<11} {'ok':>5} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for step, s in r["steps"].items():
+        print(f"  {step:<11} {s['ok']:>5} {s['failed']:>7} {s['p50_ms']:>8.0f} {s['p95_ms']:>8.0f} {s['p99_ms']:>8.0f}")
+
+    print("  SQL statements per request:")
+    for route, mean in sorted(r["db_queries_per_request"].items()):
+        print(f"    {route:<32} {mean:>6.1f}")
+
+    print("  upstream: " + ", ".join(
+        f"{endpoint} {s['requests']} ({s['errors']} errors, {s['malformed']} malformed)"
+        for endpoint, s in sorted(r["upstream"].items())
+    ))
+
+
+def _regressions(report: dict, baseline: dict, tolerance: float, latency_slack_ms: float) -> list[str]:
+    """what got worse than baseline * (1 + tolerance); absolute floors keep tiny numbers from flapping"""
+    found = []
+
+    def check(label: str, new: float, old: float, floor: float = 0.0, higher_is_better: bool = False):
+        if higher_is_better:
+            if new < old * (1 - tolerance):
+                found.append(f"{label}: {old:.2f} -> {new:.2f}")
+        elif new > max(old * (1 + tolerance), old + floor):
+            found.append(f"{label}: {old:.2f} -> {new:.2f}")
+
+    for name, r in report.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+
+        check(f"{name} journeys/s", r["journeys_per_s"], old["journeys_per_s"], higher_is_better=True)
+        check(f"{name} error rate", r["error_rate"], old["error_rate"], floor=0.01)
+
+        for step, s in r["steps"].items():
+            if step in old["steps"]:
+                check(f"{name} {step} p95 ms", s["p95_ms"], old["steps"][step]["p95_ms"], floor=latency_slack_ms)
+
+        for route, mean in r["db_queries_per_request"].items():
+            if route in old["db_queries_per_request"]:
+                check(f"{name} {route} statements", mean, old["db_queries_per_request"][route], floor=0.5)
+
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--journeys", type=int, default=2, help="question -> final -> reload rounds per user")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds a user waits between steps")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--job-timeout", type=float, default=60)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="keeps signup from dominating the run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--latency-slack-ms", type=float, default=100, help="p95 growth always tolerated (noisy CI boxes)")
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.journeys} journeys, seed {args.seed}")
+
+    report = {}
+    for name in args.scenarios:
+        report[name] = _run_scenario(name, args)
+        _print(name, report[name])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = _regressions(report, json.load(f), args.max_regression, args.latency_slack_ms)
+
+        if found:
+            print(f"\nREGRESSIONS (more than {args.max_regression:.0%} worse than {args.baseline}):")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
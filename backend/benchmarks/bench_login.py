@@ -0,0 +1,104 @@
+"""
+Login throughput, and what a login burst does to the rest of the API.
+
+Fires --logins concurrent POST /auth/login against one app process while a
+probe loop keeps calling GET /conversations (a sync route that needs a
+threadpool slot and a DB read, like the /chat/send DB steps). Reported per
+hashing executor mode (AUTH_HASH_EXECUTOR): logins/s, login latency and
+probe latency during the burst.
+
+Run from backend/:
+    python -m benchmarks.bench_login --logins 200 --concurrency 50
+    python -m benchmarks.bench_login --modes thread process --rounds 12
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.common import free_port, start_server, stop_server, app_env, get_token, percentile
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+async def _burst(base_url: str, token: str, logins: int, concurrency: int) -> dict:
+    login_latencies = []
+    probe_latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    limits = httpx.Limits(max_connections=concurrency + 10)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def login():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                r.raise_for_status()
+                login_latencies.append(time.perf_counter() - t0)
+
+        async def probe():
+            headers = {"Authorization": f"Bearer {token}"}
+            while not done.is_set():
+                t0 = time.perf_counter()
+                r = await client.get("/conversations", headers=headers)
+                r.raise_for_status()
+                probe_latencies.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.02)
+
+        probe_task = asyncio.create_task(probe())
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[login() for _ in range(logins)])
+        wall = time.perf_counter() - t0
+
+        done.set()
+        await probe_task
+
+    return {"wall": wall, "login": login_latencies, "probe": probe_latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", default=["thread", "process"])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None, help="AUTH_HASH_WORKERS (default: app default)")
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, concurrency {args.concurrency}, bcrypt rounds {args.rounds}")
+    print(
+        f"{'executor':<9} {'logins/s':>9} {'login p50':>10} {'login p95':>10} "
+        f"{'probe p50':>10} {'probe p95':>10} {'probe max':>10}"
+    )
+
+    for mode in args.modes:
+        overrides = {"AUTH_HASH_EXECUTOR": mode, "BCRYPT_ROUNDS": args.rounds}
+        if args.workers:
+            overrides["AUTH_HASH_WORKERS"] = args.workers
+
+        port = free_port()
+        # no upstream calls here, the fake backend port is never used
+        server = start_server("app.main:app", port, app_env(free_port(), **overrides))
+
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            token = get_token(base_url, EMAIL, PASSWORD)
+            r = asyncio.run(_burst(base_url, token, args.logins, args.concurrency))
+        finally:
+            stop_server(server)
+
+        login, probe = r["login"], r["probe"]
+        print(
+            f"{mode:<9} {args.logins / r['wall']:>9.1f} "
+            f"{percentile(login, 50) * 1000:>8.0f}ms {percentile(login, 95) * 1000:>8.0f}ms "
+            f"{percentile(probe, 50) * 1000:>8.1f}ms {percentile(probe, 95) * 1000:>8.1f}ms "
+            f"{max(probe) * 1000:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Cost of the always-on metrics, and what they show for a run of chat turns.
+
+1) Micro: ns per Histogram.observe and per timed chat stage.
+2) Two app processes against the fake backend (zero planner latency, so the
+   app's own overhead is all there is to see), METRICS_ENABLED off and on,
+   taking turns: --turns /chat/send turns each (questions, every 4th a final
+   with a generation job). Compares turn latency, then prints the per-stage
+   means, DB statements per request and upstream calls read from /metrics.
+
+Run from backend/:
+    python -m benchmarks.bench_metrics --turns 300
+"""
+import re
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, free_port, start_server, stop_server, app_env, get_token, percentile, METRICS_HEADERS
+
+_SAMPLE_RE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _micro():
+    from app.services.metrics import Histogram, begin_turn, turn_stage, end_turn
+
+    histogram = Histogram("bench_seconds", "bench", ("stage", "turn_type"))
+    n = 200_000
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        histogram.observe(0.0123, "planner", "question")
+    observe = (time.perf_counter() - t0) / n
+
+    turns = 20_000
+    t0 = time.perf_counter()
+    for _ in range(turns):
+        begin_turn()
+        for stage in ("load_conversation", "save_user_message", "load_context", "planner", "save_reply"):
+            with turn_stage(stage):
+                pass
+        end_turn("question")
+    per_turn = (time.perf_counter() - t0) / turns
+
+    print(f"Histogram.observe: {observe * 1e9:.0f} ns, a turn's 5 stages timed + recorded: {per_turn * 1e6:.1f} µs")
+
+
+def _parse(text: str) -> dict:
+    """(metric, frozenset of labels) -> value, for _sum / _count / plain samples"""
+    samples = {}
+    for line in text.splitlines():
+        m = _SAMPLE_RE.match(line)
+        if not m or m.group(1).endswith("_bucket"):
+            continue
+        samples[(m.group(1), frozenset(_LABEL_RE.findall(m.group(2))))] = float(m.group(3))
+    return samples
+
+
+def _means(samples: dict, metric: str, key: str) -> dict:
+    sums, counts = defaultdict(float), defaultdict(float)
+    for (name, labels), value in samples.items():
+        label = dict(labels).get(key)
+        if name == f"{metric}_sum":
+            sums[label] += value
+        elif name == f"{metric}_count":
+            counts[label] += value
+    return {label: (sums[label] / counts[label], int(counts[label])) for label in counts if counts[label]}
+
+
+def _run_turns(base_urls: dict, turns: int, warmup: int = 20) -> tuple[dict, str]:
+    """Alternates turns between the servers, so drift on the machine hits both alike."""
+    clients = {
+        name: httpx.Client(base_url=url, headers={"Authorization": f"Bearer {get_token(url)}"}, timeout=60)
+        for name, url in base_urls.items()
+    }
+    latencies = {name: [] for name in clients}
+    cids = {name: None for name in clients}
+
+    try:
+        for i in range(warmup + turns):
+            # question turns, every 4th asks for a generation
+            text = f"generate a lighthouse #{i}" if i % 4 == 3 else f"a lighthouse on a cliff #{i}"
+            for name, client in clients.items():
+                t0 = time.perf_counter()
+                r = client.post("/chat/send", json={"conversation_id": cids[name], "text": text, "use_preferences": True})
+                if i >= warmup:
+                    latencies[name].append(time.perf_counter() - t0)
+                r.raise_for_status()
+                cids[name] = r.json()["conversation_id"]
+
+        time.sleep(1)  # let the last jobs finish
+        metrics = clients["on"].get("/metrics", headers=METRICS_HEADERS).text
+    finally:
+        for client in clients.values():
+            client.close()
+
+    return latencies, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=300)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    _micro()
+
+    fake_port = free_port()
+    fake = start_server("benchmarks.fake_backend:app", fake_port, {"FAKE_CHAT_LATENCY": 0})
+    servers, urls = [], {}
+
+    try:
+        for name, enabled in (("off", "false"), ("on", "true")):
+            port = free_port()
+            servers.append(start_server("app.main:app", port, app_env(
+                fake_port, IMAGE_PROVIDER="fake", FAKE_PROVIDER_LATENCY=0, GC_INTERVAL_SECONDS=0,
+                METRICS_ENABLED=enabled
+            )))
+            urls[name] = f"http://127.0.0.1:{port}"
+
+        latencies, metrics = _run_turns(urls, args.turns)
+    finally:
+        for server in servers:
+            stop_server(server)
+        stop_server(fake)
+
+    print(f"\n{args.turns} /chat/send turns per server, zero-latency planner")
+    print(f"{'metrics':<8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, lat in latencies.items():
+        print(
+            f"{name:<8} {sum(lat) / len(lat) * 1000:>8.2f} {percentile(lat, 50) * 1000:>8.2f} "
+            f"{percentile(lat, 95) * 1000:>8.2f} {percentile(lat, 99) * 1000:>8.2f}"
+        )
+
+    samples = _parse(metrics)
+
+    print("\nchat stages (mean ms, count):")
+    for stage, (mean, count) in sorted(_means(samples, "vizzy_chat_stage_seconds", "stage").items(), key=lambda x: -x[1][0]):
+        print(f"  {stage:<20} {mean * 1000:>8.2f} {count:>6}")
+
+    print("DB statements per request (mean, requests):")
+    for route, (mean, count) in sorted(_means(samples, "vizzy_db_queries_per_request", "route").items()):
+        print(f"  {route:<20} {mean:>8.1f} {count:>6}")
+
+    print("upstream calls (mean ms, count):")
+    for kind, (mean, count) in sorted(_means(samples, "vizzy_upstream_request_seconds", "kind").items()):
+        print(f"  {kind:<20} {mean * 1000:>8.2f} {count:>6}")
+
+    print("job stages (mean ms, count):")
+    for stage, (mean, count) in sorted(_means(samples, "vizzy_job_stage_seconds", "stage").items()):
+        print(f"  {stage:<20} {mean * 1000:>8.2f} {count:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Planner prompt tokens per turn for one long conversation: the old assembly
+(full preferences memory, the last 20 raw messages, state before history)
+vs the budgeted context builder with its rolling summary.
+
+"cached" is the leading run of messages identical to the previous turn's
+request, i.e. what a provider's prompt cache can reuse; "fresh" is the rest,
+billed at the full input price. Tokens are estimated the same way for both
+(~4 chars a token). Runs in-process against a throwaway SQLite DB; the
+planner itself is never called, every turn gets a scripted question, and
+every --final-every turns a final prompt (which also lands in preferences
+memory, like a real final turn).
+
+Run from backend/:
+    python -m benchmarks.bench_planner_context --turns 40 --memory 25
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from benchmarks.common import BACKEND_DIR
+
+USER_LINES = [
+    "I want a cozy cabin in a snowy forest at night",
+    "Make it feel warmer, maybe with smoke coming out of the chimney and a glowing window",
+    "Add a small frozen lake in front of it with someone ice skating",
+    "Can the sky have northern lights? Green and purple please",
+    "A bit more painterly, like a storybook illustration",
+    "Put a red sled leaning against the porch",
+]
+
+QUESTION = "Love it! ❄️ Should the scene feel more magical and whimsical, or calm and realistic? 🎨"
+
+FINAL_PROMPT = (
+    "A cozy wooden cabin nestled deep in a snow-laden pine forest at night, warm golden light spilling "
+    "from frosted windows, a thin ribbon of chimney smoke curling into a sky alive with emerald and violet "
+    "northern lights, a small frozen lake in the foreground where a lone skater glides, a red sled leaning "
+    "against the porch, soft storybook illustration style, gentle brush textures, rich cool blues balanced "
+    "by glowing ambers, wide establishing shot from a low angle, serene and magical mood"
+)
+
+
+def _old_messages(system_prompt: str, preferences: str, draft: str | None, pending: list[str], history: list[dict], user_text: str) -> list[dict]:
+    messages = [{"role": "system", "content": system_prompt}]
+    if preferences:
+        messages.append({"role": "system", "content": f"User preferences memory (last 25):\n{preferences}"})
+    if draft:
+        messages.append({"role": "system", "content": f"Current draft prompt:\n{draft}"})
+    if pending:
+        messages.append({"role": "system", "content": f"Pending questions previously asked:\n{pending}"})
+    messages.extend(history[-20:])
+    messages.append({"role": "user", "content": user_text})
+    return messages
+
+
+def _cached_prefix(messages: list[dict], previous: list[dict] | None, message_tokens) -> int:
+    if not previous:
+        return 0
+    tokens = 0
+    for a, b in zip(messages, previous):
+        if a != b:
+            break
+        tokens += message_tokens(a)
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--memory", type=int, default=25, help="preferences memory rows the user starts with")
+    parser.add_argument("--final-every", type=int, default=8)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="vizzy-bench-context-")
+    os.environ.update({"DATABASE_URL": f"sqlite:///{os.path.join(work, 'bench.db')}"})
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app.models  # registers the tables
+    from app.db import Base, engine, SessionLocal
+    from app.models.user import User
+    from app.models.message import Message
+    from app.models.conversation import Conversation
+    from app.services.planner_service import SYSTEM_PROMPT
+    from app.services.history_service import get_conversation_history
+    from app.services.memory_service import add_memory_row, get_formatted_preferences
+    from app.services.conversation_state_service import get_state, set_collecting_state, clear_state
+    from app.services.planner_context import assemble_planner_context, build_planner_messages, message_tokens
+
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    user = User(email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    convo = Conversation(user_id=user.id, title="bench")
+    db.add(convo)
+    db.flush()
+    for i in range(args.memory):
+        add_memory_row(db, user.id, None, "text", f"{FINAL_PROMPT} (variation {i})")
+    db.commit()
+
+    rows = []
+    previous_old = previous_new = None
+
+    for turn in range(1, args.turns + 1):
+        user_text = USER_LINES[(turn - 1) % len(USER_LINES)]
+        user_msg = Message(conversation_id=convo.id, role="user", text=user_text)
+        db.add(user_msg)
+        db.commit()
+
+        preferences = get_formatted_preferences(db, user.id)
+
+        # old: state + last 20 messages, the one just saved included
+        state = get_state(db, convo.id)
+        pending = json.loads(state.pending_questions) if state and state.pending_questions else []
+        old = _old_messages(
+            SYSTEM_PROMPT, preferences, state.draft_prompt if state else None, pending,
+            get_conversation_history(db, convo.id, limit=20), user_text
+        )
+
+        context = assemble_planner_context(db, convo.id, user_text, preferences, exclude_message_id=user_msg.id)
+        db.commit()
+        new = build_planner_messages(SYSTEM_PROMPT, context, user_text)
+
+        old_tokens = sum(message_tokens(m) for m in old)
+        new_tokens = sum(message_tokens(m) for m in new)
+        rows.append((
+            turn, old_tokens, _cached_prefix(old, previous_old, message_tokens),
+            new_tokens, _cached_prefix(new, previous_new, message_tokens)
+        ))
+        previous_old, previous_new = old, new
+
+        if turn % args.final_every == 0:
+            db.add(Message(conversation_id=convo.id, role="assistant", text=FINAL_PROMPT))
+            add_memory_row(db, user.id, convo.id, "text", FINAL_PROMPT)
+            clear_state(db, convo.id)
+        else:
+            db.add(Message(conversation_id=convo.id, role="assistant", text=QUESTION))
+            set_collecting_state(db, convo.id, f"{user_text}, {FINAL_PROMPT[:200]}", [QUESTION])
+        db.commit()
+
+    db.close()
+
+    system_tokens = message_tokens({"role": "system", "content": SYSTEM_PROMPT})
+    print(f"{args.turns} turns, {args.memory} memory rows, system prompt {system_tokens} tokens")
+    print(f"{'turn':>4} {'old':>7} {'cached':>7} {'fresh':>7} | {'new':>7} {'cached':>7} {'fresh':>7}")
+    for turn, old_t, old_c, new_t, new_c in rows:
+        if turn <= 3 or turn % 5 == 0:
+            print(f"{turn:>4} {old_t:>7} {old_c:>7} {old_t - old_c:>7} | {new_t:>7} {new_c:>7} {new_t - new_c:>7}")
+
+    old_total = sum(r[1] for r in rows)
+    new_total = sum(r[3] for r in rows)
+    old_fresh = sum(r[1] - r[2] for r in rows)
+    new_fresh = sum(r[3] - r[4] for r in rows)
+    print(f"total prompt tokens: old {old_total}, new {new_total} ({new_total / old_total - 1:+.0%})")
+    print(f"total fresh (uncached) tokens: old {old_fresh}, new {new_fresh} ({new_fresh / old_fresh - 1:+.0%})")
+    print(f"max per turn: old {max(r[1] for r in rows)}, new {max(r[3] for r in rows)}")
+
+
+if __name__ == "__main__":
+    main()
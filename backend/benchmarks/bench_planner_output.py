@@ -0,0 +1,126 @@
+"""
+Planner turns when the model's JSON comes back malformed: the old strict
+json.loads vs the structured output layer (local repair, then one re-ask).
+
+Runs --turns run_planner-style calls against the fake backend with
+FAKE_CHAT_FAULTS injected. "strict" is the old behaviour: an unparseable
+reply fails the turn with a 500 and the user sends it again (up to
+--user-retries times), each resend a full planner call. "structured" goes
+through app.services.planner_output. Reports turns that got a usable reply,
+upstream calls per usable reply and turn latency.
+
+Run from backend/:
+    python -m benchmarks.bench_planner_output --turns 300 --faults "fence=0.1,prose=0.05,trailing_comma=0.05,truncated=0.05,garbage=0.02"
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+
+from benchmarks.common import free_port, start_server, stop_server, percentile
+
+USER_LINES = [
+    "a cozy cabin in a snowy forest at night",
+    "generate a lighthouse on a cliff during a storm",
+    "a cat astronaut floating above the moon",
+    "generate it as a watercolor painting",
+]
+
+
+async def _strict(client, request: dict) -> dict:
+    resp = await client.chat.completions.create(**request)
+    data = json.loads(resp.choices[0].message.content.strip())
+    if "type" not in data or (data["type"] == "final" and not data.get("final_prompt")):
+        raise RuntimeError("Planner returned unusable JSON")
+    return data
+
+
+async def _run(mode: str, turns: int, user_retries: int, concurrency: int) -> dict:
+    from app.services.clients import get_groq_client, close_clients
+    from app.services.planner_output import structured_planner_call, response_format, planner_output_stats
+    from app.services.planner_context import PlannerContext, build_planner_messages
+    from app.services.planner_service import SYSTEM_PROMPT
+
+    client = get_groq_client()
+    sem = asyncio.Semaphore(concurrency)
+    stats = {"ok": 0, "calls": 0, "latencies": []}
+
+    async def turn(i: int):
+        text = f"{USER_LINES[i % len(USER_LINES)]} #{i}"
+        request = dict(
+            model="fake",
+            messages=build_planner_messages(SYSTEM_PROMPT, PlannerContext(), text),
+            temperature=0.2,
+            **response_format("json_object")
+        )
+
+        async with sem:
+            t0 = time.perf_counter()
+            if mode == "structured":
+                try:
+                    await structured_planner_call(client, request, None, f"bench {mode}", "fake")
+                    stats["ok"] += 1
+                except RuntimeError:
+                    pass
+            else:
+                for _ in range(1 + user_retries):
+                    stats["calls"] += 1
+                    try:
+                        await _strict(client, request)
+                        stats["ok"] += 1
+                        break
+                    except (ValueError, RuntimeError):
+                        continue
+            stats["latencies"].append(time.perf_counter() - t0)
+
+    try:
+        await asyncio.gather(*[turn(i) for i in range(turns)])
+    finally:
+        await close_clients()
+
+    if mode == "structured":
+        counters = planner_output_stats()[f"bench {mode}"]
+        stats.update(calls=counters["upstream_calls"], repaired=counters["repaired"], reasked=counters["reasked"])
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--user-retries", type=int, default=1, help="times a user re-sends a failed turn (strict)")
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    parser.add_argument("--faults", default="fence=0.1,prose=0.05,trailing_comma=0.05,truncated=0.05,garbage=0.02")
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    fake = start_server("benchmarks.fake_backend:app", fake_port, {
+        "FAKE_CHAT_LATENCY": args.chat_latency,
+        "FAKE_CHAT_FAULTS": args.faults
+    })
+
+    os.environ.update({
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+    })
+
+    print(f"{args.turns} turns, faults {args.faults}, planner call {args.chat_latency * 1000:.0f}ms")
+    print(f"{'mode':<11} {'usable':>7} {'calls/usable':>12} {'repaired':>9} {'re-asked':>9} {'p50 ms':>8} {'p95 ms':>8}")
+
+    try:
+        for mode in ("strict", "structured"):
+            stats = asyncio.run(_run(mode, args.turns, args.user_retries, args.concurrency))
+            print(
+                f"{mode:<11} {stats['ok'] / args.turns:>7.1%} "
+                f"{stats['calls'] / stats['ok'] if stats['ok'] else 0:>12.2f} "
+                f"{stats.get('repaired', '-'):>9} {stats.get('reasked', '-'):>9} "
+                f"{percentile(stats['latencies'], 50) * 1000:>8.0f} {percentile(stats['latencies'], 95) * 1000:>8.0f}"
+            )
+    finally:
+        stop_server(fake)
+
+
+if __name__ == "__main__":
+    main()
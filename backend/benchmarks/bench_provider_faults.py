@@ -0,0 +1,109 @@
+"""
+Generation turns under upstream faults, with and without the provider guard.
+
+Runs --jobs generate_images calls (4 images each, --concurrency at a time)
+against the in-process fake provider for a few fault mixes. "bare" is the
+old behavior: no retries, no breaker, no rate limit. "guarded" uses the
+PROVIDER_* defaults. A turn "succeeds" when all its images arrive; "images"
+is the share of all requested images that were delivered.
+
+Run from backend/:
+    python -m benchmarks.bench_provider_faults --jobs 100 --concurrency 10
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+from benchmarks.common import BACKEND_DIR, percentile
+
+SCENARIOS = {
+    "clean": {},
+    "429 storm": {"429": 0.3},
+    "flaky": {"500": 0.1, "timeout": 0.05},
+    "outage": {"503": 1.0},
+}
+
+
+def _bare_guard():
+    from app.services.image_generation.resilience import ProviderGuard
+    return ProviderGuard(
+        name="fake", rate=0, burst=1, max_in_flight=1_000_000, max_retries=0,
+        base_delay=0, max_delay=0, breaker_failures=0, breaker_cooldown=0
+    )
+
+
+async def _run(jobs: int, concurrency: int, images: int) -> dict:
+    from app.services.image_generation.image_generator_service import generate_images
+    from app.services.image_generation.resilience import get_guard
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    stats = {"ok": 0, "images": 0}
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                urls, _ = await generate_images("bench", images, "1:1")
+            except Exception:
+                urls = []
+            latencies.append(time.perf_counter() - t0)
+            stats["images"] += len(urls)
+            stats["ok"] += len(urls) == images
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(jobs)])
+    stats["wall"] = time.perf_counter() - t0
+    stats["latencies"] = latencies
+    stats["upstream"] = get_guard("fake").counters["requests"]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "IMAGE_PROVIDER": "fake",
+        "STORAGE_BACKEND": "local",
+        "PROVIDER_RETRY_BASE_DELAY": os.getenv("PROVIDER_RETRY_BASE_DELAY", "0.2"),
+        "PROVIDER_BREAKER_COOLDOWN_SECONDS": os.getenv("PROVIDER_BREAKER_COOLDOWN_SECONDS", "5"),
+    })
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(tempfile.mkdtemp(prefix="vizzy-bench-faults-"))
+    logging.disable(logging.WARNING)
+
+    from app.services.image_generation.providers import fake_provider
+    from app.services.image_generation import resilience
+
+    print(f"{args.jobs} turns x {args.images} images, {args.concurrency} at a time, upstream {args.latency * 1000:.0f}ms")
+    print(f"{'scenario':<10} {'guard':<8} {'turns ok':>9} {'images':>7} {'upstream':>9} {'p50':>7} {'p95':>7} {'wall':>7}")
+
+    for scenario, faults in SCENARIOS.items():
+        fake_provider.configure(latency=args.latency, jitter=args.latency / 4, faults=faults, retry_after=args.retry_after)
+
+        for mode in ("bare", "guarded"):
+            resilience.reset_guards()
+            if mode == "bare":
+                resilience._guards["fake"] = _bare_guard()
+
+            stats = asyncio.run(_run(args.jobs, args.concurrency, args.images))
+            print(
+                f"{scenario:<10} {mode:<8} {stats['ok'] / args.jobs:>9.0%} "
+                f"{stats['images'] / (args.jobs * args.images):>7.0%} {stats['upstream']:>9} "
+                f"{percentile(stats['latencies'], 50):>6.2f}s {percentile(stats['latencies'], 95):>6.2f}s "
+                f"{stats['wall']:>6.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+What reopening a conversation costs the browser: plain StaticFiles vs
+AssetFiles, for a gallery of --assets generated images plus the frontend.
+
+A tiny browser cache sits in front of each app: it keeps every 200 with its
+validators and, on the second load, skips requests that are still fresh
+(Cache-Control max-age) and sends If-None-Match / If-Modified-Since for the
+rest. Without Cache-Control a browser's heuristic freshness for a file made a
+minute ago is a few seconds, so it revalidates; that's what is modeled.
+Requests go in-process through httpx's ASGI transport, so the timings are the
+serving layer only, no network.
+
+Run from backend/:
+    python -m benchmarks.bench_static --assets 40 --size 1500000
+"""
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+from benchmarks.common import BACKEND_DIR
+
+FRONTEND_DIR = os.path.join(BACKEND_DIR, "..", "frontend")
+FRONTEND_FILES = ["app.js", "styles.css", "index.html"]
+
+
+def _build_gallery(root: str, assets: int, size: int) -> list[str]:
+    paths = []
+    for _ in range(assets):
+        data = os.urandom(size)  # PNG data doesn't compress either
+        digest = hashlib.sha256(data).hexdigest()
+        key = f"generated/{digest[:2]}/{digest[2:4]}/{digest}.png"
+        os.makedirs(os.path.join(root, os.path.dirname(key)), exist_ok=True)
+        with open(os.path.join(root, key), "wb") as f:
+            f.write(data)
+        paths.append(f"/storage/{key}")
+    return paths
+
+
+def _fresh(headers: httpx.Headers) -> bool:
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "max-age" and value.isdigit() and int(value) > 0:
+            return True
+    return False
+
+
+async def _load(client: httpx.AsyncClient, paths: list[str], cache: dict) -> dict:
+    stats = {"requests": 0, "not_modified": 0, "bytes": 0}
+
+    for path in paths:
+        cached = cache.get(path)
+        if cached is not None and _fresh(cached):
+            continue
+
+        headers = {"accept-encoding": "gzip, deflate, br"}
+        if cached is not None:
+            if "etag" in cached:
+                headers["if-none-match"] = cached["etag"]
+            if "last-modified" in cached:
+                headers["if-modified-since"] = cached["last-modified"]
+
+        response = await client.get(path, headers=headers)
+        stats["requests"] += 1
+        # bytes on the wire: response headers + the (possibly compressed) body, not the decoded one
+        stats["bytes"] += sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+        stats["bytes"] += int(response.headers.get("content-length", len(response.content)))
+
+        if response.status_code == 304:
+            stats["not_modified"] += 1
+        elif response.status_code == 200:
+            cache[path] = response.headers
+
+    return stats
+
+
+async def _run(app, paths: list[str]) -> list[tuple[str, dict, float]]:
+    cache: dict = {}
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for label in ("first load", "reload"):
+            t0 = time.perf_counter()
+            stats = await _load(client, paths, cache)
+            rows.append((label, stats, time.perf_counter() - t0))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assets", type=int, default=40)
+    parser.add_argument("--size", type=int, default=1500000, help="bytes per image")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from app.services.static_files import AssetFiles
+
+    root = tempfile.mkdtemp(prefix="vizzy-bench-static-")
+    paths = _build_gallery(root, args.assets, args.size) + [f"/frontend/{name}" for name in FRONTEND_FILES]
+
+    apps = {
+        "StaticFiles": Starlette(routes=[
+            Mount("/storage", StaticFiles(directory=root)),
+            Mount("/frontend", StaticFiles(directory=FRONTEND_DIR)),
+        ]),
+        "AssetFiles": Starlette(routes=[
+            Mount("/storage", AssetFiles(directory=root, immutable_dirs=("generated",))),
+            Mount("/frontend", AssetFiles(directory=FRONTEND_DIR, compress=True)),
+        ]),
+    }
+
+    print(f"{args.assets} images x {args.size / (1024 * 1024):.1f}MB + frontend ({len(FRONTEND_FILES)} files)")
+    print(f"{'server':<12} {'load':<11} {'requests':>8} {'304s':>6} {'transferred':>12} {'time':>9}")
+    for name, app in apps.items():
+        for label, stats, wall in asyncio.run(_run(app, paths)):
+            print(
+                f"{name:<12} {label:<11} {stats['requests']:>8} {stats['not_modified']:>6} "
+                f"{stats['bytes'] / 1024:>10.1f}KB {wall * 1000:>7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
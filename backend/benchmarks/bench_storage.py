@@ -0,0 +1,141 @@
+"""
+Writing generated images: the old flat storage/generated/<uuid>.png layout
+vs the content-addressed blob stores.
+
+Stores --images images of --size-kb each, where only --unique of them are
+distinct (repeated prompts served from the same bytes, re-generations of a
+cached result, ...). Reports write latency, files and bytes kept, and the
+largest directory. Everything goes to a temp dir; the "s3" backend runs
+against --s3-endpoint (e.g. MinIO) or, with --moto, an in-process moto
+server (pip install "moto[server]").
+
+Run from backend/:
+    python -m benchmarks.bench_storage --images 2000 --unique 0.5
+    python -m benchmarks.bench_storage --backends legacy local s3 --moto
+"""
+import os
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+
+from benchmarks.common import free_port, percentile
+
+
+class _LegacyStore:
+    """What openai_provider._save_b64_image did before the blob store."""
+
+    def __init__(self, root: str):
+        self.dir = os.path.join(root, "generated")
+        os.makedirs(self.dir, exist_ok=True)
+
+    def put(self, data: bytes, ext: str = "png", content_type: str = "image/png"):
+        with open(os.path.join(self.dir, f"{uuid.uuid4().hex}.{ext}"), "wb") as f:
+            f.write(data)
+
+
+def _payloads(images: int, unique: float, size_kb: int) -> list[bytes]:
+    distinct = max(1, int(images * unique))
+    blobs = [os.urandom(size_kb * 1024) for _ in range(distinct)]
+    return [blobs[i % distinct] for i in range(images)]
+
+
+def _disk_usage(root: str) -> tuple[int, int, int]:
+    files = total = widest = 0
+    for dirpath, _, filenames in os.walk(root):
+        widest = max(widest, len(filenames))
+        for name in filenames:
+            files += 1
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return files, total, widest
+
+
+def _s3_usage(store) -> tuple[int, int, int]:
+    files = total = 0
+    for page in store.client.get_paginator("list_objects_v2").paginate(Bucket=store.bucket):
+        for obj in page.get("Contents", []):
+            files += 1
+            total += obj["Size"]
+    return files, total, 0
+
+
+def _run(store, payloads: list[bytes]) -> list[float]:
+    latencies = []
+    for data in payloads:
+        t0 = time.perf_counter()
+        store.put(data, "png", "image/png")
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--unique", type=float, default=0.5, help="fraction of distinct images")
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--backends", nargs="+", default=["legacy", "local"])
+    parser.add_argument("--s3-endpoint", default=None)
+    parser.add_argument("--s3-bucket", default="vizzy-bench")
+    parser.add_argument("--moto", action="store_true", help="start a local moto S3 server for the s3 backend")
+    args = parser.parse_args()
+
+    payloads = _payloads(args.images, args.unique, args.size_kb)
+    moto_server = None
+
+    print(f"{args.images} images x {args.size_kb}KB, {args.unique:.0%} unique")
+    print(
+        f"{'backend':<8} {'writes/s':>9} {'p50':>8} {'p95':>8} "
+        f"{'files':>7} {'stored MB':>10} {'widest dir':>11}"
+    )
+
+    try:
+        for backend in args.backends:
+            root = tempfile.mkdtemp(prefix="vizzy-bench-storage-")
+
+            if backend == "legacy":
+                store = _LegacyStore(root)
+            elif backend == "local":
+                from app.services.storage.local import LocalBlobStore
+                store = LocalBlobStore(root)
+            elif backend == "s3":
+                from app.services.storage.s3 import S3BlobStore
+
+                endpoint = args.s3_endpoint
+                if args.moto and moto_server is None:
+                    from moto.server import ThreadedMotoServer
+
+                    port = free_port()
+                    moto_server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+                    moto_server.start()
+                    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+                    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+                    endpoint = f"http://127.0.0.1:{port}"
+
+                store = S3BlobStore(args.s3_bucket, endpoint_url=endpoint, region="us-east-1")
+                try:
+                    store.client.create_bucket(Bucket=args.s3_bucket)
+                except store._client_error:
+                    pass
+            else:
+                raise SystemExit(f"unknown backend: {backend}")
+
+            t0 = time.perf_counter()
+            latencies = _run(store, payloads)
+            wall = time.perf_counter() - t0
+
+            files, total, widest = _s3_usage(store) if backend == "s3" else _disk_usage(root)
+            shutil.rmtree(root, ignore_errors=True)
+
+            print(
+                f"{backend:<8} {len(payloads) / wall:>9.0f} "
+                f"{percentile(latencies, 50) * 1000:>6.2f}ms {percentile(latencies, 95) * 1000:>6.2f}ms "
+                f"{files:>7} {total / (1024 * 1024):>10.1f} {widest if backend != 's3' else '-':>11}"
+            )
+    finally:
+        if moto_server is not None:
+            moto_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Storage GC sweep over a large local store: time, and peak Python memory of
+the batched sweep vs loading every asset URL and every file path up front.
+
+Builds a throwaway storage dir with --files sharded blobs (tiny files, the
+count is what matters), of which --referenced are pointed at by assets in
+a throwaway SQLite DB, then runs the sweep in dry-run mode so both
+approaches see the same tree.
+
+Run from backend/:
+    python -m benchmarks.bench_storage_gc --files 200000 --referenced 0.8
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.common import BACKEND_DIR
+
+
+def _build_tree(root: str, files: int) -> list[str]:
+    keys = []
+    for i in range(files):
+        digest = f"{i:064x}"[::-1]
+        key = f"generated/{digest[:2]}/{digest[2:4]}/{digest}.png"
+        path = os.path.join(root, "storage", key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x")
+        keys.append(key)
+    return keys
+
+
+def _build_db(db_path: str, urls: list[str]):
+    import app.models  # registers the tables
+    from app.db import Base, engine
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.utcnow().isoformat(" ")
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, email, password_hash, created_at) VALUES (1, 'b@example.com', 'x', ?)", (now,))
+    con.execute("INSERT INTO conversations (id, user_id, title, created_at) VALUES (1, 1, 'bench', ?)", (now,))
+    con.execute("INSERT INTO messages (id, conversation_id, role, text, created_at) VALUES (1, 1, 'assistant', '', ?)", (now,))
+    con.executemany(
+        "INSERT INTO assets (message_id, type, url, created_at) VALUES (1, 'image', ?, ?)",
+        ((url, now) for url in urls)
+    )
+    con.commit()
+    con.close()
+
+
+def _naive_orphans() -> int:
+    """All asset urls in a set, all files in a list, then the difference."""
+    from app.db import SessionLocal
+    from app.models.asset import Asset
+    from app.services.storage import get_storage
+
+    db = SessionLocal()
+    try:
+        referenced = {r.url for r in db.query(Asset.url)}
+    finally:
+        db.close()
+
+    blobs = list(get_storage().iter_blobs())
+    return sum(1 for blob in blobs if blob.url not in referenced)
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200000)
+    parser.add_argument("--referenced", type=float, default=0.8, help="fraction of files assets point at")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="vizzy-bench-gc-")
+    db_path = os.path.join(work, "bench.db")
+
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "GC_GRACE_SECONDS": "0",
+        "GC_BATCH_SIZE": str(args.batch_size),
+        "BASE_URL": "http://bench.local",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(work)
+
+    t0 = time.perf_counter()
+    keys = _build_tree(work, args.files)
+    referenced = [f"http://bench.local/storage/{k}" for k in keys[:int(len(keys) * args.referenced)]]
+    _build_db(db_path, referenced)
+    print(f"{args.files} files, {len(referenced)} referenced (setup {time.perf_counter() - t0:.0f}s)")
+
+    from app.services.storage_gc import run_sweep
+
+    report, wall, peak = _measure(lambda: run_sweep(dry_run=True))
+    orphaned = report["blobs"]["orphaned"]
+    print(f"{'approach':<9} {'orphans':>8} {'time':>8} {'peak mem':>10}")
+    print(f"{'batched':<9} {orphaned:>8} {wall:>7.1f}s {peak / (1024 * 1024):>8.1f}MB")
+
+    orphaned, wall, peak = _measure(_naive_orphans)
+    print(f"{'load-all':<9} {orphaned:>8} {wall:>7.1f}s {peak / (1024 * 1024):>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
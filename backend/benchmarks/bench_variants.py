@@ -0,0 +1,76 @@
+"""
+Bytes the chat grid downloads per image, original vs the AVIF/WebP variants,
+and what rendering the variants costs.
+
+Uses a synthetic 1024x1024 PNG (gradients + noise, roughly what
+gpt-image-1 returns in size), or --image. "gallery" is the download for
+opening a conversation with --assets images at grid size: the originals
+before, the thumb variant in the best supported format after.
+
+Run from backend/:
+    python -m benchmarks.bench_variants --assets 40
+    python -m benchmarks.bench_variants --image mockups/images/img1.jpg
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+
+from PIL import Image, ImageFilter
+
+from app.config import VARIANT_SIZES
+from app.services.variant_service import render_variants, _parse_sizes, _formats, _qualities
+
+
+def _synthetic_png(path: str, size: int = 1024):
+    gradient = Image.linear_gradient("L").resize((size, size))
+    noise = Image.effect_noise((size, size), 64).filter(ImageFilter.GaussianBlur(1.5))
+    mandel = Image.effect_mandelbrot((size, size), (-2.0, -1.5, 1.0, 1.5), 80)
+    Image.merge("RGB", (gradient, noise, mandel)).save(path, "PNG")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image", default=None)
+    parser.add_argument("--assets", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    path = args.image
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="vizzy-bench-variants-"), "source.png")
+        _synthetic_png(path)
+
+    sizes = _parse_sizes(VARIANT_SIZES)
+    formats = _formats()
+
+    timings = []
+    for _ in range(args.rounds):
+        t0 = time.perf_counter()
+        rendered = render_variants(path, sizes, formats, _qualities())
+        timings.append(time.perf_counter() - t0)
+
+    original = os.path.getsize(path)
+    with Image.open(path) as im:
+        width, height = im.size
+
+    print(f"source {width}x{height}, {original / 1024:.0f}KB, quality {_qualities()}")
+    print(f"render all variants: {min(timings) * 1000:.0f}ms (best of {args.rounds}, one process)")
+    print(f"{'variant':<8} {'format':<6} {'size':>10} {'KB':>8} {'vs original':>12}")
+
+    for v in rendered:
+        kb = len(v["data"]) / 1024
+        print(f"{v['name']:<8} {v['format']:<6} {v['width']:>4}x{v['height']:<5} {kb:>8.1f} {len(v['data']) / original:>11.1%}")
+
+    thumbs = [v for v in rendered if v["name"] == min(sizes, key=lambda s: s[1])[0]]
+    if thumbs:
+        best = min(thumbs, key=lambda v: len(v["data"]))
+        print(
+            f"gallery of {args.assets}: originals {original * args.assets / (1024 * 1024):.1f}MB, "
+            f"{best['name']}.{best['format']} {len(best['data']) * args.assets / (1024 * 1024):.2f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
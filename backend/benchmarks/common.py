@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import socket
+import tempfile
+import subprocess
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# app processes started through app_env serve /metrics behind this token
+METRICS_TOKEN = "bench-metrics"
+METRICS_HEADERS = {"Authorization": f"Bearer {METRICS_TOKEN}"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_path: str, port: int, env: dict | None = None, workers: int = 1) -> subprocess.Popen:
+    proc_env = os.environ.copy()
+    proc_env.update({k: str(v) for k, v in (env or {}).items()})
+
+    # the app writes storage/ relative to its cwd: keep generated images out of the checkout
+    workdir = tempfile.mkdtemp(prefix="vizzy-bench-run-")
+    os.symlink(os.path.join(BACKEND_DIR, "mockups"), os.path.join(workdir, "mockups"))
+
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app_path,
+            "--app-dir", BACKEND_DIR,
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ],
+        cwd=workdir,
+        env=proc_env,
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{app_path} exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+
+    proc.terminate()
+    raise RuntimeError(f"{app_path} did not start on port {port}")
+
+
+def stop_server(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def app_env(fake_port: int, **overrides) -> dict:
+    """Env for an app process wired to a fake backend and a throwaway SQLite DB."""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="vizzy-bench-"), "bench.db")
+
+    env = {
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "OPENAI_API_KEY": "bench",
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "IMAGE_PROVIDER": "openai",
+        # measure the real upstream path unless a benchmark opts back in
+        "PLANNER_CACHE_ENABLED": "false",
+        "GENERATION_CACHE_ENABLED": "false",
+        "METRICS_TOKEN": METRICS_TOKEN,
+    }
+    env.update({k: str(v) for k, v in overrides.items()})
+    return env
+
+
+def get_token(base_url: str, email: str = "bench@example.com", password: str = "bench-password") -> str:
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        client.post("/auth/signup", json={"email": email, "password": password})
+        r = client.post("/auth/login", json={"email": email, "password": password})
+        r.raise_for_status()
+        return r.json()["access_token"]
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
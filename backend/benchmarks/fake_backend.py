@@ -0,0 +1,243 @@
+"""
+Fake Groq / OpenAI-compatible backend for local benchmarks.
+
+Serves the three endpoints the app talks to (chat completions, image
+generations, image edits), so benchmarks never spend real API money.
+
+Latencies (FAKE_CHAT_LATENCY, FAKE_IMAGE_LATENCY) are seconds, or a
+distribution: "uniform:0.2,0.8", "normal:0.5,0.1", "lognormal:0.5,0.4"
+(median, sigma: a long tail like real APIs) or "exp:0.5" (mean). All
+randomness comes from one RNG seeded with FAKE_SEED, so a run is repeatable
+(as far as request order is).
+
+Endpoints can fail on purpose, with HTTP errors: FAKE_IMAGE_FAULTS /
+FAKE_CHAT_ERRORS="429=0.2,500=0.05" (429s carry Retry-After:
+FAKE_RETRY_AFTER). Planner replies can also come back malformed the ways
+LLMs get JSON wrong:
+FAKE_CHAT_FAULTS="fence=0.1,prose=0.05,trailing_comma=0.05,truncated=0.05,garbage=0.02".
+
+GET /_stats returns request / error counts per endpoint.
+
+Run:
+    uvicorn benchmarks.fake_backend:app --port 9100
+
+Point the app at it with:
+    GROQ_BASE_URL=http://127.0.0.1:9100
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+"""
+import io
+import os
+import json
+import time
+import base64
+import math
+import random
+import asyncio
+from collections import defaultdict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from PIL import Image
+
+
+_rng = random.Random(int(os.getenv("FAKE_SEED", "0")))
+
+
+def _probabilities(raw: str, key=str) -> dict:
+    return {key(k): float(p) for k, p in (part.split("=", 1) for part in raw.split(",") if "=" in part)}
+
+
+def latency_sampler(spec: str):
+    """"0.5" -> always 0.5s; "uniform:a,b" / "normal:mean,sd" / "lognormal:median,sigma" / "exp:mean"."""
+    kind, _, args = spec.partition(":")
+    if not args:
+        value = float(kind)
+        return lambda: value
+
+    a, _, b = args.partition(",")
+    a, b = float(a), float(b or 0)
+    samplers = {
+        "uniform": lambda: _rng.uniform(a, b),
+        "normal": lambda: _rng.gauss(a, b),
+        "lognormal": lambda: a * math.exp(_rng.gauss(0, b)),
+        "exp": lambda: _rng.expovariate(1 / a) if a > 0 else 0.0,
+    }
+    sample = samplers[kind]
+    return lambda: max(0.0, sample())
+
+
+CHAT_LATENCY = latency_sampler(os.getenv("FAKE_CHAT_LATENCY", "0.5"))
+IMAGE_LATENCY = latency_sampler(os.getenv("FAKE_IMAGE_LATENCY", "2.0"))
+IMAGE_SIZE = int(os.getenv("FAKE_IMAGE_SIZE", "256"))
+IMAGE_FAULTS = _probabilities(os.getenv("FAKE_IMAGE_FAULTS", ""), int)
+CHAT_ERRORS = _probabilities(os.getenv("FAKE_CHAT_ERRORS", ""), int)
+RETRY_AFTER = os.getenv("FAKE_RETRY_AFTER", "1")
+CHAT_FAULTS = _probabilities(os.getenv("FAKE_CHAT_FAULTS", ""))
+
+# endpoint -> {"requests": n, "errors": n, "malformed": n}
+_stats = defaultdict(lambda: {"requests": 0, "errors": 0, "malformed": 0})
+
+# the app's re-ask after an unusable reply; the fake answers the turn before it instead
+REASK_PREFIX = "That reply could not be used"
+
+
+def _make_png_b64() -> str:
+    buf = io.BytesIO()
+    Image.new("RGB", (IMAGE_SIZE, IMAGE_SIZE), (120, 90, 200)).save(buf, "PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+PNG_B64 = _make_png_b64()
+
+app = FastAPI(title="Fake LLM / image backend")
+
+
+def _last_user_text(messages: list[dict]) -> str:
+    for m in reversed(messages):
+        if m.get("role") != "user":
+            continue
+        content = m.get("content")
+        if isinstance(content, list):
+            content = " ".join(p.get("text", "") for p in content if p.get("type") == "text")
+        if (content or "").startswith(REASK_PREFIX):
+            continue
+        return content or ""
+    return ""
+
+
+def _mangle(content: str) -> str:
+    roll = _rng.random()
+    for kind, probability in CHAT_FAULTS.items():
+        if roll < probability:
+            break
+        roll -= probability
+    else:
+        return content
+
+    _stats["chat"]["malformed"] += 1
+
+    if kind == "fence":
+        return f"```json\n{content}\n```"
+    if kind == "prose":
+        return f"Here is the JSON you asked for:\n{content}"
+    if kind == "trailing_comma":
+        return content[:-1] + ",}"
+    if kind == "truncated":
+        return content[:int(len(content) * 0.7)]
+    return "Sorry, I can't help with that right now."
+
+
+def _planner_reply(user_text: str) -> dict:
+    # "generate" in the message -> final prompt, anything else -> one question
+    if "generate" in user_text.lower():
+        return {
+            "type": "final",
+            "questions": [],
+            "final_prompt": f"A cinematic, richly lit scene of {user_text}",
+            "draft_prompt": None,
+            "num_outputs": 4,
+            "aspect_ratio": "1:1"
+        }
+
+    return {
+        "type": "question",
+        "questions": ["What style are you going for? 🎨"],
+        "final_prompt": None,
+        "draft_prompt": user_text,
+        "num_outputs": 4,
+        "aspect_ratio": "1:1"
+    }
+
+
+async def _stream_chunks(content: str, model: str):
+    # CHAT_LATENCY is time-to-first-token; the rest trickles out in small chunks
+    for i in range(0, len(content), 8):
+        chunk = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[i:i + 8]}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(0.005)
+
+    yield "data: [DONE]\n\n"
+
+
+def _http_fault(endpoint: str, faults: dict) -> JSONResponse | None:
+    _stats[endpoint]["requests"] += 1
+    roll = _rng.random()
+    for status, probability in faults.items():
+        if roll < probability:
+            headers = {"retry-after": RETRY_AFTER} if status == 429 else {}
+            error = {"message": f"Fake {status}", "type": "fake_error", "code": str(status)}
+            _stats[endpoint]["errors"] += 1
+            return JSONResponse({"error": error}, status_code=status, headers=headers)
+        roll -= probability
+    return None
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+
+    fault = _http_fault("chat", CHAT_ERRORS)
+    if fault:
+        return fault
+
+    await asyncio.sleep(CHAT_LATENCY())
+
+    content = _mangle(json.dumps(_planner_reply(_last_user_text(body.get("messages") or []))))
+
+    if body.get("stream"):
+        return StreamingResponse(_stream_chunks(content, body.get("model", "fake")), media_type="text/event-stream")
+
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+
+@app.post("/v1/images/generations")
+async def images_generations(request: Request):
+    body = await request.json()
+
+    fault = _http_fault("images", IMAGE_FAULTS)
+    if fault:
+        return fault
+
+    await asyncio.sleep(IMAGE_LATENCY())
+
+    n = int(body.get("n") or 1)
+    return {"created": int(time.time()), "data": [{"b64_json": PNG_B64} for _ in range(n)]}
+
+
+@app.post("/v1/images/edits")
+async def images_edits(request: Request):
+    form = await request.form()
+
+    fault = _http_fault("edits", IMAGE_FAULTS)
+    if fault:
+        return fault
+
+    await asyncio.sleep(IMAGE_LATENCY())
+
+    n = int(form.get("n") or 1)
+    return {"created": int(time.time()), "data": [{"b64_json": PNG_B64} for _ in range(n)]}
+
+
+@app.get("/_stats")
+async def fake_stats():
+    return _stats
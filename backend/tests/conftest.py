@@ -0,0 +1,31 @@
+"""
+Unit tests, run from backend/ with python -m pytest. Settings are read at
+import time, so the test environment is set up before app is imported.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='vizzy-test-'), 'test.db')}"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
+# cheapest work factor bcrypt allows; the tests check rehashing, not strength
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def db():
+    from app.db import Base, SessionLocal, engine
+    import app.models  # noqa: F401  (registers every table)
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
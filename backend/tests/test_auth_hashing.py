@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+from app.config import BCRYPT_ROUNDS
+from app.models import User
+from app.routes.auth import login
+from app.routes.schemas import LoginRequest
+from app.services import auth_service
+from app.services.auth_service import hash_password, verify_and_update, verify_password
+
+PASSWORD = "correct horse"
+
+
+def _rounds(password_hash: str) -> int:
+    return int(password_hash.split("$")[2])
+
+
+@pytest.fixture(autouse=True)
+def executor():
+    yield
+    auth_service.shutdown_hash_executor()
+
+
+def test_hash_uses_the_configured_rounds():
+    password_hash = hash_password(PASSWORD)
+
+    assert _rounds(password_hash) == BCRYPT_ROUNDS
+    assert verify_password(PASSWORD, password_hash)
+    assert not verify_password("wrong", password_hash)
+
+
+def test_current_hash_needs_no_update():
+    assert verify_and_update(PASSWORD, hash_password(PASSWORD)) == (True, None)
+
+
+def test_outdated_rounds_are_rehashed():
+    old = bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash(PASSWORD)
+
+    valid, new_hash = verify_and_update(PASSWORD, old)
+
+    assert valid
+    assert _rounds(new_hash) == BCRYPT_ROUNDS
+    assert verify_password(PASSWORD, new_hash)
+
+
+def test_wrong_password_is_never_rehashed():
+    old = bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash(PASSWORD)
+    assert verify_and_update("wrong", old) == (False, None)
+
+
+def test_login_stores_the_rehashed_password(db):
+    old = bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash(PASSWORD)
+    db.add(User(email="rehash@example.com", password_hash=old))
+    db.commit()
+
+    response = asyncio.run(login(LoginRequest(email="rehash@example.com", password=PASSWORD), db=db))
+    assert response["access_token"]
+
+    stored = db.query(User.password_hash).filter(User.email == "rehash@example.com").scalar()
+    assert stored != old
+    assert _rounds(stored) == BCRYPT_ROUNDS
+
+
+def test_failed_login_leaves_the_hash_alone(db):
+    old = bcrypt.using(rounds=BCRYPT_ROUNDS + 1).hash(PASSWORD)
+    db.add(User(email="rehash@example.com", password_hash=old))
+    db.commit()
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(login(LoginRequest(email="rehash@example.com", password="wrong"), db=db))
+
+    assert e.value.status_code == 401
+    assert db.query(User.password_hash).filter(User.email == "rehash@example.com").scalar() == old
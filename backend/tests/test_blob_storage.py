@@ -0,0 +1,157 @@
+import os
+import time
+import hashlib
+
+import pytest
+
+from app.config import BASE_URL
+from app.services.storage.local import LocalBlobStore
+
+DATA = b"\x89PNG\r\n\x1a\n" + b"blob" * 64
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+# ----------------------------
+# LocalBlobStore
+# ----------------------------
+@pytest.fixture
+def local(tmp_path):
+    return LocalBlobStore(str(tmp_path / "storage"), BASE_URL)
+
+
+def test_put_is_content_addressed_and_sharded(local, tmp_path):
+    blob = local.put(DATA)
+
+    key = f"generated/{SHA256[:2]}/{SHA256[2:4]}/{SHA256}.png"
+    assert blob.key == key
+    assert blob.url == f"{BASE_URL}/storage/{key}"
+    assert blob.sha256 == SHA256 and blob.size == len(DATA)
+    assert not blob.deduplicated
+    assert (tmp_path / "storage" / key).read_bytes() == DATA
+
+
+def test_same_bytes_are_stored_once_and_touched(local):
+    first = local.put(DATA)
+    path = local.local_path(first.url)
+    os.utime(path, (time.time() - 3600, time.time() - 3600))
+
+    second = local.put(DATA)
+
+    assert second.deduplicated and second.url == first.url
+    # fresh mtime keeps storage GC off it until the new asset row is committed
+    assert time.time() - os.stat(path).st_mtime < 60
+    assert len(list(local.iter_blobs())) == 1
+
+
+def test_failed_write_leaves_no_partial_file(local, tmp_path, monkeypatch):
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", broken_replace)
+
+    with pytest.raises(OSError):
+        local.put(DATA)
+
+    shard = tmp_path / "storage" / "generated" / SHA256[:2] / SHA256[2:4]
+    assert list(shard.iterdir()) == []
+
+
+def test_iter_blobs_walks_every_prefix(local, tmp_path):
+    generated = local.put(DATA)
+    variant = local.put(b"smaller", "webp", "image/webp", prefix="variants")
+
+    # not a blob prefix: uploads, caches, ...
+    (tmp_path / "storage" / "tmp").mkdir()
+    (tmp_path / "storage" / "tmp" / "upload.png").write_bytes(b"x")
+
+    blobs = {b.url: b for b in local.iter_blobs()}
+
+    assert set(blobs) == {generated.url, variant.url}
+    assert blobs[variant.url].size == len(b"smaller")
+
+
+def test_iter_blobs_on_an_empty_store(local):
+    assert list(local.iter_blobs()) == []
+
+
+def test_owns_only_its_blob_prefixes(local):
+    assert local.owns_url(local.put(DATA).url)
+    assert not local.owns_url(f"{BASE_URL}/storage/tmp/upload.png")
+    assert not local.owns_url(f"{BASE_URL}/storage/../app/main.py")
+    assert not local.owns_url("https://elsewhere.example.com/generated/a.png")
+
+
+def test_stat_and_delete(local):
+    url = local.put(DATA).url
+
+    info = local.stat(url)
+    assert info.size == len(DATA)
+    assert local.size(url) == len(DATA)
+
+    assert local.delete(url)
+    assert local.stat(url) is None
+    assert not local.delete(url)
+    assert not local.delete(f"{BASE_URL}/storage/tmp/upload.png")
+
+
+# ----------------------------
+# S3BlobStore against moto
+# ----------------------------
+@pytest.fixture
+def s3(monkeypatch):
+    pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+
+    from app.services.storage.s3 import S3BlobStore
+
+    with moto.mock_aws():
+        store = S3BlobStore("vizzy-test", region="us-east-1", public_base_url="https://cdn.example.com")
+        store.client.create_bucket(Bucket="vizzy-test")
+
+        calls = []
+        for name in ("head_object", "put_object", "copy_object"):
+            method = getattr(store.client, name)
+            monkeypatch.setattr(store.client, name, lambda *a, _m=method, _n=name, **kw: calls.append(_n) or _m(*a, **kw))
+
+        yield store, calls
+
+
+def test_s3_first_put_uploads(s3):
+    store, calls = s3
+
+    blob = store.put(DATA)
+
+    assert not blob.deduplicated
+    assert blob.url == f"https://cdn.example.com/generated/{SHA256[:2]}/{SHA256[2:4]}/{SHA256}.png"
+    assert calls == ["head_object", "put_object"]
+
+    head = store.client.head_object(Bucket="vizzy-test", Key=blob.key)
+    assert head["CacheControl"] == "public, max-age=31536000, immutable"
+
+
+def test_s3_same_bytes_copy_in_place_instead_of_uploading(s3):
+    store, calls = s3
+    first = store.put(DATA)
+    calls.clear()
+
+    second = store.put(DATA)
+
+    assert second.deduplicated and second.url == first.url
+    assert calls == ["head_object", "copy_object"]
+    assert store.stat(second.url).size == len(DATA)
+
+
+def test_s3_iter_blobs_and_delete(s3):
+    store, _ = s3
+    generated = store.put(DATA)
+    variant = store.put(b"smaller", "webp", "image/webp", prefix="variants")
+    store.client.put_object(Bucket="vizzy-test", Key="other/file.txt", Body=b"x")
+
+    assert {b.url for b in store.iter_blobs()} == {generated.url, variant.url}
+
+    assert store.delete(generated.url)
+    assert store.stat(generated.url) is None
+    assert not store.delete("https://elsewhere.example.com/generated/a.png")
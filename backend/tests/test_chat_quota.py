@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import User, Message, UserStorageUsage
+from app.routes import chat
+from app.routes.schemas import ChatSendRequest
+from app.services import storage_quota
+from app.services.principal_cache import Principal
+
+
+@pytest.fixture
+def user(db, monkeypatch):
+    monkeypatch.setattr(storage_quota, "USER_STORAGE_QUOTA_BYTES", 1000)
+
+    user = User(email="quota@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    return Principal(id=user.id, email=user.email)
+
+
+@pytest.fixture
+def planner_calls(monkeypatch):
+    calls = []
+
+    async def run_planner(*args, **kwargs):
+        calls.append(args)
+        return {"type": "question", "questions": ["What style?"], "draft_prompt": "a lighthouse"}
+
+    monkeypatch.setattr(chat, "run_planner", run_planner)
+    return calls
+
+
+def _send(db, user: Principal, text: str = "draw a lighthouse, maybe in some style"):
+    payload = ChatSendRequest(text=text, use_preferences=False)
+    return asyncio.run(chat.chat_send(payload, db=db, current_user=user))
+
+
+def test_over_quota_turn_is_refused_before_the_planner(db, user, planner_calls):
+    db.add(UserStorageUsage(user_id=user.id, used_bytes=1000, files=3))
+    db.commit()
+
+    with pytest.raises(HTTPException) as e:
+        _send(db, user)
+
+    assert e.value.status_code == 403
+    assert planner_calls == []
+    assert db.query(Message).count() == 0
+
+
+def test_under_quota_turn_reaches_the_planner(db, user, planner_calls):
+    db.add(UserStorageUsage(user_id=user.id, used_bytes=999, files=3))
+    db.commit()
+
+    response = _send(db, user)
+
+    assert len(planner_calls) == 1
+    assert response.assistant_message.text == "What style?"
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models import User, Conversation, Message, Asset
+from app.routes.conversations import get_conversation
+from app.services.principal_cache import Principal
+
+
+@pytest.fixture
+def convo(db):
+    user = User(email="pages@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+
+    convo = Conversation(user_id=user.id, title="Pages")
+    db.add(convo)
+    db.flush()
+
+    for i in range(7):
+        msg = Message(conversation_id=convo.id, role="user" if i % 2 == 0 else "assistant", text=f"m{i}")
+        db.add(msg)
+        db.flush()
+        if msg.role == "assistant":
+            db.add(Asset(message_id=msg.id, type="image", url=f"http://x/{i}.png"))
+    db.commit()
+
+    return user, convo
+
+
+def _page(db, user, convo, **kwargs):
+    params = {"before": None, "after": None, "limit": 50, **kwargs}
+    return get_conversation(convo.id, db=db, current_user=Principal(id=user.id, email=user.email), **params)
+
+
+def _texts(page) -> list[str]:
+    return [m.text for m in page.messages]
+
+
+def test_latest_page_oldest_first(db, convo):
+    page = _page(db, *convo, limit=3)
+    assert _texts(page) == ["m4", "m5", "m6"]
+    assert page.has_more_before and not page.has_more_after
+
+
+def test_walk_back_with_before(db, convo):
+    user, c = convo
+    page = _page(db, user, c, limit=3)
+    seen = _texts(page)
+
+    while page.has_more_before:
+        page = _page(db, user, c, before=page.messages[0].id, limit=3)
+        seen = _texts(page) + seen
+        assert page.has_more_after
+
+    assert seen == [f"m{i}" for i in range(7)]
+
+
+def test_walk_forward_with_after(db, convo):
+    user, c = convo
+    first = _page(db, user, c, limit=2)
+    oldest = _page(db, user, c, before=first.messages[0].id, limit=50)
+
+    page = _page(db, user, c, after=oldest.messages[0].id, limit=4)
+    assert _texts(page) == ["m1", "m2", "m3", "m4"]
+    assert page.has_more_after and page.has_more_before
+
+    page = _page(db, user, c, after=page.messages[-1].id, limit=4)
+    assert _texts(page) == ["m5", "m6"]
+    assert not page.has_more_after and page.has_more_before
+
+
+def test_after_page_from_the_start_has_nothing_before(db, convo):
+    user, c = convo
+    page = _page(db, user, c, after=0, limit=3)
+    assert _texts(page) == ["m0", "m1", "m2"]
+    assert page.has_more_after and not page.has_more_before
+
+    # past the end: empty page, everything is older
+    last = _page(db, user, c, limit=1).messages[-1].id
+    page = _page(db, user, c, after=last, limit=3)
+    assert page.messages == []
+    assert page.has_more_before and not page.has_more_after
+
+
+def test_assets_come_with_their_messages(db, convo):
+    page = _page(db, *convo)
+    for m in page.messages:
+        assert len(m.assets) == (1 if m.role == "assistant" else 0)
+
+
+def test_before_and_after_together_is_rejected(db, convo):
+    with pytest.raises(HTTPException) as e:
+        _page(db, *convo, before=5, after=2)
+    assert e.value.status_code == 400
+
+
+def test_other_users_conversation_is_not_found(db, convo):
+    _, c = convo
+    with pytest.raises(HTTPException) as e:
+        get_conversation(c.id, before=None, after=None, limit=50, db=db, current_user=Principal(id=999, email="x@example.com"))
+    assert e.value.status_code == 404
@@ -0,0 +1,131 @@
+import os
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import GENERATION_CACHE_TTL_SECONDS
+from app.models.generation_cache import GenerationCacheEntry
+from app.services import generation_cache
+from app.services.generation_cache import (
+    cache_key,
+    lookup_cached_generation,
+    store_cached_generation,
+    evict_cached_generations
+)
+from app.services.storage import get_storage
+from app.services.storage_resolver import local_path_for_url
+
+
+@pytest.fixture
+def workdir(monkeypatch, tmp_path):
+    # local blobs live under storage/ in the cwd
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _blob(data: bytes) -> str:
+    return get_storage().put(data).url
+
+
+def _store(db, prompt="a lighthouse at dusk", urls=None):
+    urls = urls if urls is not None else [_blob(prompt.encode())]
+    store_cached_generation(db, prompt, "1:1", "test-model", len(urls), urls)
+    return urls
+
+
+def _entry(db, prompt="a lighthouse at dusk") -> GenerationCacheEntry:
+    key = cache_key(prompt, "1:1", "test-model", 1)
+    return db.query(GenerationCacheEntry).filter(GenerationCacheEntry.cache_key == key).first()
+
+
+def test_cache_key_ignores_case_spacing_and_trailing_punctuation():
+    assert cache_key("A  Lighthouse at dusk!", "1:1", "m", 1) == cache_key("a lighthouse at dusk", "1:1", "m", 1)
+    assert cache_key("a lighthouse", "1:1", "m", 1) != cache_key("a lighthouse", "16:9", "m", 1)
+
+
+def test_miss_then_hit(db, workdir):
+    assert lookup_cached_generation(db, "a lighthouse at dusk", "1:1", "test-model", 1) is None
+
+    urls = _store(db)
+    assert lookup_cached_generation(db, "A lighthouse at dusk.", "1:1", "test-model", 1) == urls
+    db.commit()
+
+    assert _entry(db).hits == 1
+
+
+def test_partial_results_are_not_stored(db, workdir):
+    store_cached_generation(db, "a lighthouse at dusk", "1:1", "test-model", 2, [_blob(b"one")])
+    assert db.query(GenerationCacheEntry).count() == 0
+
+
+def test_expired_entry_is_a_miss_and_keeps_its_files(db, workdir):
+    urls = _store(db)
+    _entry(db).created_at = datetime.utcnow() - timedelta(seconds=GENERATION_CACHE_TTL_SECONDS + 1)
+    db.commit()
+
+    assert lookup_cached_generation(db, "a lighthouse at dusk", "1:1", "test-model", 1) is None
+    db.commit()
+
+    assert _entry(db) is None
+    # left to storage GC
+    assert os.path.exists(local_path_for_url(urls[0]))
+
+
+def test_missing_files_are_a_miss(db, workdir):
+    urls = _store(db)
+    os.remove(local_path_for_url(urls[0]))
+
+    assert lookup_cached_generation(db, "a lighthouse at dusk", "1:1", "test-model", 1) is None
+    db.commit()
+    assert _entry(db) is None
+
+
+def test_rolled_back_lookup_keeps_row_and_files(db, workdir):
+    urls = _store(db)
+    _entry(db).created_at = datetime.utcnow() - timedelta(seconds=GENERATION_CACHE_TTL_SECONDS + 1)
+    db.commit()
+
+    # e.g. the turn hits the storage quota after the lookup
+    assert lookup_cached_generation(db, "a lighthouse at dusk", "1:1", "test-model", 1) is None
+    db.rollback()
+
+    entry = _entry(db)
+    assert entry is not None
+    assert json.loads(entry.urls) == urls
+    assert os.path.exists(local_path_for_url(urls[0]))
+
+
+def test_restore_replaces_the_entry_without_deleting_old_files(db, workdir):
+    old = _store(db)
+    new = _store(db, urls=[_blob(b"second take")])
+
+    assert json.loads(_entry(db).urls) == new
+    assert db.query(GenerationCacheEntry).count() == 1
+    assert os.path.exists(local_path_for_url(old[0]))
+
+
+def test_lru_eviction_drops_least_recently_used(db, workdir, monkeypatch):
+    monkeypatch.setattr(generation_cache, "GENERATION_CACHE_MAX_ENTRIES", 2)
+
+    _store(db, "first")
+    _store(db, "second")
+    _entry(db, "first").last_used_at = datetime.utcnow() - timedelta(hours=1)
+    _entry(db, "second").last_used_at = datetime.utcnow()
+    db.commit()
+
+    _store(db, "third")
+
+    assert _entry(db, "first") is None
+    assert _entry(db, "second") is not None
+    assert _entry(db, "third") is not None
+
+
+def test_evict_drops_expired_entries(db, workdir):
+    _store(db)
+    _entry(db).created_at = datetime.utcnow() - timedelta(seconds=GENERATION_CACHE_TTL_SECONDS + 1)
+    db.commit()
+
+    evict_cached_generations(db)
+    db.commit()
+    assert _entry(db) is None
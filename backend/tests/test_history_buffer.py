@@ -0,0 +1,152 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.models import User, Conversation, Message
+from app.services import history_service
+from app.services.history_service import get_recent_messages, get_conversation_history
+
+
+@pytest.fixture
+def convo(db):
+    # buffers are process-wide and ids restart with every fresh test DB
+    history_service._buffers.clear()
+    history_service._priming.clear()
+
+    user = User(email="history@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+
+    convo = Conversation(user_id=user.id, title="History")
+    db.add(convo)
+    db.commit()
+
+    yield convo
+    history_service._buffers.clear()
+
+
+def _say(db, convo, text: str, role: str = "user") -> Message:
+    msg = Message(conversation_id=convo.id, role=role, text=text)
+    db.add(msg)
+    db.flush()
+    return msg
+
+
+def _texts(rows) -> list[str]:
+    return [t for _, _, t in rows]
+
+
+def _insert_behind_the_orm(db, convo, text_: str):
+    # no ORM events: only a DB read would see this row
+    db.execute(
+        text("INSERT INTO messages (conversation_id, role, text, created_at) VALUES (:c, 'user', :t, :at)"),
+        {"c": convo.id, "t": text_, "at": datetime.utcnow()}
+    )
+    db.commit()
+
+
+def test_first_read_loads_from_db_oldest_first(db, convo):
+    for i in range(3):
+        _say(db, convo, f"m{i}")
+    _say(db, convo, "", role="assistant")
+    db.commit()
+
+    assert _texts(get_recent_messages(db, convo.id)) == ["m0", "m1", "m2"]
+    assert convo.id in history_service._buffers
+
+
+def test_later_reads_come_from_the_buffer(db, convo):
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id)
+
+    _insert_behind_the_orm(db, convo, "not seen")
+    assert _texts(get_recent_messages(db, convo.id)) == ["m0"]
+
+
+def test_committed_messages_are_appended(db, convo):
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id)
+
+    _say(db, convo, "m1", role="assistant")
+    db.commit()
+
+    assert get_conversation_history(db, convo.id) == [
+        {"role": "user", "content": "m0"},
+        {"role": "assistant", "content": "m1"},
+    ]
+
+
+def test_rolled_back_messages_never_reach_the_buffer(db, convo):
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id)
+
+    _say(db, convo, "gone")
+    db.rollback()
+    _say(db, convo, "m1")
+    db.commit()
+
+    assert _texts(get_recent_messages(db, convo.id)) == ["m0", "m1"]
+
+
+def test_buffer_keeps_only_the_last_size_messages(db, convo, monkeypatch):
+    monkeypatch.setattr(history_service, "HISTORY_BUFFER_SIZE", 3)
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id, limit=3)
+
+    for i in range(1, 5):
+        _say(db, convo, f"m{i}")
+    db.commit()
+
+    assert _texts(history_service._buffers[convo.id]) == ["m2", "m3", "m4"]
+    assert _texts(get_recent_messages(db, convo.id, limit=3)) == ["m2", "m3", "m4"]
+    assert _texts(get_recent_messages(db, convo.id, limit=2)) == ["m3", "m4"]
+
+
+def test_limit_above_buffer_size_reads_the_db(db, convo, monkeypatch):
+    monkeypatch.setattr(history_service, "HISTORY_BUFFER_SIZE", 2)
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id)
+
+    _insert_behind_the_orm(db, convo, "m1")
+    assert _texts(get_recent_messages(db, convo.id, limit=5)) == ["m0", "m1"]
+
+
+def test_least_recently_used_conversation_is_dropped(db, convo, monkeypatch):
+    monkeypatch.setattr(history_service, "HISTORY_BUFFER_MAX_CONVERSATIONS", 1)
+    other = Conversation(user_id=convo.user_id, title="Other")
+    db.add(other)
+    db.commit()
+
+    get_recent_messages(db, convo.id)
+    get_recent_messages(db, other.id)
+
+    assert list(history_service._buffers) == [other.id]
+
+
+def test_deleted_conversation_drops_its_buffer(db, convo):
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id)
+
+    db.query(Message).filter(Message.conversation_id == convo.id).delete()
+    db.delete(convo)
+    db.commit()
+
+    assert convo.id not in history_service._buffers
+
+
+def test_disabled_buffer_always_reads_the_db(db, convo, monkeypatch):
+    monkeypatch.setattr(history_service, "HISTORY_BUFFER_ENABLED", False)
+    _say(db, convo, "m0")
+    db.commit()
+    get_recent_messages(db, convo.id)
+
+    _insert_behind_the_orm(db, convo, "m1")
+    assert _texts(get_recent_messages(db, convo.id)) == ["m0", "m1"]
+    assert not history_service._buffers
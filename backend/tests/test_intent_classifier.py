@@ -0,0 +1,84 @@
+import os
+import json
+
+import pytest
+
+from app.config import PLANNER_FAST_PATH_MIN_CONFIDENCE
+from app.services.intent_classifier import classify_reply, fast_path_plan
+from app.services.planner_context import PlannerContext
+
+EVAL_SET = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "data", "intent_eval.jsonl")
+
+DRAFT = "a cozy wooden cabin in a snowy pine forest at night under the northern lights"
+
+
+def _fast(reply: str, question: str) -> bool:
+    intent, confidence = classify_reply(reply, question)
+    return intent == "confirm" and confidence >= PLANNER_FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("question", [
+    "Ready for me to generate this? 🎨",
+    "Does this draft look good to you? ✨",
+    "Love it! ❄️ Shall I go ahead?",
+])
+@pytest.mark.parametrize("reply", ["yes", "yeah go ahead", "looks good, generate 👍", "lgtm"])
+def test_confirming_the_draft(reply, question):
+    assert _fast(reply, question)
+
+
+@pytest.mark.parametrize("question", [
+    "Would you like me to add a dramatic sunset?",
+    "Do you want 16:9 instead of square?",
+    "Shall I include your dog too?",
+    "Should I generate it with a sunset sky?",
+    "Should it feel magical or calm and realistic?",
+    "What colors would you like for the sky? 🌈",
+])
+@pytest.mark.parametrize("reply", ["yes", "sure", "yeah", "yes please", "ok generate"])
+def test_yes_to_a_proposal_goes_to_the_planner(reply, question):
+    assert not _fast(reply, question)
+
+
+@pytest.mark.parametrize("reply", [
+    "no", "yes but add a moon", "make it 16:9", "ok but warmer colors", "hmm maybe", "yes, what about a cat?",
+])
+def test_changes_and_hesitation_go_to_the_planner(reply):
+    assert not _fast(reply, "Ready for me to generate this?")
+
+
+def test_asking_for_the_images_skips_the_proposal():
+    assert _fast("just generate it", "Would you like me to add a dramatic sunset?")
+
+
+def test_eval_set_has_no_false_confirms():
+    with open(EVAL_SET, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    false_confirms = [c for c in cases if c["expected"] == "other" and _fast(c["reply"], c["question"])]
+    assert false_confirms == []
+
+
+def _context(history: list[dict] | None = None, question: str = "Ready for me to generate this? 🎨") -> PlannerContext:
+    return PlannerContext(draft_prompt=DRAFT, pending_questions=[question], history=history or [])
+
+
+def test_fast_path_plan_uses_the_draft():
+    plan = fast_path_plan("yes", _context())
+    assert plan["type"] == "final" and plan["final_prompt"] == DRAFT and plan["aspect_ratio"] == "1:1"
+
+
+def test_fast_path_plan_keeps_a_ratio_from_the_conversation():
+    history = [{"role": "user", "content": "make it 16:9 please"}, {"role": "assistant", "content": "Ready?"}]
+    assert fast_path_plan("yes", _context(history))["aspect_ratio"] == "16:9"
+
+
+def test_fast_path_plan_leaves_framing_words_to_the_planner():
+    history = [{"role": "user", "content": "a wide landscape shot"}]
+    assert fast_path_plan("yes", _context(history)) is None
+
+
+def test_fast_path_plan_needs_a_pending_question_and_a_draft():
+    assert fast_path_plan("yes", PlannerContext(draft_prompt=DRAFT)) is None
+    assert fast_path_plan("yes", PlannerContext(draft_prompt="a cat", pending_questions=["Ready?"])) is None
+    assert fast_path_plan("yes", _context(question="Would you like me to add a dramatic sunset?")) is None
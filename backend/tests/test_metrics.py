@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.db import engine, get_db
+from app.routes import metrics as metrics_route
+from app.services import metrics
+from app.services.metrics import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    begin_turn,
+    end_turn,
+    instrument_engine,
+    render_metrics,
+    turn_stage,
+    upstream_call
+)
+
+
+def _value(rendered: str, series: str) -> float | None:
+    """Value of one exact series line, e.g. 'name_count{route="/x"}'."""
+    for line in rendered.splitlines():
+        if line.rsplit(" ", 1)[0] == series:
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+@pytest.fixture
+def registry():
+    # metrics made in a test stay out of the process-wide /metrics output
+    before = list(metrics._registry)
+    yield
+    metrics._registry[:] = before
+
+
+# ----------------------------
+# Text format
+# ----------------------------
+def test_histogram_renders_cumulative_buckets_sum_and_count(registry):
+    h = Histogram("test_seconds", "Test latency.", ("route",), buckets=(0.1, 1))
+    h.observe(0.05, "/a")
+    h.observe(0.5, "/a")
+    h.observe(5, "/a")
+
+    out = "\n".join(h.render())
+
+    assert "# TYPE test_seconds histogram" in out
+    assert _value(out, 'test_seconds_bucket{route="/a",le="0.1"}') == 1
+    assert _value(out, 'test_seconds_bucket{route="/a",le="1"}') == 2
+    assert _value(out, 'test_seconds_bucket{route="/a",le="+Inf"}') == 3
+    assert _value(out, 'test_seconds_sum{route="/a"}') == pytest.approx(5.55)
+    assert _value(out, 'test_seconds_count{route="/a"}') == 3
+
+
+def test_counter_and_label_escaping(registry):
+    c = Counter("test_total", "Test counter.", ("name",))
+    c.inc('say "hi"\n')
+    c.inc('say "hi"\n', amount=2)
+
+    assert _value("\n".join(c.render()), 'test_total{name="say \\"hi\\"\\n"}') == 3
+
+
+def test_every_metric_is_in_the_output():
+    out = render_metrics()
+    for name in (
+        "vizzy_http_request_seconds", "vizzy_db_queries_per_request", "vizzy_db_queries_total",
+        "vizzy_chat_stage_seconds", "vizzy_chat_turn_seconds", "vizzy_upstream_request_seconds",
+        "vizzy_job_stage_seconds"
+    ):
+        assert f"# TYPE {name} " in out
+
+
+# ----------------------------
+# What gets recorded
+# ----------------------------
+def test_chat_turn_stages_are_labeled_with_the_turn_type():
+    before = _value(render_metrics(), 'vizzy_chat_turn_seconds_count{turn_type="test-turn"}') or 0
+
+    async def turn():
+        begin_turn()
+        with turn_stage("planner"):
+            await asyncio.sleep(0.01)
+        end_turn("test-turn")
+
+    asyncio.run(turn())
+    out = render_metrics()
+
+    assert _value(out, 'vizzy_chat_turn_seconds_count{turn_type="test-turn"}') == before + 1
+    assert _value(out, 'vizzy_chat_stage_seconds_sum{stage="planner",turn_type="test-turn"}') >= 0.01
+
+
+def test_upstream_outcome_is_the_error_status():
+    class Upstream429(Exception):
+        status_code = 429
+
+    with pytest.raises(Upstream429):
+        with upstream_call("image", "test-provider", "m"):
+            raise Upstream429()
+
+    with upstream_call("image", "test-provider", "m"):
+        pass
+
+    out = render_metrics()
+    labels = 'kind="image",provider="test-provider",model="m"'
+    assert _value(out, f'vizzy_upstream_request_seconds_count{{{labels},outcome="429"}}') == 1
+    assert _value(out, f'vizzy_upstream_request_seconds_count{{{labels},outcome="ok"}}') == 1
+
+
+def test_requests_are_labeled_by_route_template_with_their_statements(db):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/test-items/{item_id}")
+    def item(item_id: int, session: Session = Depends(get_db)):
+        session.execute(text("SELECT 1"))
+        session.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    instrument_engine(engine)
+    try:
+        client = TestClient(app)
+        client.get("/test-items/1")
+        client.get("/test-items/2")
+        client.get("/nowhere")
+    finally:
+        event.remove(engine, "before_cursor_execute", metrics._count_statement)
+
+    out = render_metrics()
+    assert _value(out, 'vizzy_http_request_seconds_count{method="GET",route="/test-items/{item_id}",status="200"}') == 2
+    assert _value(out, 'vizzy_db_queries_per_request_sum{route="/test-items/{item_id}"}') == 4
+    assert _value(out, 'vizzy_http_request_seconds_count{method="GET",route="unmatched",status="404"}') >= 1
+
+
+# ----------------------------
+# /metrics access
+# ----------------------------
+@pytest.fixture
+def scrape():
+    app = FastAPI()
+    app.include_router(metrics_route.router)
+    client = TestClient(app)
+    return lambda **headers: client.get("/metrics", headers=headers)
+
+
+def test_no_token_configured_refuses_everyone(scrape, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "")
+    monkeypatch.setattr(metrics_route, "METRICS_PUBLIC", False)
+
+    assert scrape().status_code == 401
+    assert scrape(Authorization="Bearer ").status_code == 401
+
+
+def test_token_is_required_when_configured(scrape, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "s3cret")
+    # a token wins over the opt-out
+    monkeypatch.setattr(metrics_route, "METRICS_PUBLIC", True)
+
+    assert scrape().status_code == 401
+    assert scrape(Authorization="Bearer wrong").status_code == 401
+
+    r = scrape(Authorization="Bearer s3cret")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE vizzy_http_request_seconds histogram" in r.text
+
+
+def test_public_opt_out_serves_without_a_token(scrape, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "")
+    monkeypatch.setattr(metrics_route, "METRICS_PUBLIC", True)
+
+    assert scrape().status_code == 200
@@ -0,0 +1,48 @@
+from app.services.planner_cache import planner_cache_key, _collapse_repeats
+from app.services.planner_context import PlannerContext, build_planner_messages
+
+
+def _request(history: list[dict], text: str, draft: str | None = "a fox in the snow", pending: list[str] | None = None) -> dict:
+    context = PlannerContext(
+        draft_prompt=draft,
+        pending_questions=["Which style?"] if pending is None else pending,
+        history=history,
+        preferences="likes watercolor"
+    )
+    return {"model": "m", "temperature": 0.2, "messages": build_planner_messages("system", context, text)}
+
+
+HISTORY = [
+    {"role": "user", "content": "a fox"},
+    {"role": "assistant", "content": "Which style?"},
+]
+
+
+def test_double_submit_shares_a_key_with_state_messages_between():
+    # the first submit excludes itself from history, the second sees the first
+    first = _request(HISTORY, "watercolor please")
+    second = _request(HISTORY + [{"role": "user", "content": "watercolor please"}], "watercolor please")
+
+    assert first["messages"] != second["messages"]
+    assert planner_cache_key(first) == planner_cache_key(second)
+
+
+def test_double_submit_shares_a_key_without_state():
+    first = _request(HISTORY, "watercolor please", draft=None, pending=[])
+    second = _request(HISTORY + [{"role": "user", "content": "watercolor please"}], "watercolor please", draft=None, pending=[])
+
+    assert planner_cache_key(first) == planner_cache_key(second)
+
+
+def test_same_text_answering_a_new_question_is_kept():
+    # "yes" to two different questions: the assistant turn between keeps both
+    request = _request(
+        HISTORY + [{"role": "user", "content": "yes"}, {"role": "assistant", "content": "Square or wide?"}],
+        "yes"
+    )
+
+    assert _collapse_repeats(request["messages"]) == request["messages"]
+
+
+def test_different_state_is_a_different_key():
+    assert planner_cache_key(_request(HISTORY, "ok", draft="a fox")) != planner_cache_key(_request(HISTORY, "ok", draft="a wolf"))
@@ -0,0 +1,118 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.planner_output import (
+    PlannerOutputError,
+    repair_json,
+    normalize_reply,
+    structured_planner_call
+)
+
+REPLY = {
+    "type": "question",
+    "questions": ["Which style? 🎨"],
+    "final_prompt": None,
+    "draft_prompt": "a fox, \"red\" fur",
+    "num_outputs": 4,
+    "aspect_ratio": "1:1"
+}
+RAW = json.dumps(REPLY, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("raw", [
+    RAW,
+    f"```json\n{RAW}\n```",
+    f"```\n{RAW}\n```",
+    f"Sure! Here you go:\n{RAW}\nHope that helps.",
+    RAW.replace('"1:1"', '"1:1",').replace('"Which style? 🎨"', '"Which style? 🎨",'),
+])
+def test_repairs_back_to_the_reply(raw):
+    assert repair_json(raw) == REPLY
+
+
+def test_raw_newline_inside_a_string():
+    raw = '{"type": "question", "questions": ["Line one\nline two?"]}'
+    assert repair_json(raw)["questions"] == ["Line one\nline two?"]
+
+
+def test_truncated_mid_string_is_closed():
+    data = repair_json(RAW[:RAW.index("fur") + 2])
+    assert data["type"] == "question" and data["questions"] == ["Which style? 🎨"]
+
+
+def test_truncated_after_a_key_keeps_the_complete_fields():
+    data = repair_json(RAW[:RAW.index('"num_outputs"') + len('"num_outputs":')])
+    assert data["type"] == "question" and data["draft_prompt"] == REPLY["draft_prompt"]
+    assert "aspect_ratio" not in data
+
+
+def test_truncated_inside_an_array():
+    data = repair_json('{"type": "question", "questions": ["Which style?", "And the')
+    assert data["questions"][0] == "Which style?"
+
+
+@pytest.mark.parametrize("raw", ["", "I can't help with that.", "{{{", '{"type": }'])
+def test_unrepairable(raw):
+    with pytest.raises(PlannerOutputError):
+        repair_json(raw)
+
+
+def test_normalize_fills_defaults_and_infers_the_type():
+    data = normalize_reply({"final_prompt": "  a red fox  ", "num_outputs": "x"})
+    assert data["type"] == "final" and data["final_prompt"] == "a red fox"
+    assert data["num_outputs"] == 4 and data["aspect_ratio"] == "1:1" and data["questions"] == []
+
+
+def test_normalize_keeps_one_question():
+    data = normalize_reply({"type": "question", "questions": ["  One? ", "", "Two?"]})
+    assert data["questions"] == ["One?"]
+
+
+@pytest.mark.parametrize("data", [[], {"type": "banana"}, {"type": "final", "final_prompt": "  "}, {}])
+def test_normalize_rejects(data):
+    with pytest.raises(PlannerOutputError):
+        normalize_reply(data)
+
+
+class _Client:
+    """chat.completions.create returning the given raw replies in turn."""
+
+    def __init__(self, *replies: str):
+        self.replies = list(replies)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **request):
+        self.requests.append(request)
+        content = self.replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _call(client: _Client) -> dict:
+    request = {"model": "m", "messages": [{"role": "user", "content": "a fox"}]}
+    return asyncio.run(structured_planner_call(client, request, None, "test planner", "test"))
+
+
+def test_repaired_reply_needs_no_reask():
+    client = _Client(f"```json\n{RAW}\n```")
+    assert _call(client)["questions"] == ["Which style? 🎨"]
+    assert len(client.requests) == 1
+
+
+def test_unusable_reply_is_reasked_once_with_the_reason():
+    client = _Client("no json here", RAW)
+    assert _call(client)["type"] == "question"
+
+    assert len(client.requests) == 2
+    reask = client.requests[1]["messages"]
+    assert reask[-2] == {"role": "assistant", "content": "no json here"}
+    assert "could not be used" in reask[-1]["content"]
+
+
+def test_gives_up_after_the_reask():
+    client = _Client("nope", '{"type": "final", "final_prompt": ""}')
+    with pytest.raises(RuntimeError, match="unusable JSON"):
+        _call(client)
@@ -0,0 +1,45 @@
+import json
+
+from app.services.planner_stream import QuestionStreamer
+
+
+def _stream(raw: str, size: int) -> str:
+    streamer = QuestionStreamer()
+    return "".join(streamer.feed(raw[i:i + size]) for i in range(0, len(raw), size))
+
+
+def test_streams_only_the_first_question():
+    raw = json.dumps({"type": "question", "questions": ["Which style?", "Second?"], "draft_prompt": "x"})
+    assert _stream(raw, 1) == "Which style?"
+    assert _stream(raw, 1000) == "Which style?"
+
+
+def test_nothing_before_the_questions_key():
+    streamer = QuestionStreamer()
+    assert streamer.feed('{"type": "question", "draft_prompt": "a fox') == ""
+    assert streamer.feed('", "questions": ["Hi') == "Hi"
+
+
+def test_escapes_split_across_chunks():
+    raw = json.dumps({"questions": ['Say "cozy"\\nor\ttidy?']})
+    for size in range(1, 8):
+        assert _stream(raw, size) == 'Say "cozy"\\nor\ttidy?'
+
+
+def test_surrogate_pair_split_anywhere():
+    # json.dumps escapes the emoji as \ud83c\udfa8
+    raw = json.dumps({"questions": ["Which palette? 🎨 ok"]})
+    assert "\\ud83c\\udfa8" in raw
+    for size in range(1, 14):
+        assert _stream(raw, size) == "Which palette? 🎨 ok"
+
+
+def test_lone_surrogate_is_dropped():
+    raw = '{"questions": ["a\\ud83cb"], "final_prompt": null}'
+    assert _stream(raw, 3) == "ab"
+
+
+def test_stops_at_the_closing_quote():
+    streamer = QuestionStreamer()
+    assert streamer.feed('{"questions": ["Done?"') == "Done?"
+    assert streamer.feed(', "more": "text"}') == ""
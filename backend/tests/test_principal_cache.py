@@ -0,0 +1,127 @@
+import time
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.models import User
+from app.routes.deps import get_current_user
+from app.services import principal_cache
+from app.services.principal_cache import Principal, get_cached_principal, cache_principal, principal_version
+from app.services.jwt_service import create_access_token
+
+
+@pytest.fixture
+def user(db):
+    # the cache is process-wide and user ids restart with every fresh test DB
+    principal_cache._cache.clear()
+    principal_cache._versions.clear()
+
+    user = User(email="cache@example.com", password_hash="old")
+    db.add(user)
+    db.commit()
+
+    yield user
+    principal_cache._cache.clear()
+    principal_cache._versions.clear()
+
+
+def _authenticate(db, token: str) -> Principal:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(get_current_user(credentials=credentials, db=db))
+
+
+def test_first_request_caches_the_principal(db, user):
+    token = create_access_token({"user_id": user.id})
+
+    principal = _authenticate(db, token)
+
+    assert principal == Principal(id=user.id, email="cache@example.com")
+    assert get_cached_principal(token) == principal
+
+
+def test_password_change_drops_cached_tokens(db, user):
+    token = create_access_token({"user_id": user.id})
+    _authenticate(db, token)
+
+    user.password_hash = "new"
+    db.commit()
+
+    assert get_cached_principal(token) is None
+    assert principal_version(user.id) == 1
+
+
+def test_email_change_serves_the_new_email(db, user):
+    token = create_access_token({"user_id": user.id})
+    _authenticate(db, token)
+
+    user.email = "renamed@example.com"
+    db.commit()
+
+    assert _authenticate(db, token).email == "renamed@example.com"
+
+
+def test_unrelated_update_keeps_the_cache(db, user):
+    token = create_access_token({"user_id": user.id})
+    _authenticate(db, token)
+
+    user.created_at = user.created_at - timedelta(days=1)
+    db.commit()
+
+    assert get_cached_principal(token) is not None
+
+
+def test_deleted_user_is_rejected(db, user):
+    token = create_access_token({"user_id": user.id})
+    _authenticate(db, token)
+
+    db.delete(user)
+    db.commit()
+
+    assert get_cached_principal(token) is None
+    with pytest.raises(HTTPException) as e:
+        _authenticate(db, token)
+    assert e.value.status_code == 401
+
+
+def test_rolled_back_change_keeps_the_cache(db, user):
+    token = create_access_token({"user_id": user.id})
+    _authenticate(db, token)
+
+    user.password_hash = "new"
+    db.flush()
+    db.rollback()
+
+    assert get_cached_principal(token) is not None
+    assert principal_version(user.id) == 0
+
+
+def test_lookup_that_raced_a_change_is_not_cached(user):
+    principal = Principal(id=user.id, email=user.email)
+    version = principal_version(user.id)
+
+    # the user changed their password while we were reading the row
+    principal_cache.invalidate_user(user.id)
+    cache_principal("stale", principal, version, None)
+
+    assert get_cached_principal("stale") is None
+
+
+def test_entry_never_outlives_the_token(user):
+    principal = Principal(id=user.id, email=user.email)
+
+    cache_principal("expired", principal, 0, time.time() - 1)
+    assert get_cached_principal("expired") is None
+
+
+def test_cache_is_bounded(user, monkeypatch):
+    monkeypatch.setattr(principal_cache, "AUTH_CACHE_MAX_ENTRIES", 2)
+    principal = Principal(id=user.id, email=user.email)
+
+    for token in ("a", "b", "c"):
+        cache_principal(token, principal, 0, None)
+
+    assert get_cached_principal("a") is None
+    assert get_cached_principal("c") == principal
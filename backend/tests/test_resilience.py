@@ -0,0 +1,317 @@
+import time
+import random
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import openai
+import pytest
+
+from app.services.image_generation.resilience import (
+    TokenBucket,
+    CircuitBreaker,
+    ProviderGuard,
+    ProviderUnavailableError,
+    retry_after
+)
+from app.services.image_generation.providers import fake_provider
+from app.services.image_generation.providers.fake_provider import FakeProviderError
+
+
+def _guard(**overrides) -> ProviderGuard:
+    settings = dict(
+        name="test", rate=0, burst=1, max_in_flight=4, max_retries=3,
+        base_delay=0.001, max_delay=1.0, breaker_failures=3, breaker_cooldown=0.05
+    )
+    settings.update(overrides)
+    return ProviderGuard(**settings)
+
+
+def _half_open(guard: ProviderGuard):
+    guard.breaker.opened_at = time.monotonic() - guard.breaker.cooldown
+
+
+# ----------------------------
+# retry_after
+# ----------------------------
+def _rate_limit_error(headers: dict) -> openai.RateLimitError:
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "http://upstream/v1/images"))
+    return openai.RateLimitError("slow down", response=response, body=None)
+
+
+def test_retry_after_ms_wins():
+    assert retry_after(_rate_limit_error({"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+
+
+def test_retry_after_seconds():
+    assert retry_after(_rate_limit_error({"retry-after": "3"})) == 3.0
+    assert retry_after(FakeProviderError(429, {"retry-after": "0.25"})) == 0.25
+
+
+def test_retry_after_http_date():
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 27 <= retry_after(_rate_limit_error({"retry-after": when})) <= 30
+
+
+def test_retry_after_missing_or_garbage():
+    assert retry_after(_rate_limit_error({})) is None
+    assert retry_after(_rate_limit_error({"retry-after": "soon"})) is None
+    assert retry_after(ValueError("no response at all")) is None
+
+
+# ----------------------------
+# TokenBucket
+# ----------------------------
+def test_bucket_serves_waiters_in_arrival_order():
+    async def scenario():
+        bucket = TokenBucket(rate=50, burst=1)
+        done = []
+
+        async def take(i: int):
+            await bucket.acquire()
+            done.append((i, time.monotonic()))
+
+        t0 = time.monotonic()
+        await asyncio.gather(*[take(i) for i in range(5)])
+        return t0, done
+
+    t0, done = asyncio.run(scenario())
+
+    assert [i for i, _ in done] == [0, 1, 2, 3, 4]
+    # one token up front, then one every 20ms
+    assert done[-1][1] - t0 >= 0.07
+
+
+def test_bucket_pause_holds_back_everyone():
+    async def scenario():
+        bucket = TokenBucket(rate=100, burst=10)
+        bucket.pause(0.1)
+        t0 = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - t0
+
+    assert asyncio.run(scenario()) >= 0.1
+
+
+def test_bucket_pause_never_shortens_a_longer_debt():
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.tokens = -5
+    bucket.updated = time.monotonic()
+    bucket.pause(0.1)
+    assert bucket.tokens <= -4.9
+
+
+def test_cancelled_waiter_gives_its_token_back():
+    async def scenario():
+        bucket = TokenBucket(rate=10, burst=1)
+        await bucket.acquire()
+
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return bucket.tokens
+
+    # back to the debt-free refill, not one token further behind
+    assert asyncio.run(scenario()) > -0.5
+
+
+def test_unlimited_bucket_never_waits():
+    async def scenario():
+        bucket = TokenBucket(rate=0, burst=1)
+        bucket.pause(10)
+        t0 = time.monotonic()
+        for _ in range(100):
+            await bucket.acquire()
+        return time.monotonic() - t0
+
+    assert asyncio.run(scenario()) < 0.05
+
+
+# ----------------------------
+# CircuitBreaker
+# ----------------------------
+def test_breaker_opens_after_consecutive_failures_then_half_opens():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call("test")
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.before_call("test") is True
+
+    # only one probe at a time
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call("test")
+
+
+def test_failed_probe_reopens_and_successful_probe_closes():
+    breaker = CircuitBreaker(failures=3, cooldown=0.05)
+    breaker.opened_at = time.monotonic() - 1
+
+    assert breaker.before_call("test") is True
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.probing
+
+    breaker.opened_at = time.monotonic() - 1
+    assert breaker.before_call("test") is True
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.consecutive == 0
+
+
+def test_429_on_probe_does_not_reopen_the_breaker():
+    guard = _guard()
+    _half_open(guard)
+    calls = []
+
+    async def request():
+        calls.append(1)
+        if len(calls) == 1:
+            raise FakeProviderError(429, {"retry-after": "0"})
+        return "ok"
+
+    assert asyncio.run(guard.run(request)) == "ok"
+    assert guard.breaker.state == "closed"
+    assert guard.counters["rate_limited"] == 1
+    assert guard.counters["failures"] == 0
+
+
+def test_cancelled_probe_frees_the_half_open_slot():
+    guard = _guard()
+    _half_open(guard)
+
+    async def scenario():
+        probe = asyncio.create_task(guard.run(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        assert guard.breaker.probing
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert not guard.breaker.probing
+        assert guard.probe_settled.is_set()
+        assert guard.breaker.state == "half-open"
+
+        async def ok():
+            return "ok"
+
+        return await guard.run(ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert guard.breaker.state == "closed"
+
+
+def test_callers_wait_for_the_probe():
+    guard = _guard()
+    _half_open(guard)
+    order = []
+
+    async def request(name: str, delay: float):
+        await asyncio.sleep(delay)
+        order.append(name)
+        return name
+
+    async def scenario():
+        probe = asyncio.create_task(guard.run(lambda: request("probe", 0.05)))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(probe, guard.run(lambda: request("second", 0)))
+
+    asyncio.run(scenario())
+    assert order == ["probe", "second"]
+
+
+# ----------------------------
+# ProviderGuard against IMAGE_PROVIDER=fake
+# ----------------------------
+@pytest.fixture
+def fake(monkeypatch, tmp_path):
+    # the fake provider writes its PNGs to storage/ under the cwd
+    monkeypatch.chdir(tmp_path)
+    saved = dict(fake_provider._settings)
+    random.seed(7)
+    fake_provider.configure(latency=0.001, jitter=0, retry_after=0)
+    yield fake_provider
+    fake_provider._settings.update(saved)
+
+
+def test_fake_provider_happy_path(fake, tmp_path):
+    fake.configure(faults={})
+    guard = _guard()
+
+    url = asyncio.run(guard.run(fake._request))
+
+    assert "/storage/generated/" in url
+    assert list((tmp_path / "storage" / "generated").rglob("*.png"))
+    assert guard.counters["requests"] == 1 and guard.counters["retries"] == 0
+
+
+def test_fake_provider_429s_retry_then_give_up(fake):
+    fake.configure(faults={"429": 1.0})
+    guard = _guard(max_retries=2)
+
+    with pytest.raises(FakeProviderError) as e:
+        asyncio.run(guard.run(fake._request))
+
+    assert e.value.status_code == 429
+    assert guard.counters["requests"] == 3
+    assert guard.counters["rate_limited"] == 3
+    # throttling says nothing about the provider being down
+    assert guard.breaker.state == "closed"
+
+
+def test_fake_provider_5xx_opens_the_breaker(fake):
+    fake.configure(faults={"500": 1.0})
+    guard = _guard(max_retries=5, breaker_failures=2, breaker_cooldown=60)
+
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(guard.run(fake._request))
+
+    assert guard.counters["requests"] == 2
+    assert guard.counters["failures"] == 2
+    assert guard.counters["rejected"] == 1
+    assert guard.breaker.state == "open"
+
+
+def test_fake_provider_timeouts_are_retried(fake):
+    fake.configure(faults={"timeout": 1.0})
+    guard = _guard(max_retries=1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(guard.run(fake._request))
+
+    assert guard.counters["requests"] == 2
+    assert guard.counters["retries"] == 1
+
+
+def test_fake_provider_400_is_not_retried(fake):
+    fake.configure(faults={"400": 1.0})
+    guard = _guard()
+
+    with pytest.raises(FakeProviderError):
+        asyncio.run(guard.run(fake._request))
+
+    assert guard.counters["requests"] == 1
+    assert guard.breaker.state == "closed"
+
+
+def test_fake_provider_mixed_faults_recover(fake):
+    fake.configure(faults={"429": 0.3, "503": 0.2, "timeout": 0.1})
+    guard = _guard(max_retries=20, breaker_failures=0)
+
+    async def scenario():
+        return await asyncio.gather(*[guard.run(fake._request) for _ in range(20)])
+
+    urls = asyncio.run(scenario())
+
+    assert len(urls) == 20
+    assert guard.counters["retries"] > 0
+    assert guard.counters["requests"] == 20 + guard.counters["retries"]
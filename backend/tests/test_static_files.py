@@ -0,0 +1,144 @@
+import gzip
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import STATIC_IMMUTABLE_MAX_AGE
+from app.services.static_files import AssetFiles
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"pixels" * 100
+SHA256 = hashlib.sha256(PNG).hexdigest()
+SCRIPT = b"function hello() { return 'hello world'; }\n" * 100
+
+
+@pytest.fixture
+def root(tmp_path):
+    blob = tmp_path / "storage" / "generated" / SHA256[:2] / SHA256[2:4]
+    blob.mkdir(parents=True)
+    (blob / f"{SHA256}.png").write_bytes(PNG)
+    (tmp_path / "storage" / "generated" / "ab12cd34ef56ab12cd34ef56ab12cd34.png").write_bytes(PNG)
+    (tmp_path / "storage" / "cover.png").write_bytes(PNG)
+
+    (tmp_path / "frontend").mkdir()
+    (tmp_path / "frontend" / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "frontend" / "tiny.js").write_bytes(b"let x;")
+    (tmp_path / "frontend" / "logo.png").write_bytes(PNG * 10)
+    return tmp_path
+
+
+@pytest.fixture
+def client(root):
+    app = FastAPI()
+    app.mount("/storage", AssetFiles(directory=str(root / "storage"), immutable_dirs=("generated",)))
+    app.mount("/frontend", AssetFiles(directory=str(root / "frontend"), compress=True))
+    return TestClient(app)
+
+
+BLOB = f"/storage/generated/{SHA256[:2]}/{SHA256[2:4]}/{SHA256}.png"
+
+
+# ----------------------------
+# Cache-Control and ETags
+# ----------------------------
+def test_hashed_blob_is_immutable_with_its_sha256_as_etag(client):
+    r = client.get(BLOB)
+
+    assert r.status_code == 200 and r.content == PNG
+    assert r.headers["cache-control"] == f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+    assert r.headers["etag"] == f'"{SHA256}"'
+
+
+def test_uuid_named_legacy_file_is_immutable(client):
+    r = client.get("/storage/generated/ab12cd34ef56ab12cd34ef56ab12cd34.png")
+    assert "immutable" in r.headers["cache-control"]
+
+
+def test_other_files_are_revalidated_with_a_strong_content_etag(client):
+    r = client.get("/storage/cover.png")
+
+    assert r.headers["cache-control"] == "public, no-cache"
+    # strong (no W/) and from the content, not mtime/size
+    assert r.headers["etag"] == f'"{SHA256}"'
+
+
+def test_matching_if_none_match_is_a_304(client):
+    etag = client.get("/storage/cover.png").headers["etag"]
+
+    r = client.get("/storage/cover.png", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["etag"] == etag
+
+    assert client.get("/storage/cover.png", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/storage/cover.png", headers={"If-None-Match": '"other", *'}).status_code == 304
+    assert client.get("/storage/cover.png", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_changed_file_gets_a_new_etag(client, root):
+    old = client.get("/storage/cover.png").headers["etag"]
+    (root / "storage" / "cover.png").write_bytes(PNG + b"more")
+
+    r = client.get("/storage/cover.png", headers={"If-None-Match": old})
+    assert r.status_code == 200 and r.headers["etag"] != old
+
+
+def test_range_request(client):
+    r = client.get(BLOB, headers={"Range": "bytes=0-7"})
+    assert r.status_code == 206 and r.content == PNG[:8]
+
+
+# ----------------------------
+# Compression
+# ----------------------------
+def test_text_is_gzipped_in_memory_without_a_sidecar(client):
+    r = client.get("/frontend/app.js", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.headers["etag"].endswith('-gzip"')
+    # httpx decodes it for us
+    assert r.content == SCRIPT
+
+
+def test_br_sidecar_wins_when_accepted(client, root):
+    (root / "frontend" / "app.js.br").write_bytes(b"brotli bytes")
+    (root / "frontend" / "app.js.gz").write_bytes(gzip.compress(SCRIPT))
+
+    r = client.get("/frontend/app.js", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert r.headers["etag"].endswith('-br"')
+    assert r.num_bytes_downloaded == len(b"brotli bytes")
+
+
+def test_gz_sidecar_when_br_is_not_accepted(client, root):
+    (root / "frontend" / "app.js.br").write_bytes(b"brotli bytes")
+    sidecar = gzip.compress(SCRIPT, mtime=0)
+    (root / "frontend" / "app.js.gz").write_bytes(sidecar)
+
+    r = client.get("/frontend/app.js", headers={"Accept-Encoding": "gzip, br;q=0"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.num_bytes_downloaded == len(sidecar)
+    assert r.content == SCRIPT
+
+
+def test_identity_and_small_files_are_sent_as_is(client):
+    r = client.get("/frontend/app.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.headers["etag"] == f'"{hashlib.sha256(SCRIPT).hexdigest()}"'
+
+    r = client.get("/frontend/tiny.js", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+
+
+def test_each_encoding_revalidates_against_its_own_etag(client):
+    gzipped = client.get("/frontend/app.js", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+    assert client.get("/frontend/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped}).status_code == 304
+    assert client.get("/frontend/app.js", headers={"Accept-Encoding": "identity", "If-None-Match": gzipped}).status_code == 200
+
+
+def test_images_are_never_compressed(client):
+    r = client.get("/frontend/logo.png", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in r.headers and r.content == PNG * 10
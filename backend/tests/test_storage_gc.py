@@ -0,0 +1,226 @@
+import os
+import time
+import json
+
+import pytest
+
+from app.config import BASE_URL
+from app.models import User, Conversation, Message, Asset, AssetVariant, GenerationCacheEntry, GenerationJob, UserStorageUsage
+from app.services import storage_gc, storage_quota
+from app.services.storage import get_storage
+from app.services.storage_gc import run_sweep, release_files
+from app.services.storage_resolver import local_path_for_url
+
+GRACE = 600
+
+
+@pytest.fixture
+def store(db, monkeypatch, tmp_path):
+    # local blobs and uploads live under storage/ in the cwd
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage_gc, "GC_GRACE_SECONDS", GRACE)
+    monkeypatch.setattr(storage_gc, "GC_BATCH_SIZE", 2)
+    return get_storage()
+
+
+@pytest.fixture
+def convo(db):
+    user = User(email="gc@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    convo = Conversation(user_id=user.id, title="GC")
+    db.add(convo)
+    db.commit()
+    return convo
+
+
+def _age(url_or_path: str, seconds: float):
+    path = local_path_for_url(url_or_path) or url_or_path
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def _blob(store, data: bytes, age: float = 2 * GRACE, prefix: str = "generated") -> str:
+    url = store.put(data, "webp" if prefix == "variants" else "png", prefix=prefix).url
+    _age(url, age)
+    return url
+
+
+def _show(db, convo, *urls) -> Message:
+    msg = Message(conversation_id=convo.id, role="assistant", text="images")
+    db.add(msg)
+    db.flush()
+    db.add_all([Asset(message_id=msg.id, type="image", url=url) for url in urls])
+    db.commit()
+    return msg
+
+
+def _variant(db, store, source_url: str) -> str:
+    url = _blob(store, b"variant of " + source_url.encode(), prefix="variants")
+    db.add(AssetVariant(source_url=source_url, name="thumb", format="webp", width=384, height=384, url=url))
+    db.commit()
+    return url
+
+
+def _exists(url: str) -> bool:
+    return os.path.exists(local_path_for_url(url))
+
+
+# ----------------------------
+# Blob sweep
+# ----------------------------
+def test_old_orphans_go_and_everything_in_use_stays(db, store, convo):
+    shown = _blob(store, b"shown")
+    cached = _blob(store, b"cached")
+    orphan = _blob(store, b"orphan")
+    db.add(GenerationCacheEntry(
+        cache_key="k", prompt="p", aspect_ratio="1:1", model="m", num_outputs=1, urls=json.dumps([cached])
+    ))
+    _show(db, convo, shown)
+
+    report = run_sweep(dry_run=False)
+
+    assert _exists(shown) and _exists(cached)
+    assert not _exists(orphan)
+    assert report["blobs"]["deleted"] == 1
+    assert report["blobs"]["examples"] == [orphan]
+
+
+def test_orphans_within_the_grace_period_are_kept(db, store):
+    recent = _blob(store, b"recent", age=GRACE / 2)
+
+    report = run_sweep(dry_run=False)
+
+    assert _exists(recent)
+    assert report["blobs"]["recent"] == 1 and report["blobs"]["deleted"] == 0
+
+
+def test_variants_live_and_die_with_their_source(db, store, convo):
+    shown = _blob(store, b"shown")
+    gone = _blob(store, b"gone")
+    _show(db, convo, shown)
+    live_variant = _variant(db, store, shown)
+    dead_variant = _variant(db, store, gone)
+
+    report = run_sweep(dry_run=False)
+
+    assert _exists(live_variant)
+    assert not _exists(gone) and not _exists(dead_variant)
+    assert report["variant_sources_pruned"] == 1
+    assert [v.source_url for v in db.query(AssetVariant)] == [shown]
+
+
+def test_dry_run_deletes_nothing(db, store, convo):
+    orphan = _blob(store, b"orphan")
+    gone = _blob(store, b"gone")
+    _variant(db, store, gone)
+    upload = os.path.join(storage_gc.UPLOAD_DIR, "old.png")
+    os.makedirs(storage_gc.UPLOAD_DIR)
+    open(upload, "wb").close()
+    _age(upload, storage_gc.UPLOAD_TTL_SECONDS + 1)
+
+    report = run_sweep(dry_run=True)
+
+    assert report["dry_run"]
+    assert report["blobs"]["orphaned"] == 3 and report["blobs"]["deleted"] == 0
+    assert report["tmp_uploads"]["expired"] == 1 and report["tmp_uploads"]["deleted"] == 0
+    assert report["variant_sources_pruned"] == 1
+    assert _exists(orphan) and _exists(gone) and os.path.exists(upload)
+    assert db.query(AssetVariant).count() == 1
+
+
+def test_other_base_url_stops_the_blob_sweep(db, store, convo):
+    orphan = _blob(store, b"orphan")
+    _show(db, convo, "http://old-host:8000/storage/generated/ab/cd/old.png")
+
+    report = run_sweep(dry_run=False)
+
+    assert "another base URL" in report["blobs"]["skipped"]
+    assert report["blobs"]["scanned"] == 0
+    assert _exists(orphan)
+
+
+# ----------------------------
+# Uploads and partial writes
+# ----------------------------
+def test_uploads_expire_after_their_ttl_unless_a_job_needs_them(db, store, convo):
+    os.makedirs(storage_gc.PARTIAL_DIR)
+    paths = {}
+    for name, age in (("old", storage_gc.UPLOAD_TTL_SECONDS + 1), ("new", 10), ("input", storage_gc.UPLOAD_TTL_SECONDS + 1)):
+        paths[name] = os.path.join(storage_gc.UPLOAD_DIR, f"{name}.png")
+        open(paths[name], "wb").close()
+        _age(paths[name], age)
+
+    partial = os.path.join(storage_gc.PARTIAL_DIR, "abandoned")
+    open(partial, "wb").close()
+    _age(partial, 2 * GRACE)
+
+    msg = _show(db, convo)
+    db.add(GenerationJob(
+        user_id=convo.user_id, conversation_id=convo.id, message_id=msg.id, provider="fake",
+        prompt="p", status="queued", image_url=f"{BASE_URL}/storage/tmp/input.png"
+    ))
+    db.commit()
+
+    report = run_sweep(dry_run=False)
+
+    assert not os.path.exists(paths["old"]) and not os.path.exists(partial)
+    assert os.path.exists(paths["new"]) and os.path.exists(paths["input"])
+    assert report["tmp_uploads"]["deleted"] == 1
+    assert report["partial_uploads"]["deleted"] == 1
+
+
+# ----------------------------
+# Usage
+# ----------------------------
+def test_sweep_recomputes_usage_from_scratch(db, store, convo):
+    a = _blob(store, b"a" * 100)
+    b = _blob(store, b"b" * 50)
+    # the same image twice in one user's conversations counts once
+    _show(db, convo, a, b)
+    _show(db, convo, a)
+
+    stranger = User(email="stale@example.com", password_hash="x")
+    db.add(stranger)
+    db.flush()
+    db.add(UserStorageUsage(user_id=stranger.id, used_bytes=10 ** 9, files=99))
+    db.add(UserStorageUsage(user_id=convo.user_id, used_bytes=1, files=1))
+    db.commit()
+
+    report = run_sweep(dry_run=False)
+
+    rows = {r.user_id: (r.used_bytes, r.files) for r in db.query(UserStorageUsage)}
+    assert rows == {convo.user_id: (150, 2)}
+    assert report["usage"]["users"] == 1
+
+
+# ----------------------------
+# Conversation deletes
+# ----------------------------
+def test_release_files_frees_only_what_nothing_else_shows(db, store, convo, monkeypatch):
+    monkeypatch.setattr(storage_quota, "USER_STORAGE_QUOTA_BYTES", 10 ** 6)
+
+    released = _blob(store, b"r" * 100)
+    recent = _blob(store, b"n" * 10, age=GRACE / 2)
+    elsewhere = _blob(store, b"e" * 20)
+    variant = _variant(db, store, released)
+
+    deleted_msg = _show(db, convo, released, recent, elsewhere)
+    _show(db, convo, elsewhere)
+    db.add(UserStorageUsage(user_id=convo.user_id, used_bytes=130, files=3))
+    db.commit()
+
+    db.query(Asset).filter(Asset.message_id == deleted_msg.id).delete()
+    db.commit()
+
+    release_files(convo.user_id, [released, recent, elsewhere])
+
+    assert not _exists(released) and not _exists(variant)
+    assert db.query(AssetVariant).count() == 0
+    # inside the grace period: left for the next sweep
+    assert _exists(recent)
+    assert _exists(elsewhere)
+
+    db.expire_all()
+    usage = db.get(UserStorageUsage, convo.user_id)
+    assert (usage.used_bytes, usage.files) == (20, 1)
@@ -0,0 +1,100 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import upload
+from app.routes.deps import get_current_user
+from app.services import upload_service
+from app.services.principal_cache import Principal
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"pixels" * 100
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    # uploads land in storage/tmp under the cwd
+    monkeypatch.chdir(tmp_path)
+
+    app = FastAPI()
+    app.include_router(upload.router)
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, email="upload@example.com")
+    return TestClient(app)
+
+
+def _post(client, data: bytes, filename: str = "cat.png"):
+    return client.post("/upload/image", files={"file": (filename, data, "image/png")})
+
+
+def _stored(tmp_path) -> list[str]:
+    return sorted(p.name for p in (tmp_path / "storage" / "tmp").iterdir() if p.is_file())
+
+
+def _partials(tmp_path) -> list[str]:
+    return [p.name for p in (tmp_path / "storage" / "tmp" / ".partial").iterdir()]
+
+
+def test_upload_is_stored_under_its_sha256(client, tmp_path):
+    r = _post(client, PNG)
+
+    sha256 = hashlib.sha256(PNG).hexdigest()
+    assert r.status_code == 200
+    assert r.json()["sha256"] == sha256
+    assert r.json()["image_url"].endswith(f"/storage/tmp/{sha256}.png")
+    assert (tmp_path / "storage" / "tmp" / f"{sha256}.png").read_bytes() == PNG
+    assert _partials(tmp_path) == []
+
+
+def test_identical_bytes_are_stored_once(client, tmp_path):
+    first = _post(client, PNG, "a.png").json()
+    second = _post(client, PNG, "b.png").json()
+
+    assert first["image_url"] == second["image_url"]
+    assert _stored(tmp_path) == [f"{first['sha256']}.png"]
+    assert _partials(tmp_path) == []
+
+
+def test_oversized_upload_is_rejected_midstream(client, tmp_path, monkeypatch):
+    # small enough that Content-Length alone doesn't give it away
+    monkeypatch.setattr(upload_service, "UPLOAD_MAX_BYTES", 1024)
+
+    r = _post(client, b"x" * 4096)
+
+    assert r.status_code == 413
+    assert _stored(tmp_path) == []
+    assert _partials(tmp_path) == []
+
+
+def test_oversized_content_length_is_refused_up_front(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "UPLOAD_MAX_BYTES", 1024)
+
+    r = _post(client, b"x" * (64 * 1024))
+
+    assert r.status_code == 413
+    assert not (tmp_path / "storage").exists()
+
+
+def test_wrong_extension_leaves_nothing_behind(client, tmp_path):
+    r = _post(client, PNG, "notes.txt")
+
+    assert r.status_code == 400
+    assert _stored(tmp_path) == []
+    assert _partials(tmp_path) == []
+
+
+def test_empty_file_is_rejected(client, tmp_path):
+    assert _post(client, b"").status_code == 400
+    assert _partials(tmp_path) == []
+
+
+def test_missing_file_field_is_rejected(client, tmp_path):
+    r = client.post("/upload/image", files={"other": ("cat.png", PNG, "image/png")})
+
+    assert r.status_code == 400
+    assert r.json()["detail"] == "No file uploaded"
+
+
+def test_non_multipart_body_is_rejected(client):
+    r = client.post("/upload/image", content=PNG, headers={"content-type": "image/png"})
+    assert r.status_code == 400
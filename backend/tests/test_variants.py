@@ -0,0 +1,130 @@
+import io
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image, features
+
+from app.models import User, Conversation, Message, Asset, AssetVariant
+from app.routes.chat import _asset_variants, _message_response
+from app.routes.conversations import get_conversation
+from app.services import variant_service
+from app.services.principal_cache import Principal
+from app.services.storage import get_storage
+from app.services.variant_service import build_variants, get_variants, render_variants, shutdown_variant_pipeline
+
+FORMATS = [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def _png(width: int = 1600, height: int = 1200) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def image_url(db, monkeypatch, tmp_path):
+    # local blobs live under storage/ in the cwd
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(variant_service, "VARIANT_SIZES", "thumb=384,medium=1024")
+    monkeypatch.setattr(variant_service, "VARIANT_FORMATS", "avif,webp")
+    monkeypatch.setattr(variant_service, "VARIANT_WORKERS", 1)
+
+    yield get_storage().put(_png()).url
+    asyncio.run(shutdown_variant_pipeline())
+
+
+@pytest.fixture
+def in_threads(monkeypatch):
+    # spawning worker processes costs seconds; one test below goes through them
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(variant_service, "_get_executor", lambda: executor)
+    yield
+    executor.shutdown()
+
+
+def test_render_scales_down_and_keeps_the_aspect_ratio(tmp_path):
+    path = tmp_path / "source.png"
+    path.write_bytes(_png())
+
+    rendered = render_variants(str(path), [("thumb", 384), ("medium", 1024)], FORMATS, {"avif": 50, "webp": 70})
+
+    assert {(v["name"], v["format"], v["width"], v["height"]) for v in rendered} == {
+        (name, fmt, width, height)
+        for name, width, height in (("thumb", 384, 288), ("medium", 1024, 768))
+        for fmt in FORMATS
+    }
+    for v in rendered:
+        with Image.open(io.BytesIO(v["data"])) as im:
+            assert im.format.lower() == v["format"]
+            assert im.size == (v["width"], v["height"])
+
+
+def test_render_never_upscales(tmp_path):
+    path = tmp_path / "small.png"
+    path.write_bytes(_png(300, 200))
+
+    assert render_variants(str(path), [("thumb", 384)], ["webp"], {"webp": 70}) == []
+
+
+def test_build_stores_avif_and_webp_rows(db, image_url):
+    assert "avif" in FORMATS and "webp" in FORMATS
+
+    asyncio.run(build_variants([image_url]))
+
+    rows = get_variants(db, [image_url])[image_url]
+    assert sorted((v.format, v.width) for v in rows) == [
+        ("avif", 384), ("avif", 1024), ("webp", 384), ("webp", 1024)
+    ]
+    # smallest first, each a stored blob of its own
+    assert [v.width for v in rows] == sorted(v.width for v in rows)
+    assert all(get_storage().size(v.url) == v.size_bytes for v in rows)
+
+
+def test_build_skips_images_that_already_have_variants(db, image_url, in_threads):
+    asyncio.run(build_variants([image_url]))
+    asyncio.run(build_variants([image_url, image_url]))
+
+    assert db.query(AssetVariant).count() == 2 * len(FORMATS)
+
+
+def _message_with_asset(db, url: str):
+    user = User(email="variants@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    convo = Conversation(user_id=user.id, title="Variants")
+    db.add(convo)
+    db.flush()
+    msg = Message(conversation_id=convo.id, role="assistant", text="a lighthouse")
+    db.add(msg)
+    db.flush()
+    asset = Asset(message_id=msg.id, type="image", url=url)
+    db.add(asset)
+    db.commit()
+    return user, convo, msg, asset
+
+
+def test_reloaded_conversation_lists_the_variants(db, image_url, in_threads):
+    asyncio.run(build_variants([image_url]))
+    user, convo, _, _ = _message_with_asset(db, image_url)
+
+    page = get_conversation(
+        convo.id, before=None, after=None, limit=50, db=db,
+        current_user=Principal(id=user.id, email=user.email)
+    )
+
+    variants = page.messages[0].assets[0].variants
+    assert [v.width for v in variants] == [384] * len(FORMATS) + [1024] * len(FORMATS)
+
+
+def test_chat_turn_response_carries_the_variants(db, image_url, in_threads):
+    asyncio.run(build_variants([image_url]))
+    _, _, msg, asset = _message_with_asset(db, image_url)
+
+    variants = asyncio.run(_asset_variants(db, [asset]))
+    response = _message_response(msg, [asset], variants)
+
+    assert {(v.format, v.width) for v in response.assets[0].variants} == {
+        (fmt, width) for fmt in FORMATS for width in (384, 1024)
+    }
+    assert asyncio.run(_asset_variants(db, [])) == {}
@@ -4,6 +4,11 @@ let token = localStorage.getItem("vizzy_token") || "";
 let currentConversationId = null;
 let lastPromptSent = "";
 
+// conversation detail is paged: older messages load when scrolling up
+let oldestMessageId = null;
+let hasOlderMessages = false;
+let loadingOlder = false;
+
 // UI elements
 const authModal = document.getElementById("authModal");
 const logoutBtn = document.getElementById("logoutBtn");
@@ -177,8 +182,9 @@ async function apiResetMemory() {
   return await res.json();
 }
 
-async function apiGetConversation(conversationId) {
-  const res = await fetch(`${API_BASE}/conversations/${conversationId}`, {
+async function apiGetConversation(conversationId, params = {}) {
+  const query = new URLSearchParams(params).toString();
+  const res = await fetch(`${API_BASE}/conversations/${conversationId}${query ? `?${query}` : ""}`, {
     headers: authHeaders()
   });
 
@@ -186,8 +192,18 @@ async function apiGetConversation(conversationId) {
   return await res.json();
 }
 
-async function apiSendChat(payload) {
-  const res = await fetch(`${API_BASE}/chat/send`, {
+async function apiGetJob(jobId) {
+  const res = await fetch(`${API_BASE}/jobs/${jobId}`, {
+    headers: authHeaders()
+  });
+
+  if (!res.ok) throw new Error("Failed to load job");
+  return await res.json();
+}
+
+// POST /chat/stream and feed each server-sent event to onEvent(event, data)
+async function apiStreamChat(payload, onEvent) {
+  const res = await fetch(`${API_BASE}/chat/stream`, {
     method: "POST",
     headers: authHeaders(),
     body: JSON.stringify(payload)
@@ -198,8 +214,34 @@ async function apiSendChat(payload) {
     throw new Error(err.detail || "Send failed");
   }
 
-  return await res.json();
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+
+      onEvent(event, data ? JSON.parse(data) : {});
+    }
+  }
 }
+
 async function apiUploadImage(file) {
   const form = new FormData();
   form.append("file", file);
@@ -286,7 +328,52 @@ function renderConversations(convos) {
 }
 
 
-function renderMessage(msg) {
+// AVIF / WebP sources built from the asset's downscaled variants; the browser
+// picks the first format it supports and the smallest size that fits the grid
+function appendVariantSources(picture, variants) {
+  for (const format of ["avif", "webp"]) {
+    const matching = variants.filter((v) => v.format === format);
+    if (!matching.length) continue;
+
+    const source = document.createElement("source");
+    source.type = `image/${format}`;
+    source.srcset = matching.map((v) => `${v.url} ${v.width}w`).join(", ");
+    source.sizes = "(max-width: 700px) 90vw, 360px";
+    picture.appendChild(source);
+  }
+}
+
+function renderAssetCard(a) {
+  const card = document.createElement("div");
+  card.className = "asset-card";
+
+  if (a.type === "image") {
+    const picture = document.createElement("picture");
+    appendVariantSources(picture, a.variants || []);
+
+    const img = document.createElement("img");
+    img.src = a.url;
+    img.alt = "Generated image";
+    img.loading = "lazy";
+    img.decoding = "async";
+
+    img.style.cursor = "pointer";
+    img.title = "Click to edit this image";
+
+    img.onclick = () => {
+      setImageUrl(a.url);
+      setStatus("Selected image for editing ✅");
+    };
+
+    // the original url stays the fallback and is what gets edited
+    picture.appendChild(img);
+    card.appendChild(picture);
+  }
+
+  return card;
+}
+
+function renderMessage(msg, before = null) {
   const row = document.createElement("div");
   row.className = `msg-row ${msg.role}`;
 
@@ -301,27 +388,7 @@ function renderMessage(msg) {
     grid.className = "asset-grid";
 
     for (const a of msg.assets) {
-      const card = document.createElement("div");
-      card.className = "asset-card";
-
-      if (a.type === "image") {
-        const img = document.createElement("img");
-        img.src = a.url;
-        img.alt = "Generated image";
-
-        img.style.cursor = "pointer";
-        img.title = "Click to edit this image";
-
-        img.onclick = () => {
-          setImageUrl(a.url);
-          setStatus("Selected image for editing ✅");
-        };
-
-        card.appendChild(img);
-      }
-
-
-      grid.appendChild(card);
+      grid.appendChild(renderAssetCard(a));
     }
 
 
@@ -334,7 +401,67 @@ function renderMessage(msg) {
 
   bubble.appendChild(time);
   row.appendChild(bubble);
-  chat.appendChild(row);
+  chat.insertBefore(row, before);
+
+  return row;
+}
+
+// Assistant bubble that fills in as /chat/stream events arrive
+function renderStreamingAssistant() {
+  const row = renderMessage({
+    role: "assistant",
+    text: "",
+    created_at: new Date().toISOString(),
+    assets: []
+  });
+
+  const bubble = row.querySelector(".bubble");
+
+  const textNode = document.createTextNode("");
+  bubble.prepend(textNode);
+
+  const grid = document.createElement("div");
+  grid.className = "asset-grid";
+  bubble.insertBefore(grid, bubble.querySelector(".time"));
+
+  return { row, textNode, grid };
+}
+
+const JOB_POLL_MS = 1500;
+
+function sleep(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+// Poll a generation job that was still running when the conversation was loaded,
+// and swap its assets into the placeholder message
+async function waitForJob(msg, row) {
+  while (true) {
+    await sleep(JOB_POLL_MS);
+
+    // user switched conversations meanwhile
+    if (!row.isConnected) return;
+
+    let job;
+    try {
+      job = await apiGetJob(msg.job_id);
+    } catch (err) {
+      console.error(err);
+      return;
+    }
+
+    if (!row.isConnected) return;
+
+    if (job.status === "done") {
+      row.replaceWith(renderMessage({ ...msg, job_id: null, assets: job.assets }));
+      return;
+    }
+
+    if (job.status === "failed") {
+      setStatus("Image generation failed");
+      return;
+    }
+  }
 }
 
 function renderConversation(convo) {
@@ -342,12 +469,52 @@ function renderConversation(convo) {
   chatTitle.textContent = convo.title || "Chat";
 
   for (const m of convo.messages) {
-    renderMessage(m);
+    const row = renderMessage(m);
+    if (m.job_id) waitForJob(m, row);
   }
 
+  oldestMessageId = convo.messages.length ? convo.messages[0].id : null;
+  hasOlderMessages = convo.has_more_before;
+
   scrollToBottom();
 }
 
+async function loadOlderMessages() {
+  if (!currentConversationId || !hasOlderMessages || loadingOlder) return;
+
+  const conversationId = currentConversationId;
+  loadingOlder = true;
+
+  try {
+    const page = await apiGetConversation(conversationId, { before: oldestMessageId });
+
+    // user switched conversations meanwhile
+    if (conversationId !== currentConversationId) return;
+
+    // prepend while keeping the visible messages where they are
+    const anchor = chat.firstChild;
+    const prevHeight = chat.scrollHeight;
+
+    for (const m of page.messages) {
+      const row = renderMessage(m, anchor);
+      if (m.job_id) waitForJob(m, row);
+    }
+
+    chat.scrollTop += chat.scrollHeight - prevHeight;
+
+    if (page.messages.length) oldestMessageId = page.messages[0].id;
+    hasOlderMessages = page.has_more_before;
+  } catch (err) {
+    console.error(err);
+    return;
+  } finally {
+    loadingOlder = false;
+  }
+
+  // short pages may not fill the view, so there is nothing to scroll yet
+  if (chat.scrollHeight <= chat.clientHeight) await loadOlderMessages();
+}
+
 // -----------------------------
 // Main actions
 // -----------------------------
@@ -364,11 +531,15 @@ async function openConversation(conversationId) {
   const convo = await apiGetConversation(conversationId);
   renderConversation(convo);
 
+  if (chat.scrollHeight <= chat.clientHeight) await loadOlderMessages();
+
   setStatus("Ready");
 }
 
 async function createNewChatUI() {
   currentConversationId = null;
+  oldestMessageId = null;
+  hasOlderMessages = false;
   chat.innerHTML = "";
   chatTitle.textContent = "New Chat";
   setStatus("Ready");
@@ -405,21 +576,44 @@ async function sendMessage() {
       use_preferences: usePrefs
     };
 
-    const resp = await apiSendChat(payload);
-    renderMessage(resp.user_message);
-    renderMessage(resp.assistant_message);
+    let streaming = null;
+    let streamError = null;
 
+    await apiStreamChat(payload, (event, data) => {
+      if (event === "conversation") {
+        // if new conversation created
+        currentConversationId = data.conversation_id;
 
-    // if new conversation created
-    currentConversationId = resp.conversation_id;
+        renderMessage(data.user_message);
+        streaming = renderStreamingAssistant();
+        setStatus("Thinking...");
+        refreshSidebar();
+      } else if (!streaming || !streaming.row.isConnected) {
+        // user switched conversations meanwhile
+        return;
+      } else if (event === "token") {
+        streaming.textNode.textContent += data.text;
+      } else if (event === "question") {
+        streaming.row.replaceWith(renderMessage(data.assistant_message));
+      } else if (event === "final") {
+        streaming.textNode.textContent = data.assistant_message.text || "";
+        setStatus("Generating images...");
+      } else if (event === "image") {
+        streaming.grid.appendChild(renderAssetCard({ type: "image", url: data.url }));
+      } else if (event === "done") {
+        streaming.row.replaceWith(renderMessage(data.assistant_message));
+      } else if (event === "error") {
+        streamError = data.detail;
+      }
 
-    // show assistant
-
-    await refreshSidebar();
-    setStatus("Done");
+      scrollToBottom();
+    });
 
+    if (streamError) throw new Error(streamError);
 
+    setStatus("Done");
     textInput.value = "";
+
     // keep image url so user can reuse it if needed
   } catch (err) {
     console.error(err);
@@ -527,6 +721,10 @@ sendBtn.onclick = async () => {
   await sendMessage();
 };
 
+chat.addEventListener("scroll", () => {
+  if (chat.scrollTop < 120) loadOlderMessages();
+});
+
 // Send on Enter (Shift+Enter = new line)
 textInput.addEventListener("keydown", async (e) => {
   if (e.key === "Enter" && !e.shiftKey) {